@@ -0,0 +1,118 @@
+"""Measure the per-request cost of the /metrics instrumentation.
+
+Two numbers are reported:
+
+* hook cost: the request middleware and a database observation timed in
+  isolation, which is deterministic and what the instrumentation adds per hit;
+* end to end: the same in-process request mix run in alternating blocks with
+  the middleware and database observer switched on and off, taking the best
+  block of each so machine noise does not favour either side.
+
+    python bench_metrics.py --requests 2000 --rounds 8 --rate 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+DB_OPERATIONS_PER_REQUEST = 2  # principal lookup plus the route's own query
+
+
+async def hook_cost(iterations: int = 100000):
+    from metrics import MetricsMiddleware, observe_db_operation
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def receive():
+        return {}
+
+    scope = {"type": "http", "method": "GET"}
+    middleware = MetricsMiddleware(app)
+
+    async def timed(target):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await target(scope, receive, send)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    bare = min([await timed(app) for _ in range(3)])
+    wrapped = min([await timed(middleware) for _ in range(3)])
+    start = time.perf_counter()
+    for _ in range(iterations):
+        observe_db_operation("application_submissions", "find", 0.001, False)
+    observe = (time.perf_counter() - start) / iterations * 1e6
+    return wrapped - bare, observe
+
+
+async def end_to_end(requests: int, rounds: int):
+    import httpx
+    from starlette.middleware import Middleware
+    import server
+    from metrics import MetricsMiddleware
+
+    app = server.create_app()
+
+    def set_instrumentation(enabled: bool):
+        middleware = [m for m in app.user_middleware if m.cls is not MetricsMiddleware]
+        if enabled:
+            middleware.insert(0, Middleware(MetricsMiddleware))
+        app.user_middleware = middleware
+        app.middleware_stack = None
+        if hasattr(server.client, "observer"):
+            server.client.observer = server.observe_db_operation if enabled else None
+
+    transport = httpx.ASGITransport(app=app)
+    results = {True: [], False: []}
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench/api") as client:
+        token = (await client.post("/admin/login", json={"username": "admin", "password": "admin123"})).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        mix = [("/changelogs", None), ("/applications", None), ("/user/me", headers), ("/admin/submissions", headers)]
+        for _ in range(rounds):
+            for enabled in (False, True):
+                set_instrumentation(enabled)
+                start = time.process_time()
+                for i in range(requests):
+                    path, hdrs = mix[i % len(mix)]
+                    await client.get(path, headers=hdrs)
+                results[enabled].append((time.process_time() - start) / requests * 1e6)
+    return min(results[False]), min(results[True])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per block")
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--rate", type=int, default=2000, help="request rate to express the overhead at")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    sys.path.insert(0, str(ROOT_DIR))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["METRICS_ENABLED"] = "1"
+        os.environ["MONGO_URL"] = f"sqlite://{os.path.join(tmp, 'bench_metrics.db')}"
+        middleware_us, observe_us = asyncio.run(hook_cost())
+        off, on = asyncio.run(end_to_end(args.requests, args.rounds))
+
+    per_request = middleware_us + DB_OPERATIONS_PER_REQUEST * observe_us
+    print(f"middleware:            {middleware_us:7.2f} us/request")
+    print(f"db observation:        {observe_us:7.2f} us/operation")
+    print(f"hook cost per request: {per_request:7.2f} us "
+          f"({per_request * args.rate / 1e4:.2f}% of one core at {args.rate} req/s)")
+    print(f"end to end, off / on:  {off:7.1f} / {on:.1f} us CPU per request "
+          f"({(on - off) / off * 100:+.1f}%, best of {args.rounds} blocks)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
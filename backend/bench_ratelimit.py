@@ -0,0 +1,105 @@
+"""Measure the per-request cost of the rate limiter.
+
+* hit cost: ``RateLimiter.hit`` timed in isolation for the in-process
+  buckets (allowed and refused) and for the shared database backend;
+* end to end: POST /applications/submit run in alternating blocks with the
+  limiter on (a policy too large to refuse anything) and off, taking the best
+  block of each so machine noise does not favour either side.
+
+    python bench_ratelimit.py --requests 1000 --rounds 6
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+UNLIMITED = "1000000000/second"
+
+
+async def hit_cost(db, iterations: int = 100000):
+    from ratelimit import RateLimiter, RateLimited, MemoryBackend, DatabaseBackend, parse_policy
+
+    async def timed(limiter, identities, count=iterations):
+        start = time.perf_counter()
+        for i in range(count):
+            try:
+                await limiter.hit("bench", identities[i % len(identities)])
+            except RateLimited:
+                pass
+        return (time.perf_counter() - start) / count * 1e6
+
+    ips = [f"ip:10.0.{i // 256}.{i % 256}" for i in range(10000)]
+    allowed = RateLimiter({"bench": parse_policy("bench", UNLIMITED)}, MemoryBackend())
+    refused = RateLimiter({"bench": parse_policy("bench", "1/hour")}, MemoryBackend())
+    await refused.hit("bench", "ip:10.0.0.1")
+    database = RateLimiter({"bench": parse_policy("bench", UNLIMITED)}, DatabaseBackend(db.rate_limits_bench))
+    await database.backend.setup()
+    return {
+        "memory, allowed": min([await timed(allowed, ips) for _ in range(3)]),
+        "memory, refused": min([await timed(refused, ["ip:10.0.0.1"]) for _ in range(3)]),
+        "database, allowed": await timed(database, ips[:100], iterations // 100),
+    }
+
+
+async def end_to_end(requests: int, rounds: int):
+    import httpx
+    import server
+
+    app = server.create_app()
+    transport = httpx.ASGITransport(app=app)
+    results = {True: [], False: []}
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench/api") as client:
+        limiter = server.rate_limiter
+        token = (await client.post("/admin/login", json={"username": "admin", "password": "admin123"})).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        form = (await client.post("/admin/application-forms", headers=headers, json={
+            "title": "Bench", "description": "Bench", "position": "Bench",
+            "fields": [{"label": "Navn", "field_type": "text", "required": True}]
+        })).json()
+        for round in range(rounds):
+            # Every block adds submissions, so alternate which side runs first
+            for enabled in ((False, True) if round % 2 == 0 else (True, False)):
+                server.rate_limiter = limiter if enabled else None
+                start = time.process_time()
+                for i in range(requests):
+                    await client.post("/applications/submit", json={
+                        "form_id": form["id"], "applicant_name": f"Bench {i}", "responses": {}})
+                results[enabled].append((time.process_time() - start) / requests * 1e6)
+        server.rate_limiter = limiter
+    return min(results[False]), min(results[True])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="requests per block")
+    parser.add_argument("--rounds", type=int, default=6)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    sys.path.insert(0, str(ROOT_DIR))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MONGO_URL"] = f"sqlite://{os.path.join(tmp, 'bench_ratelimit.db')}"
+        os.environ["RATE_LIMIT_ENABLED"] = "true"
+        os.environ["RATE_LIMIT_SUBMIT"] = UNLIMITED
+        os.environ["SUBMISSION_DUPLICATE_WINDOW_SECONDS"] = "0"
+        from storage import open_database
+        client, db = open_database(os.environ["MONGO_URL"], "revolution_bench")
+        costs = asyncio.run(hit_cost(db))
+        client.close()
+        off, on = asyncio.run(end_to_end(args.requests, args.rounds))
+
+    for name, micros in costs.items():
+        print(f"{name + ':':<22} {micros:7.2f} us/hit")
+    print(f"end to end, off / on:  {off:7.1f} / {on:.1f} us CPU per submit "
+          f"({(on - off) / off * 100:+.1f}%, best of {args.rounds} blocks)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
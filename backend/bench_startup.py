@@ -0,0 +1,107 @@
+"""Measure import time and cold start of the API.
+
+* import:     ``import server`` in a fresh interpreter, median of --runs
+* create_app: building the app (routes, middleware) after the import
+* lifespan:   opening the database, seeding indexes and loading caches
+* cold start: ``python run.py --workers N`` spawned until the first 200 from
+              GET /api/changelogs, median of --runs
+
+Uses a throwaway SQLite database unless MONGO_URL is already set.
+
+    python bench_startup.py --runs 5 --workers 1 --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+MEASURE_IN_PROCESS = """
+import asyncio, json, time
+start = time.perf_counter()
+import server
+imported = time.perf_counter()
+app = server.create_app()
+created = time.perf_counter()
+
+async def lifespan():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(lifespan())
+print(json.dumps({"import": imported - start, "create_app": created - imported, "lifespan": started - created}))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def in_process(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", MEASURE_IN_PROCESS], env=env, cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def cold_start(env: dict, workers: int, timeout: float = 60.0) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/changelogs"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"run.py exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, action="append", help="worker counts to cold-start (default 1)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("MONGO_URL", f"sqlite://{os.path.join(tmp, 'bench_startup.db')}")
+        env.setdefault("DB_NAME", "revolution_bench")
+        for name in ("DISCORD_BOT_TOKEN", "DISCORD_CLIENT_ID", "DISCORD_CLIENT_SECRET",
+                     "DISCORD_GUILD_ID", "DISCORD_ADMIN_ROLE_ID", "DISCORD_CHANNEL_ID"):
+            env.setdefault(name, "bench")
+
+        phases = [in_process(env) for _ in range(args.runs)]
+        for phase in ("import", "create_app", "lifespan"):
+            samples = [run[phase] * 1000 for run in phases]
+            print(f"{phase:<24} {statistics.median(samples):8.1f} ms  (min {min(samples):.1f}, max {max(samples):.1f})")
+
+        for workers in args.workers or [1]:
+            samples = [cold_start(env, workers) * 1000 for _ in range(args.runs)]
+            print(f"{f'cold start, {workers} worker(s)':<24} {statistics.median(samples):8.1f} ms  "
+                  f"(min {min(samples):.1f}, max {max(samples):.1f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Compare storage backends on every database-backed API route.
+
+Each backend runs in its own process (settings are read once per process),
+drives the app in-process through httpx's ASGI transport and reports per-route
+latency. Routes that only call Discord or FiveM are left out.
+
+    python bench_storage.py --backend sqlite:///tmp/bench.db --backend mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_backend(iterations: int, seed_submissions: int):
+    sys.path.insert(0, str(ROOT_DIR))
+    import httpx
+    import server
+    from storage import open_database
+
+    client, db = open_database(os.environ["MONGO_URL"], os.environ["DB_NAME"])
+    for collection in ("admin_users", "application_forms", "application_submissions", "changelogs", "form_access"):
+        await db[collection].drop()
+    client.close()
+
+    app = server.create_app()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench/api") as client:
+        response = await client.post("/admin/login", json={"username": "admin", "password": "admin123"})
+        admin = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        form_body = {
+            "title": "Politi Ansøgning",
+            "description": "Benchmark form",
+            "position": "Betjent",
+            "fields": [
+                {"label": "Navn", "field_type": "text"},
+                {"label": "Afdeling", "field_type": "select", "options": ["Færdsel", "Efterforskning"]},
+            ],
+        }
+        form = (await client.post("/admin/application-forms", json=form_body, headers=admin)).json()
+        field_id = form["fields"][0]["id"]
+
+        staff_name = f"bench_{uuid.uuid4().hex[:8]}"
+        await client.post("/admin/create-user", headers=admin, json={
+            "username": staff_name, "password": "bench", "role": "staff", "allowed_forms": [form["id"]]})
+        response = await client.post("/admin/login", json={"username": staff_name, "password": "bench"})
+        staff = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        users = (await client.get("/admin/users", headers=admin)).json()
+        staff_id = next(user["id"] for user in users if user["username"] == staff_name)
+
+        submission_ids = []
+        for i in range(seed_submissions):
+            response = await client.post("/applications/submit", json={
+                "form_id": form["id"], "applicant_name": f"Ansøger {i}", "responses": {field_id: f"Svar nummer {i}"}})
+            submission_ids.append(response.json()["submission_id"])
+        changelog = (await client.post("/admin/changelogs", headers=admin, json={
+            "title": "Bench", "content": "# Opdatering\n- **Ny** feature", "version": "1.0"})).json()
+
+        submit_body = {"form_id": form["id"], "applicant_name": "Bench Ansøger", "responses": {field_id: "Hej"}}
+        routes = [
+            ("POST /admin/login", "POST", "/admin/login", {"username": "admin", "password": "admin123"}, None),
+            ("GET /user/me", "GET", "/user/me", None, admin),
+            ("GET /admin/users", "GET", "/admin/users", None, admin),
+            ("PUT /admin/users/{id}", "PUT", f"/admin/users/{staff_id}", {"allowed_forms": [form["id"]]}, admin),
+            ("GET /applications", "GET", "/applications", None, None),
+            ("GET /applications/{id}", "GET", f"/applications/{form['id']}", None, None),
+            ("POST /applications/submit", "POST", "/applications/submit", submit_body, None),
+            ("GET /admin/application-forms", "GET", "/admin/application-forms", None, admin),
+            ("GET /admin/application-forms/{id}", "GET", f"/admin/application-forms/{form['id']}", None, admin),
+            ("PUT /admin/application-forms/{id}", "PUT", f"/admin/application-forms/{form['id']}", form_body, admin),
+            ("GET /admin/application-forms/{id}/staff", "GET",
+             f"/admin/application-forms/{form['id']}/staff", None, admin),
+            ("GET /admin/submissions (admin)", "GET", "/admin/submissions", None, admin),
+            ("GET /admin/submissions (staff)", "GET", "/admin/submissions", None, staff),
+            ("GET /admin/submissions/search", "GET", "/admin/submissions/search?q=ans", None, staff),
+            ("GET /admin/submissions/{id}", "GET", f"/admin/submissions/{submission_ids[0]}", None, staff),
+            ("PUT /admin/submissions/{id}/status", "PUT",
+             f"/admin/submissions/{submission_ids[0]}/status", {"status": "pending"}, staff),
+            ("GET /user/applications", "GET", "/user/applications", None, admin),
+            ("GET /changelogs", "GET", "/changelogs", None, None),
+            ("GET /admin/changelogs", "GET", "/admin/changelogs", None, admin),
+            ("PUT /admin/changelogs/{id}", "PUT", f"/admin/changelogs/{changelog['id']}",
+             {"title": "Bench", "content": "Opdateret", "version": "1.1"}, admin),
+        ]
+
+        results = {}
+        for name, method, path, body, headers in routes:
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body, headers=headers)
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{name} returned {response.status_code}: {response.text}")
+            results[name] = {
+                "p50": statistics.median(timings),
+                "p95": percentile(timings, 95),
+                "mean": statistics.fmean(timings),
+            }
+    return results
+
+
+def run_child(url: str, iterations: int, seed_submissions: int):
+    env = dict(os.environ, MONGO_URL=url, DB_NAME=os.environ.get("BENCH_DB_NAME", "revolution_bench"),
+               # Every iteration repeats the same login and submit; measure the storage, not the guards
+               RATE_LIMIT_ENABLED="false", SUBMISSION_DUPLICATE_WINDOW_SECONDS="0")
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", "--iterations", str(iterations), "--seed", str(seed_submissions)],
+        env=env, capture_output=True, text=True, cwd=ROOT_DIR)
+    if output.returncode != 0:
+        print(f"Backend {url} failed:\n{output.stderr[-2000:]}", file=sys.stderr)
+        return None
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", action="append", help="database URL (repeatable)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=500, help="submissions to create before timing")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import logging
+        logging.disable(logging.INFO)
+        print(json.dumps(asyncio.run(run_backend(args.iterations, args.seed))))
+        return 0
+
+    backends = args.backend or [f"sqlite:///{ROOT_DIR / 'bench_storage.db'}"]
+    reports = {url: run_child(url, args.iterations, args.seed) for url in backends}
+    reports = {url: report for url, report in reports.items() if report}
+    if not reports:
+        return 1
+
+    routes = list(next(iter(reports.values())))
+    width = max(len(route) for route in routes)
+    header = f"{'route':<{width}}" + "".join(f" | {url[:28]:>28} p50/p95 ms" for url in reports)
+    print(header)
+    print("-" * len(header))
+    for route in routes:
+        line = f"{route:<{width}}"
+        for report in reports.values():
+            stats = report[route]
+            line += f" | {stats['p50']:>20.3f} / {stats['p95']:>8.3f}"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Content-addressed file storage for application uploads.
+
+An upload arrives in chunks, each streamed from the request straight into
+``<root>/partial/<upload id>`` at its offset, so a worker holds at most one
+network chunk of it in memory. After the last byte ``finish`` hashes the file
+from disk and moves it to ``<root>/blobs/<sha256[:2]>/<sha256>``; when that
+blob already exists the partial file is simply dropped, so identical files
+are stored once. Blob ids are the SHA-256 hex digests.
+
+``parse_range`` and ``read`` serve single byte ranges of a blob for
+``Range:`` requests. ``purge_partials`` and ``remove`` are the server's
+garbage collector's hands; deciding what is garbage needs the database.
+"""
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Optional, Set, Tuple
+
+import anyio
+
+BLOB_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+READ_SIZE = 256 * 1024
+
+
+class UploadOverflow(Exception):
+    """More bytes arrived than the upload declared"""
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def is_blob_id(value: str) -> bool:
+    return bool(BLOB_ID_RE.match(value))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte of a single ``bytes=`` range, or None to send the whole blob.
+
+    Multiple ranges and malformed headers are ignored, as RFC 9110 allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class BlobStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.partial_dir = self.root / "partial"
+        self.blob_dir = self.root / "blobs"
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def partial_path(self, upload_id: str) -> Path:
+        return self.partial_dir / upload_id
+
+    def blob_path(self, blob_id: str) -> Path:
+        if not is_blob_id(blob_id):
+            raise ValueError(f"Invalid blob id {blob_id!r}")
+        return self.blob_dir / blob_id[:2] / blob_id
+
+    def exists(self, blob_id: str) -> bool:
+        return is_blob_id(blob_id) and self.blob_path(blob_id).is_file()
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterable[bytes], max_bytes: int) -> int:
+        """Write the streamed chunks at offset, dropping anything an earlier failed write left past it"""
+        path = self.partial_path(upload_id)
+        path.touch(exist_ok=True)
+        written = 0
+        async with await anyio.open_file(path, "r+b") as file:
+            await file.seek(offset)
+            await file.truncate()
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_bytes:
+                    await file.truncate(offset)
+                    raise UploadOverflow(f"Upload {upload_id} is longer than declared")
+                await file.write(chunk)
+        return written
+
+    async def finish(self, upload_id: str) -> Tuple[str, int]:
+        """Move a complete upload into the blob store; returns (blob id, size)"""
+        return await anyio.to_thread.run_sync(self._finish, upload_id)
+
+    def _finish(self, upload_id: str) -> Tuple[str, int]:
+        path = self.partial_path(upload_id)
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            while chunk := file.read(READ_SIZE):
+                digest.update(chunk)
+        blob_id = digest.hexdigest()
+        size = path.stat().st_size
+        target = self.blob_path(blob_id)
+        if target.is_file():
+            path.unlink()
+        else:
+            target.parent.mkdir(exist_ok=True)
+            os.replace(path, target)
+        return blob_id, size
+
+    def discard(self, upload_id: str):
+        self.partial_path(upload_id).unlink(missing_ok=True)
+
+    def purge_partials(self, keep: Set[str], older_than: float = 0) -> int:
+        """Delete partial files of uploads that no longer exist.
+
+        Files modified in the last older_than seconds are left alone: they may
+        belong to an upload created after keep was read.
+        """
+        removed = 0
+        cutoff = time.time() - older_than
+        for path in self.partial_dir.iterdir():
+            if path.name in keep:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def remove(self, blob_id: str):
+        self.blob_path(blob_id).unlink(missing_ok=True)
+
+    async def read(self, blob_id: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes start..end (inclusive) of a blob, a READ_SIZE block at a time"""
+        remaining = end - start + 1
+        async with await anyio.open_file(self.blob_path(blob_id), "rb") as file:
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(READ_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
@@ -0,0 +1,93 @@
+"""Request body size caps, enforced before anything parses the body.
+
+``BodyLimitMiddleware`` answers 413 straight away when Content-Length is over
+the limit for the path, and otherwise counts bytes as the app receives them,
+so a chunked or lying request is cut off as soon as it crosses the limit
+instead of being buffered whole and then handed to the JSON parser.
+"""
+import json
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from metrics import registry, Counter
+
+rejected_bodies = registry.register(Counter(
+    "request_body_rejected", "Requests refused because their body was over the size limit",
+    ["route"]))  # the configured prefix, or "default", so arbitrary paths add no label values
+
+
+class BodyTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body larger than {limit} bytes")
+        self.limit = limit
+
+
+class BodyLimitMiddleware:
+    """Pure ASGI middleware capping request bodies; ``limits`` maps path prefixes to their own cap"""
+
+    def __init__(self, app, max_body: int, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body = max_body
+        # Longest prefix first, so /api/a/b can override /api/a
+        self.limits: Tuple[Tuple[str, int], ...] = tuple(
+            sorted((limits or {}).items(), key=lambda item: len(item[0]), reverse=True))
+
+    def limit_for(self, path: str) -> Tuple[str, int]:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return "default", self.max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route, limit = self.limit_for(scope["path"])
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    rejected_bodies.inc(route)
+                    await self.reject(send, limit)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected_bodies.inc(route)
+                    raise BodyTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge:
+            # Raised outside a FastAPI route (those turn it into the 413 themselves)
+            if response_started:
+                raise
+            await self.reject(send, limit)
+
+    async def reject(self, send, limit: int):
+        body = json.dumps({"detail": f"Request body larger than {limit} bytes"}).encode()
+        await send({"type": "http.response.start", "status": 413, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ]})
+        await send({"type": "http.response.body", "body": body})
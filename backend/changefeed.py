@@ -0,0 +1,103 @@
+"""Cross-worker change feed kept in the shared database.
+
+run.py starts several worker processes, and each keeps in-memory state built
+from the database: the submission search index, the changelog snapshot, the
+SSE event buffer. A worker that changes the data behind that state appends an
+entry here, and every worker polls the feed and applies new entries in
+sequence order, so all of them converge within one poll interval without a
+separate message broker.
+
+Sequence numbers come from an atomic ``$inc`` on a counter document, so they
+are global: an SSE client can resume from its Last-Event-ID on any worker.
+Two writers can commit seq 7 and 8 in either order, so a reader that sees 8
+before 7 waits up to ``gap_seconds`` for 7 and then moves on (the writer of 7
+died between taking the number and inserting the entry). Entries only have to
+outlive that lag, so they expire after ``retention_seconds``; a worker starts
+at the current counter because it loads its state from the database after
+that point.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+SEQUENCE_ID = "sequence"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class ChangeFeed:
+    def __init__(self, collection, poll_seconds: float = 0.25, gap_seconds: float = 2.0,
+                 retention_seconds: float = 300, batch_size: int = 500):
+        self.collection = collection
+        self.poll_seconds = poll_seconds
+        self.gap_seconds = gap_seconds
+        self.retention = timedelta(seconds=retention_seconds)
+        self.batch_size = batch_size
+        self.handlers: Dict[str, Handler] = {}
+        self.applied = 0
+        self.gap_since: Optional[float] = None
+
+    def on(self, kind: str, handler: Handler):
+        self.handlers[kind] = handler
+
+    async def setup(self):
+        await self.collection.create_index("id", unique=True, sparse=True)
+        await self.collection.create_index("seq", unique=True, sparse=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.prune()
+        sequence = await self.collection.find_one({"id": SEQUENCE_ID}, {"_id": 0, "value": 1})
+        self.applied = sequence["value"] if sequence else 0
+
+    async def prune(self):
+        # The SQLite backend has no TTL monitor
+        await self.collection.delete_many({"expires_at": {"$lte": datetime.utcnow()}})
+
+    async def publish(self, kind: str, data: Dict[str, Any]) -> int:
+        sequence = await self.collection.find_one_and_update(
+            {"id": SEQUENCE_ID}, {"$inc": {"value": 1}},
+            projection={"_id": 0, "value": 1}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        seq = sequence["value"]
+        await self.collection.insert_one({
+            "seq": seq, "kind": kind, "data": data,
+            "expires_at": datetime.utcnow() + self.retention,
+        })
+        return seq
+
+    async def poll(self):
+        entries = await self.collection.find(
+            {"seq": {"$gt": self.applied}}, {"_id": 0}
+        ).sort("seq", 1).limit(self.batch_size).to_list(self.batch_size)
+        for entry in entries:
+            if entry["seq"] != self.applied + 1:
+                now = time.monotonic()
+                if self.gap_since is None:
+                    self.gap_since = now
+                if now - self.gap_since < self.gap_seconds:
+                    return
+                logging.warning(f"Change feed skipped missing entries {self.applied + 1}-{entry['seq'] - 1}")
+            self.gap_since = None
+            self.applied = entry["seq"]
+            handler = self.handlers.get(entry["kind"])
+            if handler is None:
+                continue
+            try:
+                await handler(entry)
+            except Exception as e:
+                logging.error(f"Change feed handler for {entry['kind']} failed at {entry['seq']}: {e}")
+
+    async def run(self):
+        pruned = time.monotonic()
+        while True:
+            try:
+                await self.poll()
+                if time.monotonic() - pruned > self.retention.total_seconds():
+                    pruned = time.monotonic()
+                    await self.prune()
+            except Exception as e:
+                logging.error(f"Change feed poll failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
@@ -0,0 +1,71 @@
+"""Time-ordered document ids.
+
+Ids are ULIDs: 26 Crockford base32 characters, a 48-bit millisecond timestamp
+followed by 80 random bits. They sort by creation time as plain strings, so
+inserts land at the right-hand edge of the ``id`` index and list endpoints can
+sort and paginate on ``id`` alone. Ids made in the same millisecond by one
+process increment the random part, so they keep their creation order too.
+
+Documents created before this used ``str(uuid.uuid4())``; ``is_legacy_id``
+recognises those so lookups can fall back to the ``legacy_id`` field.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+DECODE = {char: value for value, char in enumerate(ALPHABET)}
+ID_LENGTH = 26
+RANDOM_BITS = 80
+MAX_RANDOM = (1 << RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_id(at: Optional[datetime] = None) -> str:
+    """A new id for now, or for the time ``at`` (naive datetimes are UTC)"""
+    global _last_ms, _last_random
+    if at is not None:
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        ms = int(at.timestamp() * 1000)
+        return _encode(ms << RANDOM_BITS | int.from_bytes(os.urandom(10), "big"))
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _last_ms and _last_random < MAX_RANDOM:
+            ms, random_part = _last_ms, _last_random + 1
+        else:
+            random_part = int.from_bytes(os.urandom(10), "big")
+        _last_ms, _last_random = ms, random_part
+    return _encode(ms << RANDOM_BITS | random_part)
+
+
+def is_id(value: str) -> bool:
+    return len(value) == ID_LENGTH and all(char in DECODE for char in value)
+
+
+def is_legacy_id(value: str) -> bool:
+    """True for the uuid4 strings documents had before time-ordered ids"""
+    return len(value) == 36 and value.count("-") == 4
+
+
+def id_time(value: str) -> Optional[datetime]:
+    """Creation time encoded in an id (naive UTC), or None for anything else"""
+    if not is_id(value):
+        return None
+    ms = 0
+    for char in value[:10]:
+        ms = ms << 5 | DECODE[char]
+    return datetime.utcfromtimestamp(ms / 1000)
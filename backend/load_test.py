@@ -0,0 +1,322 @@
+"""Concurrent load test for the API with local upstream stand-ins.
+
+Starts the Discord, FiveM and webhook stand-ins from standins.py, points the
+app at them and at a throwaway database (SQLite by default, or a MongoDB URL),
+seeds forms, staff and submissions, then runs virtual users concurrently
+against the app in-process. Each virtual user loops over weighted scenarios:
+
+* browse:  public pages (forms, a form, changelogs, server stats, Discord news)
+* submit:  open a form and submit an application (fires the form webhook)
+* triage:  staff list, search, claim and decide submissions
+* oauth:   Discord OAuth callback, then /user/me and /user/applications
+
+Reports throughput and p50/p95/p99 per route, plus upstream stand-in hits.
+
+    python load_test.py --users 50 --duration 30 --upstream-latency 20
+    python load_test.py --mix browse=20,submit=40,triage=30,oauth=10 --json report.json
+    python load_test.py --fault discord:error_rate=0.5 --fault fivem:delay=5
+
+``--fault`` injects failures into a stand-in (see standins.py) to check that
+deadlines and circuit breakers keep public routes fast; the report then also
+shows each upstream's breaker state.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from bench_storage import percentile
+from standins import Standins
+
+ROOT_DIR = Path(__file__).parent
+DEFAULT_MIX = "browse=50,submit=20,triage=20,oauth=10"
+STAFF_PASSWORD = "loadtest"
+
+
+class Recorder:
+    """Per-route latency samples and unexpected responses"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_examples = {}
+
+    async def request(self, client, route: str, method: str, path: str, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except Exception as e:
+            self.samples[route].append(time.perf_counter() - start)
+            self.errors[route] += 1
+            self.error_examples.setdefault(route, repr(e))
+            return None
+        self.samples[route].append(time.perf_counter() - start)
+        if response.status_code not in expected:
+            self.errors[route] += 1
+            self.error_examples.setdefault(route, f"{response.status_code}: {response.text[:200]}")
+        return response
+
+
+class LoadTest:
+    def __init__(self, client, standins: Standins, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.standins = standins
+        self.recorder = recorder
+        self.rng = rng
+        self.forms = []
+        self.staff_tokens = []
+        self.oauth_users = 0
+
+    async def seed(self, forms: int, staff: int, submissions: int):
+        request = self.recorder.request
+        response = await request(self.client, "seed", "POST", "/admin/login",
+                                 json={"username": "admin", "password": "admin123"})
+        admin = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for i in range(forms):
+            body = {
+                "title": f"Ansøgning {i}",
+                "description": "Load test form",
+                "position": ["Betjent", "Læge", "Mekaniker"][i % 3],
+                "webhook_url": self.standins.webhook_url(f"form{i}"),
+                "fields": [
+                    {"label": "Navn", "field_type": "text", "required": True},
+                    {"label": "Alder", "field_type": "text"},
+                    {"label": "Erfaring", "field_type": "textarea"},
+                    {"label": "Afdeling", "field_type": "select", "options": ["Færdsel", "Efterforskning"]},
+                ],
+            }
+            response = await request(self.client, "seed", "POST", "/admin/application-forms", json=body, headers=admin)
+            self.forms.append(response.json())
+        for i in range(staff):
+            username = f"load_{uuid.uuid4().hex[:8]}"
+            allowed = [form["id"] for form in self.forms[i % len(self.forms)::2]]
+            await request(self.client, "seed", "POST", "/admin/create-user", headers=admin, json={
+                "username": username, "password": STAFF_PASSWORD, "role": "staff", "allowed_forms": allowed})
+            response = await request(self.client, "seed", "POST", "/admin/login",
+                                     json={"username": username, "password": STAFF_PASSWORD})
+            self.staff_tokens.append((username, {"Authorization": f"Bearer {response.json()['access_token']}"}))
+        self.staff_tokens.append(("admin", admin))
+        for i in range(5):
+            await request(self.client, "seed", "POST", "/admin/changelogs", headers=admin, json={
+                "title": f"Opdatering {i}", "version": f"1.{i}",
+                "content": "# Nyheder\n- **Nye** biler\n- Rettede fejl i `garage`"})
+        for i in range(submissions):
+            await request(self.client, "seed", "POST", "/applications/submit",
+                          json=self.submission_body(self.forms[i % len(self.forms)], i))
+
+    def submission_body(self, form: dict, n: int) -> dict:
+        fields = form["fields"]
+        return {
+            "form_id": form["id"],
+            "applicant_name": f"Ansøger {n} {self.rng.choice(['Hansen', 'Jensen', 'Nielsen', 'Larsen'])}",
+            "responses": {
+                fields[0]["id"]: f"Spiller {n}",
+                fields[1]["id"]: str(self.rng.randint(16, 40)),
+                fields[2]["id"]: self.rng.choice(["Har spillet politi før", "Ny på serveren", "Erfaren mekaniker"]),
+                fields[3]["id"]: self.rng.choice(fields[3]["options"]),
+            },
+        }
+
+    async def browse(self):
+        request, client = self.recorder.request, self.client
+        form = self.rng.choice(self.forms)
+        await request(client, "GET /applications", "GET", "/applications")
+        await request(client, "GET /applications/{id}", "GET", f"/applications/{form['id']}")
+        await request(client, "GET /changelogs", "GET", "/changelogs", expected=(200, 304))
+        await request(client, "GET /server-stats", "GET", "/server-stats")
+        await request(client, "GET /discord/messages", "GET", "/discord/messages")
+
+    async def submit(self):
+        request, client = self.recorder.request, self.client
+        form = self.rng.choice(self.forms)
+        await request(client, "GET /applications/{id}", "GET", f"/applications/{form['id']}")
+        await request(client, "POST /applications/submit", "POST", "/applications/submit",
+                      json=self.submission_body(form, self.rng.randint(0, 10**6)))
+
+    async def triage(self):
+        request, client = self.recorder.request, self.client
+        username, headers = self.rng.choice(self.staff_tokens)
+        await request(client, "GET /admin/submissions", "GET", "/admin/submissions", headers=headers)
+        query = self.rng.choice(["hansen", "jens", "politi", "erfaren", "ansøger"])
+        await request(client, "GET /admin/submissions/search", "GET", "/admin/submissions/search",
+                      params={"q": query}, headers=headers)
+        response = await request(client, "POST /admin/queue/claim", "POST", "/admin/queue/claim",
+                                 expected=(200, 404), headers=headers)
+        if response is not None and response.status_code == 200:
+            submission_id = response.json()["id"]
+            await request(client, "GET /admin/submissions/{id}", "GET",
+                          f"/admin/submissions/{submission_id}", headers=headers)
+            await request(client, "PUT /admin/submissions/{id}/status", "PUT",
+                          f"/admin/submissions/{submission_id}/status", headers=headers,
+                          json={"status": self.rng.choice(["approved", "rejected"])})
+        if self.rng.random() < 0.1 and username != "admin":
+            await request(client, "POST /admin/login", "POST", "/admin/login",
+                          json={"username": username, "password": STAFF_PASSWORD})
+
+    async def oauth(self):
+        request, client = self.recorder.request, self.client
+        self.oauth_users += 1
+        number = self.rng.randint(1, max(50, self.oauth_users))
+        response = await request(client, "GET /auth/discord/callback", "GET", "/auth/discord/callback",
+                                 params={"code": f"code-{number}"})
+        if response is None or response.status_code != 200:
+            return
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await request(client, "GET /user/me", "GET", "/user/me", headers=headers)
+        await request(client, "GET /user/applications", "GET", "/user/applications", headers=headers)
+
+    async def virtual_user(self, scenarios, weights, deadline: float, think_time: float):
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await scenario()
+            if think_time:
+                await asyncio.sleep(self.rng.uniform(0, 2 * think_time))
+
+
+def parse_fault(value: str):
+    upstream, _, spec = value.partition(":")
+    if upstream not in ("discord", "fivem", "webhook") or not spec:
+        raise argparse.ArgumentTypeError(f"expected <discord|fivem|webhook>:key=value[,key=value], got {value!r}")
+    faults = {}
+    for part in spec.split(","):
+        key, _, number = part.partition("=")
+        if key not in ("error_rate", "error_status", "delay"):
+            raise argparse.ArgumentTypeError(f"unknown fault {key!r}")
+        faults[key] = int(number) if key == "error_status" else float(number)
+    return upstream, faults
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"browse", "submit", "triage", "oauth"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return mix
+
+
+async def run(args, standins: Standins) -> dict:
+    import httpx
+    import server
+
+    app = server.create_app()
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://loadtest/api", timeout=60) as client:
+        load = LoadTest(client, standins, recorder, random.Random(args.seed))
+        await load.seed(args.forms, args.staff, args.submissions)
+        recorder.samples.pop("seed", None)
+        if recorder.errors.pop("seed", 0):
+            raise RuntimeError(f"Seeding failed: {recorder.error_examples['seed']}")
+        for upstream, faults in args.fault:
+            standins.state(upstream).faults.update(faults)
+        standins_before = standins.hits()
+
+        scenarios = [getattr(load, name) for name in args.mix]
+        weights = list(args.mix.values())
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*[
+            load.virtual_user(scenarios, weights, deadline, args.think_time / 1000)
+            for _ in range(args.users)
+        ])
+        elapsed = time.perf_counter() - start
+        breakers = [breaker.snapshot() for breaker in server.upstream_breakers.values()]
+        if args.mongo_url:
+            await server.client.drop_database(os.environ["DB_NAME"])
+
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        routes[route] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(route, 0),
+            "rps": len(samples) / elapsed,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+    total = sum(route["requests"] for route in routes.values())
+    upstream = {
+        name: {key: count - standins_before[name].get(key, 0) for key, count in hits.items()}
+        for name, hits in standins.hits().items()
+    }
+    return {
+        "users": args.users,
+        "duration_s": elapsed,
+        "requests": total,
+        "errors": sum(route["errors"] for route in routes.values()),
+        "rps": total / elapsed,
+        "routes": routes,
+        "upstream_hits": upstream,
+        "breakers": breakers,
+        "error_examples": recorder.error_examples,
+    }
+
+
+def print_report(report: dict):
+    routes = report["routes"]
+    width = max([len(route) for route in routes] + [5])
+    header = f"{'route':<{width}} | {'reqs':>7} | {'err':>5} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for route, stats in routes.items():
+        print(f"{route:<{width}} | {stats['requests']:>7} | {stats['errors']:>5} | {stats['rps']:>8.1f} | "
+              f"{stats['p50_ms']:>8.2f} | {stats['p95_ms']:>8.2f} | {stats['p99_ms']:>8.2f}")
+    print("-" * len(header))
+    print(f"{report['requests']} requests, {report['errors']} errors in {report['duration_s']:.1f}s "
+          f"with {report['users']} users: {report['rps']:.1f} req/s")
+    for name, hits in report["upstream_hits"].items():
+        print(f"{name} stand-in: " + (", ".join(f"{key}={count}" for key, count in sorted(hits.items())) or "no calls"))
+    for breaker in report["breakers"]:
+        print(f"{breaker['upstream']} breaker: {breaker['state']}, {breaker['total_failures']} failures, "
+              f"{breaker['total_rejected']} calls rejected while open")
+    for route, example in report["error_examples"].items():
+        print(f"first error on {route}: {example}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of traffic after seeding")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"scenario weights ({DEFAULT_MIX})")
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause between scenarios in ms")
+    parser.add_argument("--upstream-latency", type=float, default=0, help="added latency per stand-in call in ms")
+    parser.add_argument("--forms", type=int, default=6)
+    parser.add_argument("--staff", type=int, default=8)
+    parser.add_argument("--submissions", type=int, default=500, help="submissions seeded before traffic starts")
+    parser.add_argument("--fault", type=parse_fault, action="append", default=[],
+                        help="inject faults into a stand-in, e.g. discord:error_rate=0.5,delay=1 (repeatable)")
+    parser.add_argument("--mongo-url", help="run against a throwaway database on this MongoDB instead of SQLite")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the traffic mix")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    sys.path.insert(0, str(ROOT_DIR))
+    with tempfile.TemporaryDirectory() as tmp, Standins(args.upstream_latency / 1000) as standins:
+        os.environ.update(standins.environ())
+        os.environ["DB_NAME"] = f"revolution_load_{uuid.uuid4().hex[:8]}"
+        os.environ["MONGO_URL"] = args.mongo_url or f"sqlite://{os.path.join(tmp, 'load_test.db')}"
+        # Every virtual user shares one client address
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        report = asyncio.run(run(args, standins))
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
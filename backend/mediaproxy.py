@@ -0,0 +1,222 @@
+"""Proxy for Discord CDN media: message attachments and user avatars.
+
+Visitors load images from the API instead of from Discord, and signed
+attachment URLs expiring upstream no longer break old messages.
+
+* ``DiskCache`` is a size-bounded LRU of files. Recency lives in file mtimes,
+  so a restarted worker rebuilds its order from a directory scan.
+* ``MediaProxy.original`` fetches a URL once. Concurrent requests for the same
+  key share one download, streamed to disk and capped at ``max_bytes``.
+* ``MediaProxy.thumbnail`` resizes images to one of ``THUMBNAIL_SIZES`` as
+  WebP in a process pool, so decoding never blocks the event loop. Without
+  Pillow (optional) originals are served instead.
+
+Every cached key names immutable content: an attachment id or avatar hash
+never changes its bytes. Responses can therefore carry a long-lived ETag and
+``immutable``.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import anyio
+import httpx
+
+try:
+    from PIL import Image
+except ImportError:  # optional; thumbnails fall back to the original image
+    Image = None
+
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+THUMBNAIL_SOURCE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+THUMBNAIL_TYPE = "image/webp"
+MAX_IMAGE_PIXELS = 40_000_000  # refuse decompression bombs instead of allocating for them
+ATTACHMENT_SOURCES_LIMIT = 5000
+WRITE_SIZE = 64 * 1024
+
+
+class MediaUnavailable(Exception):
+    """The upstream did not return the media (gone, too large or failing)"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def make_thumbnail(source: str, target: str, size: int) -> None:
+    """Runs in a pool process: write a WebP of source fitting in size x size to target"""
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        image.save(target, "WEBP", quality=80, method=4)
+
+
+class DiskCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.tmp_dir.iterdir():
+            stale.unlink(missing_ok=True)
+        self.entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, least recent first
+        self.total = 0
+        files = [path for path in self.root.glob("??/*") if path.is_file()]
+        for path in sorted(files, key=lambda path: path.stat().st_mtime):
+            size = path.stat().st_size
+            self.entries[path.name] = size
+            self.total += size
+        self.evict()
+
+    @staticmethod
+    def name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        name = self.name(key)
+        return self.root / name[:2] / name
+
+    def get(self, key: str) -> Optional[Path]:
+        name, path = self.name(key), self.path(key)
+        if name not in self.entries:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker sharing the directory
+            self.total -= self.entries.pop(name)
+            return None
+        self.entries.move_to_end(name)
+        return path
+
+    def temp_path(self) -> Path:
+        return self.tmp_dir / uuid.uuid4().hex
+
+    def put(self, key: str, temp_path: Path) -> Path:
+        """Move a finished temp file into the cache under key"""
+        name, path = self.name(key), self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        os.replace(temp_path, path)
+        self.total -= self.entries.pop(name, 0)
+        self.entries[name] = path.stat().st_size
+        self.total += self.entries[name]
+        self.evict(keep=name)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        while self.total > self.max_bytes and self.entries:
+            name, size = next(iter(self.entries.items()))
+            if name == keep:
+                break
+            del self.entries[name]
+            self.total -= size
+            (self.root / name[:2] / name).unlink(missing_ok=True)
+
+
+class MediaProxy:
+    def __init__(self, cache: DiskCache, client: Callable[[], httpx.AsyncClient],
+                 max_bytes: int, thumbnail_workers: int):
+        self.cache = cache
+        self.client = client
+        self.max_bytes = max_bytes
+        self.thumbnail_workers = thumbnail_workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.inflight: Dict[str, asyncio.Future] = {}
+        # Attachment id -> {"url", "content_type", "filename"} from the latest channel reads
+        self.attachments: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @property
+    def thumbnails_enabled(self) -> bool:
+        return Image is not None and self.thumbnail_workers > 0
+
+    def register_attachment(self, attachment: Dict[str, Any]) -> Dict[str, Any]:
+        """Remember where an attachment can be fetched; returns it with a ``media_url`` on this API"""
+        attachment_id = str(attachment.get("id", ""))
+        if not attachment_id.isdigit() or not attachment.get("url"):
+            return attachment
+        self.attachments[attachment_id] = {
+            "url": attachment["url"],
+            "content_type": attachment.get("content_type") or "application/octet-stream",
+            "filename": attachment.get("filename") or attachment_id,
+        }
+        self.attachments.move_to_end(attachment_id)
+        while len(self.attachments) > ATTACHMENT_SOURCES_LIMIT:
+            self.attachments.popitem(last=False)
+        return {**attachment, "media_url": f"/api/media/attachments/{attachment_id}"}
+
+    async def _once(self, key: str, produce: Callable[[], Awaitable[Path]]) -> Path:
+        """Cached path for key, producing it at most once at a time per worker"""
+        path = self.cache.get(key)
+        if path is not None:
+            return path
+        pending = self.inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = self.inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            path = await produce()
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here so a future nobody else awaited does not log
+            raise
+        finally:
+            del self.inflight[key]
+
+    async def original(self, key: str, url: str) -> Path:
+        async def fetch() -> Path:
+            temp_path = self.cache.temp_path()
+            try:
+                async with self.client().stream("GET", url) as response:
+                    if response.status_code != 200:
+                        raise MediaUnavailable(f"Upstream answered {response.status_code}",
+                                               404 if response.status_code in (403, 404) else 502)
+                    if int(response.headers.get("content-length") or 0) > self.max_bytes:
+                        raise MediaUnavailable("Media is too large to proxy", 413)
+                    received = 0
+                    async with await anyio.open_file(temp_path, "wb") as file:
+                        async for chunk in response.aiter_bytes(WRITE_SIZE):
+                            received += len(chunk)
+                            if received > self.max_bytes:
+                                raise MediaUnavailable("Media is too large to proxy", 413)
+                            await file.write(chunk)
+                return self.cache.put(key, temp_path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+        return await self._once(key, fetch)
+
+    async def thumbnail(self, key: str, source: Path, size: int) -> Optional[Path]:
+        """A WebP of the cached source at most size pixels wide and high, or None if it cannot be decoded"""
+        async def render() -> Path:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.thumbnail_workers, mp_context=multiprocessing.get_context("spawn"))
+            temp_path = self.cache.temp_path()
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    self.pool, make_thumbnail, str(source), str(temp_path), size)
+                return self.cache.put(f"{key}@{size}", temp_path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+        try:
+            return await self._once(f"{key}@{size}", render)
+        except Exception as e:  # undecodable, oversized or unsupported image
+            logging.warning(f"No thumbnail for {key}: {e}")
+            return None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
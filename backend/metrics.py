@@ -0,0 +1,244 @@
+"""Prometheus metrics for the Revolution Roleplay API.
+
+A small in-process registry rendered in the Prometheus text format, plus the
+hooks server.py wires in: an ASGI middleware for request latency, a pymongo
+command listener for database timings, an httpx transport for upstream calls
+and an event-loop lag probe. Everything here is synchronous and lock-free on
+the hot path; the registry is only ever touched from the event loop thread,
+except the Mongo listener which only does single dict/list updates.
+"""
+import asyncio
+import bisect
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_INTERVAL = 0.5
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in list(self.values.items()):
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in list(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_labels = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, series in list(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.bucket_labels, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"]))
+db_operation_duration = registry.register(Histogram(
+    "db_operation_duration_seconds", "Database operation latency", ["collection", "operation"]))
+db_operation_errors = registry.register(Counter(
+    "db_operation_errors", "Failed database operations", ["collection", "operation"]))
+upstream_request_duration = registry.register(Histogram(
+    "upstream_request_duration_seconds", "Outbound HTTP latency", ["upstream", "status"]))
+upstream_request_errors = registry.register(Counter(
+    "upstream_request_errors", "Outbound HTTP requests that failed or returned 5xx", ["upstream", "reason"]))
+cache_requests = registry.register(Counter(
+    "cache_requests", "Cache lookups by result", ["cache", "result"]))
+event_loop_lag = registry.register(Gauge(
+    "event_loop_lag_seconds", "Most recent event loop scheduling delay"))
+event_loop_lag_histogram = registry.register(Histogram(
+    "event_loop_lag_seconds_distribution", "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; labels requests with the matched route template, not the raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - start, scope["method"], template, str(status_holder[0]))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times Motor/pymongo commands per collection and command name"""
+
+    def __init__(self):
+        self.pending: Dict[Tuple[int, int], str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self.pending[(event.request_id, event.operation_id or 0)] = (
+            collection if isinstance(collection, str) else event.database_name)
+
+    def _finish(self, event, failed: bool):
+        collection = self.pending.pop((event.request_id, event.operation_id or 0), "unknown")
+        db_operation_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        if failed:
+            db_operation_errors.inc(collection, event.command_name)
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+
+def observe_db_operation(collection: str, operation: str, seconds: float, failed: bool):
+    """Observer hook for the SQLite backend, matching MongoCommandMetrics' labels"""
+    db_operation_duration.observe(seconds, collection, operation)
+    if failed:
+        db_operation_errors.inc(collection, operation)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording latency and errors for one named upstream"""
+
+    def __init__(self, upstream: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.upstream = upstream
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            upstream_request_errors.inc(self.upstream, "timeout")
+            upstream_request_duration.observe(time.perf_counter() - start, self.upstream, "timeout")
+            raise
+        except httpx.HTTPError:
+            upstream_request_errors.inc(self.upstream, "connection")
+            upstream_request_duration.observe(time.perf_counter() - start, self.upstream, "error")
+            raise
+        upstream_request_duration.observe(time.perf_counter() - start, self.upstream, str(response.status_code))
+        if response.status_code >= 500:
+            upstream_request_errors.inc(self.upstream, "status_5xx")
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        event_loop_lag.set(lag)
+        event_loop_lag_histogram.observe(lag)
@@ -0,0 +1,475 @@
+"""Move data between the PHP/MySQL deployment and the FastAPI database.
+
+    # MySQL dump (database.sql / mysqldump output) -> Mongo or SQLite
+    python migrate_data.py import-dump dump.sql --to mongodb://localhost:27017 --db revolution_rp
+
+    # Mongo or SQLite -> MySQL INSERT statements
+    python migrate_data.py export-dump out.sql --from mongodb://localhost:27017 --db revolution_rp
+
+    # Database to database, e.g. the embedded SQLite backend into Mongo
+    python migrate_data.py copy --from sqlite:///data/revolution.db --to mongodb://localhost:27017 --db revolution_rp
+
+Rows are streamed: the dump is read one statement at a time and documents are
+written with ``insert_many`` in batches, so memory is bounded by the batch size
+and the longest INSERT statement rather than the size of the data. Progress is
+written to a checkpoint file after every batch; rerunning the same command
+resumes where it stopped: after the rows already read for a dump, after the
+last id written for a copy (which reads each collection in id order, as a
+source's natural order can change between runs). Ids are kept, so documents already written by an
+interrupted batch are skipped as duplicates.
+
+Note: the PHP deployment stores bcrypt password hashes, which server.py cannot
+verify. Imported users keep their hash and need a password reset from an admin.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from storage import TABLES, open_database
+
+DEFAULT_BATCH_SIZE = 1000
+MIGRATED_COLLECTIONS = ["admin_users", "application_forms", "application_submissions", "changelogs", "discord_users"]
+TABLE_TO_COLLECTION = {spec.table: collection for collection, spec in TABLES.items()}
+MYSQL_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DUPLICATE_KEY = 11000
+
+# Defaults applied where the MySQL column is NULL or missing, matching the Pydantic models
+DOCUMENT_DEFAULTS = {
+    "admin_users": {"role": "staff", "allowed_forms": []},
+    "application_forms": {"is_active": True, "description": ""},
+    "application_submissions": {"status": "pending", "responses": {}},
+    "changelogs": {},
+    "discord_users": {"is_admin": False},
+}
+
+logger = logging.getLogger("migrate_data")
+
+load_dotenv(Path(__file__).parent / '.env')
+
+
+# MySQL dump parsing
+CREATE_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\((.*)\)", re.I | re.S)
+INSERT_RE = re.compile(r"INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.I)
+VALUE_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<open>\()|(?P<close>\))|(?P<comma>,)"
+    r"|'(?P<str>(?:[^'\\]|\\.|'')*)'"
+    r"|(?P<null>NULL)\b|(?P<bool>TRUE|FALSE)\b"
+    r"|(?P<num>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?))",
+    re.I | re.S)
+MYSQL_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+MYSQL_ESCAPE_RE = re.compile(r"\\(.)|''", re.S)
+COLUMN_DEF_RE = re.compile(r"^\s*`?(\w+)`?\s+\w+", re.I)
+NON_COLUMN_PREFIXES = ("PRIMARY", "KEY", "INDEX", "UNIQUE", "CONSTRAINT", "FOREIGN", "FULLTEXT", "CHECK")
+
+
+def unescape_mysql(text: str) -> str:
+    def _replace(match):
+        if match.group(0) == "''":
+            return "'"
+        char = match.group(1)
+        return MYSQL_ESCAPES.get(char, char)
+    return MYSQL_ESCAPE_RE.sub(_replace, text)
+
+
+def escape_mysql(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n")
+            .replace("\r", "\\r").replace("\0", "\\0").replace("\x1a", "\\Z"))
+
+
+STATEMENT_SPECIAL_RE = re.compile(r"['\"`;]")
+QUOTE_SPECIAL_RE = {quote: re.compile(r"\\.|" + quote, re.S) for quote in ("'", '"', "`")}
+
+
+def iter_statements(lines) -> Iterator[str]:
+    """Split a SQL dump into statements without holding more than one in memory"""
+    parts: List[str] = []
+    quote = None
+    for line in lines:
+        if quote is None and not parts:
+            stripped = line.lstrip()
+            if not stripped or stripped.startswith("--") or stripped.startswith("#"):
+                continue
+        start = 0
+        pos = 0
+        while True:
+            if quote:
+                match = QUOTE_SPECIAL_RE[quote].search(line, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                if match.group(0) == quote:
+                    quote = None
+                continue
+            match = STATEMENT_SPECIAL_RE.search(line, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if match.group(0) != ";":
+                quote = match.group(0)
+                continue
+            parts.append(line[start:match.start()])
+            statement = "".join(parts).strip()
+            parts = []
+            if statement:
+                yield statement
+            start = pos
+        rest = line[start:]
+        if parts or rest.strip():
+            parts.append(rest)
+    statement = "".join(parts).strip()
+    if statement:
+        yield statement
+
+
+def parse_create_table(statement: str) -> Optional[Tuple[str, List[str]]]:
+    match = CREATE_RE.match(statement)
+    if not match:
+        return None
+    columns = []
+    depth = 0
+    current = []
+    for char in match.group(2):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            columns.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    columns.append("".join(current))
+    names = []
+    for definition in columns:
+        if definition.strip().upper().startswith(NON_COLUMN_PREFIXES):
+            continue
+        column = COLUMN_DEF_RE.match(definition)
+        if column:
+            names.append(column.group(1))
+    return match.group(1), names
+
+
+def iter_insert_rows(statement: str, table_columns: Dict[str, List[str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    match = INSERT_RE.match(statement)
+    if not match:
+        return
+    table = match.group(1)
+    if match.group(2):
+        columns = [name.strip().strip("`") for name in match.group(2).split(",")]
+    else:
+        columns = table_columns.get(table)
+        if not columns:
+            raise ValueError(f"INSERT into {table} without a column list and no CREATE TABLE seen")
+    pos = match.end()
+    row: Optional[List[Any]] = None
+    while pos < len(statement):
+        token = VALUE_TOKEN_RE.match(statement, pos)
+        if not token:
+            if statement[pos:].strip():
+                raise ValueError(f"Unexpected SQL near: {statement[pos:pos + 40]!r}")
+            break
+        pos = token.end()
+        if token.group("open"):
+            row = []
+        elif token.group("close"):
+            yield table, dict(zip(columns, row))
+            row = None
+        elif token.group("comma"):
+            continue
+        elif token.group("str") is not None:
+            row.append(unescape_mysql(token.group("str")))
+        elif token.group("null"):
+            row.append(None)
+        elif token.group("bool"):
+            row.append(token.group("bool").upper() == "TRUE")
+        else:
+            number = token.group("num")
+            row.append(float(number) if any(c in number for c in ".eE") else int(number))
+
+
+def iter_dump_rows(path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    table_columns: Dict[str, List[str]] = {}
+    with open(path, encoding="utf-8") as dump:
+        for statement in iter_statements(dump):
+            head = statement[:20].upper()
+            if head.startswith("CREATE TABLE"):
+                parsed = parse_create_table(statement)
+                if parsed:
+                    table_columns[parsed[0]] = parsed[1]
+            elif head.startswith("INSERT"):
+                yield from iter_insert_rows(statement, table_columns)
+
+
+# Row <-> document conversion
+def parse_mysql_time(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace(" ", "T"))
+
+
+def row_to_document(collection: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    spec = TABLES[collection]
+    doc = dict(DOCUMENT_DEFAULTS.get(collection, {}))
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key in spec.json_columns:
+            value = json.loads(value) if isinstance(value, str) else value
+        elif key in spec.time_columns:
+            value = parse_mysql_time(value)
+        elif key in spec.bool_columns:
+            value = bool(value)
+        doc[key] = value
+    # updated_at only exists on the MySQL side
+    doc.pop("updated_at", None)
+    doc.setdefault("created_at" if collection != "application_submissions" else "submitted_at", datetime.utcnow())
+    return doc
+
+
+def sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return f"'{value.strftime(MYSQL_TIME_FORMAT)}'"
+    return f"'{escape_mysql(str(value))}'"
+
+
+def document_to_row(collection: str, doc: Dict[str, Any]) -> List[str]:
+    spec = TABLES[collection]
+    values = []
+    for column in spec.columns:
+        value = doc.get(column)
+        if column in spec.json_columns and value is not None:
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        values.append(sql_literal(value))
+    return values
+
+
+# Checkpointing and reporting
+class Checkpoint:
+    def __init__(self, path: Path, source: str):
+        self.path = path
+        self.source = source
+        self.done: Dict[str, int] = {}
+        self.last_id: Dict[str, str] = {}
+        if path.exists():
+            state = json.loads(path.read_text())
+            if state.get("source") == source:
+                self.done = state.get("done", {})
+                self.last_id = state.get("last_id", {})
+                logger.info(f"Resuming from checkpoint {path}: {self.done}")
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"source": self.source, "done": self.done, "last_id": self.last_id}))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+class Throughput:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+        self.first_seen: Dict[str, float] = {}
+        self.last_seen: Dict[str, float] = {}
+
+    def add(self, collection: str, written: int, skipped: int = 0):
+        now = time.perf_counter()
+        self.first_seen.setdefault(collection, now)
+        self.last_seen[collection] = now
+        self.counts[collection] = self.counts.get(collection, 0) + written
+        self.skipped[collection] = self.skipped.get(collection, 0) + skipped
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        lines = [f"{'collection':<26}{'rows':>10}{'skipped':>10}{'rows/s':>12}"]
+        for collection, count in self.counts.items():
+            span = self.last_seen[collection] - self.first_seen[collection]
+            rate = f"{count / span:.0f}" if span > 0.01 else "-"
+            lines.append(f"{collection:<26}{count:>10}{self.skipped[collection]:>10}{rate:>12}")
+        total = sum(self.counts.values())
+        lines.append(f"{'total':<26}{total:>10}{sum(self.skipped.values()):>10}{total / max(elapsed, 1e-9):>12.0f}")
+        lines.append(f"elapsed {elapsed:.1f}s")
+        return "\n".join(lines)
+
+
+class BatchWriter:
+    """Buffers documents per collection and flushes them with insert_many"""
+
+    def __init__(self, db, checkpoint: Checkpoint, batch_size: int, throughput: Throughput):
+        self.db = db
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.throughput = throughput
+        self.pending: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def add(self, collection: str, doc: Dict[str, Any]):
+        batch = self.pending.setdefault(collection, [])
+        batch.append(doc)
+        if len(batch) >= self.batch_size:
+            await self.flush(collection)
+
+    async def flush(self, collection: str):
+        batch = self.pending.pop(collection, [])
+        if not batch:
+            return
+        duplicates = 0
+        try:
+            await self.db[collection].insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+            duplicates = len(errors)
+        except DuplicateKeyError:
+            # SQLite rolls the whole batch back; retry one by one and skip the rows already present
+            for doc in batch:
+                try:
+                    await self.db[collection].insert_one(doc)
+                except DuplicateKeyError:
+                    duplicates += 1
+        self.throughput.add(collection, len(batch) - duplicates, duplicates)
+        self.checkpoint.done[collection] = self.checkpoint.done.get(collection, 0) + len(batch)
+        if "id" in batch[-1]:
+            self.checkpoint.last_id[collection] = batch[-1]["id"]
+        self.checkpoint.save()
+
+    async def flush_all(self):
+        for collection in list(self.pending):
+            await self.flush(collection)
+
+
+async def ensure_id_indexes(db):
+    for collection in MIGRATED_COLLECTIONS:
+        await db[collection].create_index("id", unique=True)
+
+
+# Commands
+async def import_dump(args):
+    client, db = open_database(args.to_url, args.db)
+    checkpoint = Checkpoint(Path(args.checkpoint), f"dump:{Path(args.dump).resolve()}")
+    throughput = Throughput()
+    writer = BatchWriter(db, checkpoint, args.batch_size, throughput)
+    await ensure_id_indexes(db)
+    seen: Dict[str, int] = {}
+    try:
+        for table, row in iter_dump_rows(Path(args.dump)):
+            collection = TABLE_TO_COLLECTION.get(table)
+            if collection is None:
+                continue
+            seen[collection] = seen.get(collection, 0) + 1
+            if seen[collection] <= checkpoint.done.get(collection, 0):
+                continue
+            await writer.add(collection, row_to_document(collection, row))
+        await writer.flush_all()
+    finally:
+        client.close()
+    checkpoint.clear()
+    print(throughput.report())
+
+
+async def copy_database(args):
+    source_client, source = open_database(args.from_url, args.source_db or args.db)
+    target_client, target = open_database(args.to_url, args.db)
+    checkpoint = Checkpoint(Path(args.checkpoint), f"copy:{args.from_url}/{args.source_db or args.db}")
+    throughput = Throughput()
+    writer = BatchWriter(target, checkpoint, args.batch_size, throughput)
+    await ensure_id_indexes(target)
+    try:
+        for collection in MIGRATED_COLLECTIONS:
+            last_id = checkpoint.last_id.get(collection)
+            query = {"id": {"$gt": last_id}} if last_id is not None else {}
+            async for doc in source[collection].find(query, {"_id": 0}).sort("id", 1):
+                await writer.add(collection, doc)
+            await writer.flush(collection)
+    finally:
+        source_client.close()
+        target_client.close()
+    checkpoint.clear()
+    print(throughput.report())
+
+
+async def export_dump(args):
+    client, db = open_database(args.from_url, args.db)
+    throughput = Throughput()
+    try:
+        with open(args.dump, "w", encoding="utf-8") as out:
+            out.write("-- Revolution Roleplay data export\nSET NAMES utf8mb4;\n\n")
+            for collection in MIGRATED_COLLECTIONS:
+                spec = TABLES[collection]
+                if spec.table == "discord_users":
+                    continue  # not part of the MySQL schema
+                columns = ", ".join(spec.columns)
+                batch: List[str] = []
+
+                def write_batch():
+                    out.write(f"INSERT INTO {spec.table} ({columns}) VALUES\n")
+                    out.write(",\n".join(batch))
+                    out.write(";\n")
+                    throughput.add(collection, len(batch))
+                    batch.clear()
+
+                async for doc in db[collection].find({}, {"_id": 0}):
+                    batch.append("(" + ", ".join(document_to_row(collection, doc)) + ")")
+                    if len(batch) >= args.batch_size:
+                        write_batch()
+                if batch:
+                    write_batch()
+    finally:
+        client.close()
+    print(throughput.report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move data between the MySQL deployment and the API database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub):
+        sub.add_argument("--db", default=os.environ.get("DB_NAME", "revolution_rp"), help="database name")
+        sub.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        sub.add_argument("--checkpoint", default="migrate_data.checkpoint.json")
+
+    sub = subparsers.add_parser("import-dump", help="stream a MySQL dump into Mongo or SQLite")
+    sub.add_argument("dump")
+    sub.add_argument("--to", dest="to_url", default=os.environ.get("MONGO_URL"), required="MONGO_URL" not in os.environ)
+    add_common(sub)
+
+    sub = subparsers.add_parser("export-dump", help="write the database out as MySQL INSERT statements")
+    sub.add_argument("dump")
+    sub.add_argument("--from", dest="from_url", default=os.environ.get("MONGO_URL"), required="MONGO_URL" not in os.environ)
+    add_common(sub)
+
+    sub = subparsers.add_parser("copy", help="copy between two database URLs (mongodb:// or sqlite://)")
+    sub.add_argument("--from", dest="from_url", required=True)
+    sub.add_argument("--to", dest="to_url", required=True)
+    sub.add_argument("--source-db", help="source database name if different from --db")
+    add_common(sub)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    command = {"import-dump": import_dump, "export-dump": export_dump, "copy": copy_database}[args.command]
+    asyncio.run(command(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Opt-in slow-query profiler.
+
+Wraps the database handle server.py uses so every collection call made by a
+route is timed. Operations slower than the threshold are written to the capped
+``slow_queries`` collection with their filter shape (values replaced by type
+names), sort, returned document count and the winning plan from ``explain()``.
+Plans are fetched in the background, at most once per shape per
+``EXPLAIN_INTERVAL`` seconds, so the profiled request never waits on them.
+
+Enable with SLOW_QUERY_PROFILER=1 and tune with SLOW_QUERY_MS.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SLOW_QUERIES_COLLECTION = "slow_queries"
+SLOW_QUERIES_MAX_DOCUMENTS = 10000
+SLOW_QUERIES_MAX_BYTES = 16 * 1024 * 1024
+EXPLAIN_INTERVAL = 300
+
+# Collection methods whose first argument (or ``filter``) is a query
+TIMED_METHODS = {
+    "find_one", "find_one_and_update", "find_one_and_delete", "find_one_and_replace",
+    "update_one", "update_many", "replace_one", "delete_one", "delete_many", "count_documents",
+}
+# Timed as well, but carry no query to shape or explain
+WRITE_METHODS = {"insert_one", "insert_many", "bulk_write"}
+
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values with their type names so equal-shaped queries group together"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return "<array>"
+    return f"<{type(value).__name__}>"
+
+
+def shape_key(collection: str, operation: str, filter_shape: Any, sort: Any) -> str:
+    return json.dumps([collection, operation, filter_shape, sort], sort_keys=True, default=str)
+
+
+def _sort_spec(sort) -> Optional[List[List[Any]]]:
+    if not sort:
+        return None
+    if isinstance(sort, str):
+        return [[sort, 1]]
+    return [[key, direction] for key, direction in sort]
+
+
+def winning_plan(explain: Dict[str, Any]) -> Any:
+    planner = explain.get("queryPlanner") or explain.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+    return planner.get("winningPlan", explain)
+
+
+class SlowQueryRecorder:
+    def __init__(self, db, threshold_ms: float):
+        self.db = db
+        self.threshold = threshold_ms / 1000
+        self.last_explained: Dict[str, float] = {}
+        self.tasks: set = set()
+
+    async def setup(self):
+        try:
+            await self.db.create_collection(
+                SLOW_QUERIES_COLLECTION, capped=True,
+                size=SLOW_QUERIES_MAX_BYTES, max=SLOW_QUERIES_MAX_DOCUMENTS)
+        except Exception as e:
+            # Already exists (CollectionInvalid / NamespaceExists)
+            logging.debug(f"slow_queries collection not created: {e}")
+
+    def observe(self, collection, operation: str, query: Optional[dict], sort, limit: int,
+                seconds: float, docs_returned: Optional[int]):
+        if seconds < self.threshold:
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._record(collection, operation, query or {}, sort, limit, seconds, docs_returned))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _record(self, collection, operation, query, sort, limit, seconds, docs_returned):
+        filter_shape = query_shape(query)
+        sort_spec = _sort_spec(sort)
+        key = shape_key(collection.name, operation, filter_shape, sort_spec)
+        plan = None
+        now = time.monotonic()
+        if operation not in WRITE_METHODS and now - self.last_explained.get(key, -EXPLAIN_INTERVAL) >= EXPLAIN_INTERVAL:
+            self.last_explained[key] = now
+            try:
+                cursor = collection.find(query)
+                if sort:
+                    cursor = cursor.sort(sort)
+                if limit:
+                    cursor = cursor.limit(limit)
+                plan = winning_plan(await cursor.explain())
+            except Exception as e:
+                plan = {"error": str(e)}
+        try:
+            await self.db[SLOW_QUERIES_COLLECTION].insert_one({
+                "shape_key": key,
+                "collection": collection.name,
+                "operation": operation,
+                "filter_shape": json.dumps(filter_shape, sort_keys=True),
+                "sort": sort_spec,
+                "limit": limit or None,
+                "duration_ms": round(seconds * 1000, 3),
+                "docs_returned": docs_returned,
+                "plan": json.dumps(plan, default=str) if plan is not None else None,
+                "recorded_at": datetime.utcnow(),
+            })
+        except Exception as e:
+            logging.error(f"Failed to record slow query: {e}")
+
+    async def top_shapes(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Slowest query shapes, worst maximum first"""
+        groups: Dict[str, Dict[str, Any]] = {}
+        async for entry in self.db[SLOW_QUERIES_COLLECTION].find({}, {"_id": 0}):
+            group = groups.get(entry["shape_key"])
+            if group is None:
+                group = groups[entry["shape_key"]] = {
+                    "collection": entry["collection"],
+                    "operation": entry["operation"],
+                    "filter_shape": json.loads(entry["filter_shape"]),
+                    "sort": entry.get("sort"),
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "max_docs_returned": 0,
+                    "plan": None,
+                    "last_seen": entry["recorded_at"],
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            group["max_docs_returned"] = max(group["max_docs_returned"], entry.get("docs_returned") or 0)
+            group["last_seen"] = max(group["last_seen"], entry["recorded_at"])
+            if entry.get("plan"):
+                group["plan"] = json.loads(entry["plan"])
+        shapes = sorted(groups.values(), key=lambda group: group["max_ms"], reverse=True)[:limit]
+        for group in shapes:
+            group["avg_ms"] = round(group.pop("total_ms") / group["count"], 3)
+        return shapes
+
+
+class ProfiledCursor:
+    def __init__(self, cursor, collection, recorder: SlowQueryRecorder, query):
+        self._cursor = cursor
+        self._collection = collection
+        self._recorder = recorder
+        self._query = query
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction if direction is not None else 1)] if isinstance(key_or_list, str) else key_or_list
+        self._cursor = self._cursor.sort(key_or_list, direction) if direction is not None else self._cursor.sort(key_or_list)
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def skip(self, count: int):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    async def to_list(self, length=None):
+        start = time.perf_counter()
+        docs = await self._cursor.to_list(length)
+        self._recorder.observe(self._collection, "find", self._query, self._sort, self._limit,
+                               time.perf_counter() - start, len(docs))
+        return docs
+
+    async def explain(self):
+        return await self._cursor.explain()
+
+    def __aiter__(self):
+        # Streaming scans (index builds, migrations) are not request queries
+        return self._cursor.__aiter__()
+
+
+class ProfiledCollection:
+    def __init__(self, collection, recorder: SlowQueryRecorder):
+        self._collection = collection
+        self._recorder = recorder
+        self.name = collection.name
+
+    def find(self, filter=None, *args, **kwargs):
+        return ProfiledCursor(self._collection.find(filter, *args, **kwargs), self._collection, self._recorder, filter)
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in TIMED_METHODS and name not in WRITE_METHODS:
+            return attr
+
+        async def timed(*args, **kwargs):
+            query = None if name in WRITE_METHODS else args[0] if args else kwargs.get("filter")
+            start = time.perf_counter()
+            result = await attr(*args, **kwargs)
+            if isinstance(result, dict) or result is None:
+                docs = 0 if result is None else 1
+            elif isinstance(result, int):
+                docs = result
+            else:
+                docs = None
+            self._recorder.observe(self._collection, name, query, kwargs.get("sort"), 0,
+                                   time.perf_counter() - start, docs)
+            return result
+        return timed
+
+
+class QueryObservers:
+    """Fans each timed operation out to several observers"""
+
+    def __init__(self, observers):
+        self.observers = list(observers)
+
+    def observe(self, *args):
+        for observer in self.observers:
+            observer.observe(*args)
+
+
+class ProfiledDatabase:
+    """Database proxy handing out profiled collections"""
+
+    def __init__(self, db, recorder: SlowQueryRecorder):
+        self._db = db
+        self._recorder = recorder
+        self._collections: Dict[str, ProfiledCollection] = {}
+
+    def __getitem__(self, name: str):
+        if name == SLOW_QUERIES_COLLECTION:
+            return self._db[name]
+        if name not in self._collections:
+            self._collections[name] = ProfiledCollection(self._db[name], self._recorder)
+        return self._collections[name]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attr = getattr(self._db, name)
+        if callable(attr) and not hasattr(attr, "find"):
+            return attr
+        return self[name]
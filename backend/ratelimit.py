@@ -0,0 +1,163 @@
+"""Token-bucket rate limiting for the public and login endpoints.
+
+A policy such as ``10/minute`` is a bucket holding 10 tokens that refills at
+10 per minute; every request takes one token per identity it is charged to
+(client IP, and where known the Discord id or username) and is refused with
+the time until a token is available when any of those buckets is empty.
+
+Each bucket is stored as a single number, the time at which it will be full
+again (the "theoretical arrival time" of the generic cell rate algorithm,
+which behaves exactly like a token bucket). ``MemoryBackend`` keeps those in
+a dict per worker process; ``DatabaseBackend`` keeps them in a collection so
+all workers share one budget, updating with compare-and-set so concurrent
+workers cannot both spend the last token.
+"""
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from metrics import registry, Counter
+
+PERIODS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+POLICY_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+)\s*$")
+MEMORY_MAX_KEYS = 100_000  # full buckets are dropped when a worker tracks more identities than this
+CAS_ATTEMPTS = 3
+
+rate_limited_requests = registry.register(Counter(
+    "rate_limited_requests", "Requests refused by a rate limit policy", ["policy"]))
+
+
+class Policy(NamedTuple):
+    name: str
+    limit: int  # bucket size: requests allowed in a burst
+    period: float  # seconds to refill the whole bucket
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.limit
+
+
+def parse_policy(name: str, spec: str) -> Optional[Policy]:
+    """``"10/minute"``, ``"5/30s"`` or ``"100/hour"``; empty or ``"0"`` disables the policy"""
+    if not spec.strip() or spec.strip() == "0":
+        return None
+    match = POLICY_RE.match(spec.lower())
+    limit, multiple, unit = match.groups() if match else ("0", "", "")
+    unit = unit if unit in PERIODS or len(unit) < 4 else unit.removesuffix("s")  # "minutes", not "ms"
+    if unit not in PERIODS or int(limit) == 0:
+        raise ValueError(f"Invalid rate limit for {name}: {spec!r}")
+    return Policy(name, int(limit), int(multiple or 1) * PERIODS[unit])
+
+
+def take(tat: Optional[float], now: float, policy: Policy) -> Tuple[float, float]:
+    """Spend one token; returns (new time the bucket is full, 0) or (unchanged, seconds until a token is free)"""
+    new_tat = max(tat or now, now) + policy.interval
+    wait = new_tat - now - policy.period
+    if wait > 0:
+        return tat, wait
+    return new_tat, 0.0
+
+
+class RateLimited(Exception):
+    def __init__(self, policy: Policy, retry_after: float):
+        super().__init__(f"Rate limit {policy.name} exceeded")
+        self.policy = policy
+        self.retry_after = retry_after
+
+
+class MemoryBackend:
+    """Buckets for this worker process only"""
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets: Dict[str, float] = {}
+
+    async def take(self, key: str, policy: Policy, now: float) -> float:
+        tat, wait = take(self.buckets.get(key), now, policy)
+        if not wait:
+            self.buckets[key] = tat
+            if len(self.buckets) > self.max_keys:
+                self.prune(now)
+        return wait
+
+    async def wait(self, key: str, policy: Policy, now: float) -> float:
+        return take(self.buckets.get(key), now, policy)[1]
+
+    def prune(self, now: float):
+        """Forget buckets that have refilled completely; they behave exactly like new ones"""
+        self.buckets = {key: tat for key, tat in self.buckets.items() if tat > now}
+
+
+class DatabaseBackend:
+    """Buckets in a collection ({key, tat, expires_at}) shared by every worker"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def setup(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        # The SQLite backend has no TTL monitor
+        await self.collection.delete_many({"expires_at": {"$lte": datetime.utcnow()}})
+
+    async def take(self, key: str, policy: Policy, now: float) -> float:
+        for _ in range(CAS_ATTEMPTS):
+            bucket = await self.collection.find_one({"key": key}, {"_id": 0, "tat": 1})
+            tat, wait = take(bucket["tat"] if bucket else None, now, policy)
+            if wait:
+                return wait
+            update = {"tat": tat, "expires_at": datetime.utcfromtimestamp(tat)}
+            if bucket is None:
+                try:
+                    await self.collection.insert_one({"key": key, **update})
+                    return 0.0
+                except DuplicateKeyError:
+                    continue
+            result = await self.collection.update_one({"key": key, "tat": bucket["tat"]}, {"$set": update})
+            if result.modified_count:
+                return 0.0
+        # Lost every race for this bucket: it is under heavy contention, so back off
+        return policy.interval
+
+    async def wait(self, key: str, policy: Policy, now: float) -> float:
+        bucket = await self.collection.find_one({"key": key}, {"_id": 0, "tat": 1})
+        return take(bucket["tat"] if bucket else None, now, policy)[1]
+
+
+class RateLimiter:
+    def __init__(self, policies: Dict[str, Optional[Policy]], backend=None, clock=time.time):
+        self.policies = policies
+        self.backend = backend or MemoryBackend()
+        self.fallback = self.backend if isinstance(self.backend, MemoryBackend) else MemoryBackend()
+        self.clock = clock
+
+    async def hit(self, policy_name: str, *identities: str):
+        """Charge one request to each identity's bucket; raises RateLimited if any of them is empty"""
+        await self._charge(policy_name, identities, spend=True)
+
+    async def check(self, policy_name: str, *identities: str):
+        """Raise RateLimited if any identity's bucket is empty, without spending a token"""
+        await self._charge(policy_name, identities, spend=False)
+
+    async def _charge(self, policy_name: str, identities: Tuple[str, ...], spend: bool):
+        policy = self.policies.get(policy_name)
+        if policy is None:
+            return
+        now = self.clock()
+        retry_after = 0.0
+        for identity in identities:
+            key = f"{policy.name}:{identity}"
+            try:
+                wait = await (self.backend.take if spend else self.backend.wait)(key, policy, now)
+            except Exception as e:
+                # The shared store is down: keep limiting, per worker, rather than failing the request
+                logging.error(f"Rate limit backend failed, using this worker's buckets: {e}")
+                wait = await (self.fallback.take if spend else self.fallback.wait)(key, policy, now)
+            retry_after = max(retry_after, wait)
+        if retry_after:
+            rate_limited_requests.inc(policy.name)
+            raise RateLimited(policy, retry_after)
@@ -0,0 +1,310 @@
+"""Per-request sampling profiler.
+
+An admin sends ``X-Profile-Request: 1`` (or ``?profile=1``) with a bearer
+token; the middleware checks the token with the ``authorize`` callback and,
+if allowed, profiles only that request:
+
+* a sampler thread snapshots the event loop thread's Python stack every
+  ``interval`` seconds, keeping only stacks that pass through the request's
+  own middleware frame (i.e. taken while the request's task is running), so
+  concurrent requests do not leak into the profile;
+* database operations (via ``SpanObserver`` on the profiled db proxy) and
+  outbound HTTP calls (via ``TracedTransport``) are recorded as spans.
+
+The result is a speedscope file (https://www.speedscope.app) with a sampled
+profile for the on-loop stacks and evented profiles for the spans, handed to
+the ``store`` callback under a server-made id returned in ``X-Profile-Id``.
+A client's own ``X-Request-Id`` is only stored and echoed for correlation, and
+only if it matches ``REQUEST_ID_RE``: it ends up in response headers.
+"""
+import contextvars
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import httpx
+
+from ids import new_id
+
+PROFILE_HEADER = b"x-profile-request"
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+DEFAULT_INTERVAL = 0.001
+MAX_SAMPLES = 50000
+
+current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "current_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, profile_id: str, method: str, path: str, frame):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.frame = frame  # the middleware's own frame, on the loop thread's stack whenever the request runs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.status = 500
+        # (seconds since the previous sampler tick, stack of code objects outermost first)
+        self.samples: List[Tuple[float, Tuple[Any, ...]]] = []
+        # (kind, name, start, end)
+        self.spans: List[Tuple[str, str, float, float]] = []
+
+    def add_span(self, kind: str, name: str, start: float, end: float):
+        self.spans.append((kind, name, start, end))
+
+    def summary(self) -> Dict[str, Any]:
+        end = self.end or time.perf_counter()
+        totals: Dict[str, float] = {}
+        for kind, _, start, stop in self.spans:
+            totals[kind] = totals.get(kind, 0.0) + (stop - start)
+        return {
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "samples": len(self.samples),
+            "span_ms": {kind: round(total * 1000, 3) for kind, total in totals.items()},
+            "span_count": len(self.spans),
+        }
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Any, int] = {}
+
+        def frame_id(key, name: str, file: Optional[str] = None, line: Optional[int] = None) -> int:
+            index = frame_index.get(key)
+            if index is None:
+                index = frame_index[key] = len(frames)
+                frame = {"name": name}
+                if file:
+                    frame["file"] = file
+                    frame["line"] = line
+                frames.append(frame)
+            return index
+
+        end = self.end or time.perf_counter()
+        duration = (end - self.start) * 1000
+        samples, weights = [], []
+        for weight, stack in self.samples:
+            samples.append([
+                frame_id(code, getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+                for code in stack
+            ])
+            weights.append(round(weight * 1000, 4))
+        title = f"{self.method} {self.path}"
+        profiles = [{
+            "type": "sampled",
+            "name": f"{title}: Python stacks while the request was running",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": duration,
+            "samples": samples,
+            "weights": weights,
+        }]
+
+        # Concurrent spans (e.g. gathered queries) cannot nest, so split them into lanes
+        lanes: List[List[Tuple[str, str, float, float]]] = []
+        for span in sorted(self.spans, key=lambda span: span[2]):
+            for lane in lanes:
+                if lane[-1][3] <= span[2]:
+                    lane.append(span)
+                    break
+            else:
+                lanes.append([span])
+        for number, lane in enumerate(lanes, 1):
+            events = []
+            for kind, name, start, stop in lane:
+                index = frame_id((kind, name), f"{kind}: {name}")
+                events.append({"type": "O", "frame": index, "at": (start - self.start) * 1000})
+                events.append({"type": "C", "frame": index, "at": (stop - self.start) * 1000})
+            profiles.append({
+                "type": "evented",
+                "name": f"{title}: database and HTTP spans" + (f" (lane {number})" if len(lanes) > 1 else ""),
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": duration,
+                "events": events,
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{title} ({self.profile_id})",
+            "exporter": "revolution-api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+class StackSampler:
+    """One background thread sampling the event loop thread for all active profiles"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.profiles: Dict[Any, RequestProfile] = {}
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.loop_thread_id: Optional[int] = None
+        self.saved_switch_interval: Optional[float] = None
+
+    def add(self, profile: RequestProfile):
+        with self.lock:
+            self.profiles[profile.frame] = profile
+            self.loop_thread_id = threading.get_ident()
+            if self.thread is None:
+                # The sampler only runs when it gets the GIL; hand it over more often while profiling
+                self.saved_switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.saved_switch_interval, self.interval))
+                self.thread = threading.Thread(target=self.run, name="request-profiler", daemon=True)
+                self.thread.start()
+
+    def remove(self, profile: RequestProfile):
+        with self.lock:
+            self.profiles.pop(profile.frame, None)
+
+    def run(self):
+        last_tick = time.perf_counter()
+        while True:
+            with self.lock:
+                if not self.profiles:
+                    self.thread = None
+                    sys.setswitchinterval(self.saved_switch_interval)
+                    return
+                now = time.perf_counter()
+                frame = sys._current_frames().get(self.loop_thread_id)
+                profile, stack = self._stack(frame)
+                if profile is not None and len(profile.samples) < MAX_SAMPLES:
+                    profile.samples.append((now - last_tick, stack))
+                last_tick = now
+            time.sleep(self.interval)
+
+    def _stack(self, frame) -> Tuple[Optional[RequestProfile], Tuple[Any, ...]]:
+        """The profile whose request is running in frame's stack, and the stack below its middleware frame"""
+        stack = []
+        while frame is not None:
+            profile = self.profiles.get(frame)
+            if profile is not None:
+                stack.reverse()
+                return profile, tuple(stack)
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        return None, ()
+
+
+class SpanObserver:
+    """Query observer for profiler.ProfiledDatabase recording database spans"""
+
+    def observe(self, collection, operation: str, query, sort, limit: int, seconds: float, docs_returned):
+        profile = current_profile.get()
+        if profile is not None:
+            end = time.perf_counter()
+            profile.add_span("db", f"{operation} {collection.name}", end - seconds, end)
+
+
+class TracedTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording outbound calls as spans on the active profile"""
+
+    def __init__(self, upstream: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.upstream = upstream
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        profile = current_profile.get()
+        if profile is None:
+            return await self.transport.handle_async_request(request)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            profile.add_span(
+                "http", f"{self.upstream} {request.method} {request.url.host}{request.url.path} -> {status}",
+                start, time.perf_counter())
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class RequestProfilerMiddleware:
+    """Pure ASGI middleware profiling requests that ask for it and pass ``authorize``"""
+
+    def __init__(self, app, authorize: Callable[[str], Awaitable[bool]],
+                 store: Callable[[Dict[str, Any]], Awaitable[None]], interval: float = DEFAULT_INTERVAL):
+        self.app = app
+        self.authorize = authorize
+        self.store = store
+        self.sampler = StackSampler(interval)
+
+    def _requested(self, scope) -> Tuple[bool, Optional[str], Optional[str]]:
+        requested, token, request_id = False, None, None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                requested = value.strip() not in (b"", b"0", b"false")
+            elif name == b"authorization":
+                scheme, _, credentials = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer":
+                    token = credentials.strip()
+            elif name == REQUEST_ID_HEADER:
+                value = value.decode("latin-1")
+                request_id = value if REQUEST_ID_RE.fullmatch(value) else None
+        if not requested:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            requested = "1" in query.get("profile", [])
+        return requested, token, request_id
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested, token, request_id = self._requested(scope)
+        if not requested or not token:
+            await self.app(scope, receive, send)
+            return
+        try:
+            allowed = await self.authorize(token)
+        except Exception:
+            allowed = False
+        if not allowed:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_id()
+        request_id = request_id or profile_id
+        profile = RequestProfile(profile_id, scope["method"], scope["path"], sys._getframe())
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1")),
+                    (b"x-profile-id", profile_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        context_token = current_profile.set(profile)
+        self.sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.end = time.perf_counter()
+            self.sampler.remove(profile)
+            current_profile.reset(context_token)
+            try:
+                await self.store({
+                    "id": profile_id,
+                    "request_id": request_id,
+                    "method": profile.method,
+                    "path": profile.path,
+                    "status": profile.status,
+                    **profile.summary(),
+                    "speedscope": json.dumps(profile.to_speedscope()),
+                    "created_at": datetime.utcnow(),
+                })
+            except Exception as e:
+                logging.error(f"Failed to store request profile {profile_id}: {e}")
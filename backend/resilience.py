@@ -0,0 +1,186 @@
+"""Deadlines, timeouts and circuit breakers for outbound calls.
+
+``DeadlineMiddleware`` gives every request a time budget, stored in a
+context variable. ``ResilientTransport`` wraps the httpx transport of each
+upstream (discord, fivem, webhook) and:
+
+* caps every call at the smaller of the upstream's own timeout and what is
+  left of the request budget, failing immediately once the budget is spent;
+* consults the upstream's ``CircuitBreaker``: after ``failure_threshold``
+  consecutive failures (timeouts, connection errors, 5xx) the breaker opens
+  and calls fail fast with ``UpstreamUnavailable`` for ``reset_timeout``
+  seconds, then a single trial call decides whether it closes again.
+
+Callers catch the httpx errors as before and serve cached or fallback data.
+"""
+import asyncio
+import contextvars
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from metrics import registry, Gauge
+
+DEADLINE_HEADER = b"x-request-timeout"
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+upstream_circuit_state = registry.register(Gauge(
+    "upstream_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)", ["upstream"]))
+
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Raised without calling the upstream because its breaker is open"""
+
+    def __init__(self, breaker: "CircuitBreaker", request: httpx.Request):
+        super().__init__(f"Circuit open for {breaker.name}", request=request)
+        self.breaker = breaker
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """Raised without calling the upstream because the request budget is spent"""
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.last_error: Optional[str] = None
+        self.total_failures = 0
+        self.total_rejected = 0
+        upstream_circuit_state.set(STATE_VALUES[CLOSED], name)
+
+    def _set_state(self, state: str):
+        self.state = state
+        upstream_circuit_state.set(STATE_VALUES[state], self.name)
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.total_rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.trial_in_flight = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+            self.opened_at = None
+
+    def record_failure(self, reason: str):
+        self.failures += 1
+        self.total_failures += 1
+        self.last_error = reason
+        self.trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._set_state(OPEN)
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, object]:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 3)
+        return {
+            "upstream": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_in": retry_in,
+            "last_error": self.last_error,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+        }
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """httpx transport applying the request deadline, a per-upstream timeout and a circuit breaker"""
+
+    def __init__(self, breaker: CircuitBreaker, timeout: float,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.breaker = breaker
+        self.timeout = timeout
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        timeout = self.timeout
+        remaining = remaining_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("Request deadline exceeded before calling upstream", request=request)
+            timeout = min(timeout, remaining)
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.breaker, request)
+
+        phases = dict(request.extensions.get("timeout") or {})
+        request.extensions["timeout"] = {
+            phase: min(value, timeout) if value is not None else timeout
+            for phase, value in {**dict.fromkeys(("connect", "read", "write", "pool")), **phases}.items()
+        }
+        try:
+            response = await asyncio.wait_for(self.transport.handle_async_request(request), timeout)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure("timeout")
+            raise httpx.ReadTimeout(f"{self.breaker.name} did not answer within {timeout:.3f}s", request=request)
+        except httpx.TimeoutException:
+            self.breaker.record_failure("timeout")
+            raise
+        except httpx.HTTPError as e:
+            self.breaker.record_failure(type(e).__name__)
+            raise
+        except asyncio.CancelledError:
+            self.breaker.trial_in_flight = False
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure(f"status {response.status_code}")
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware giving each request a time budget; clients may ask for less via X-Request-Timeout"""
+
+    def __init__(self, app, budget: float):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = self.budget
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER:
+                try:
+                    budget = max(0.0, min(budget, float(value)))
+                except ValueError:
+                    pass
+                break
+        token = request_deadline.set(time.monotonic() + budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
@@ -0,0 +1,47 @@
+"""Production launcher: N uvicorn worker processes serving ``server:create_app``.
+
+Each worker builds its own app, so the database client, the upstream HTTP
+pools and the background tasks are created after the worker starts rather
+than being shared across a fork. Workers share state only through the
+database; the caches each one keeps in memory follow the others' writes
+through the change feed (changefeed.py).
+
+    python run.py --workers 4 --port 8001
+
+WEB_CONCURRENCY sets the default worker count (one per CPU otherwise).
+"""
+import argparse
+import os
+
+import uvicorn
+
+from settings import get_settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--timeout-graceful-shutdown", type=int, default=10,
+                        help="seconds a worker waits for open requests before its lifespan shutdown runs")
+    args = parser.parse_args()
+
+    # Fail here, once, on missing or malformed configuration instead of in every worker
+    settings = get_settings()
+
+    uvicorn.run(
+        "server:create_app", factory=True,
+        host=args.host, port=args.port, workers=args.workers,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.timeout_graceful_shutdown,
+        proxy_headers=settings.proxy_headers,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,64 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
+from fastapi.encoders import jsonable_encoder
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import json
+import asyncio
+import time
 import logging
 import httpx
 import hashlib
+import hmac
 import jwt
-import aiohttp
-import base64
-from pathlib import Path
+import html
+import re
+import bisect
+import math
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import uuid
+from typing import List, Optional, Dict, Any, Iterable, Set, Tuple
 from datetime import datetime, timedelta
-from urllib.parse import urlencode
+from pathlib import Path
+from urllib.parse import quote, urlencode, urlsplit
+from collections import deque
+from contextlib import asynccontextmanager
+from ids import new_id, is_id, is_legacy_id
+from settings import Settings, get_settings
+from storage import open_database
+from static_site import SiteMount, StaticSite
+from profiler import SlowQueryRecorder, ProfiledDatabase, QueryObservers
+from request_profiler import RequestProfilerMiddleware, SpanObserver, TracedTransport
+from resilience import CircuitBreaker, ResilientTransport, DeadlineMiddleware, UpstreamUnavailable
+from ratelimit import RateLimiter, RateLimited, MemoryBackend, DatabaseBackend, parse_policy
+from bodylimit import BodyLimitMiddleware
+from blobstore import BlobStore, UploadOverflow, RangeNotSatisfiable, parse_range
+from changefeed import ChangeFeed
+from mediaproxy import MediaProxy, DiskCache, MediaUnavailable, THUMBNAIL_SIZES, THUMBNAIL_SOURCE_TYPES, THUMBNAIL_TYPE
+from metrics import (
+    registry, MetricsMiddleware, MongoCommandMetrics, InstrumentedTransport,
+    observe_db_operation, record_cache, monitor_event_loop_lag
+)
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+# Per-process state, bound by create_app() and the lifespan of the app it returns
+settings: Settings
+client = None
+db = None
+request_profiles = None  # written outside the profiled proxy
+slow_query_recorder: Optional[SlowQueryRecorder] = None
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+REQUEST_PROFILE_LIMIT = 500  # newest profiles kept
 
-# Discord Configuration
-DISCORD_BOT_TOKEN = os.environ['DISCORD_BOT_TOKEN']
-DISCORD_CLIENT_ID = os.environ['DISCORD_CLIENT_ID']
-DISCORD_CLIENT_SECRET = os.environ['DISCORD_CLIENT_SECRET']
-DISCORD_GUILD_ID = os.environ['DISCORD_GUILD_ID']
-DISCORD_ADMIN_ROLE_ID = os.environ['DISCORD_ADMIN_ROLE_ID']
-DISCORD_CHANNEL_ID = os.environ['DISCORD_CHANNEL_ID']
-DISCORD_REDIRECT_URI = "https://1dd055fe-5269-4816-a104-0e822c872d5b.preview.emergentagent.com/api/auth/discord/callback"
+# Upstream resilience configuration
+UPSTREAM_TIMEOUTS = {"discord": 5.0, "discord_cdn": 10.0, "fivem": 2.0, "webhook": 5.0}  # seconds per call
+PER_HOST_UPSTREAMS = {"webhook"}  # one breaker per receiving host, see webhook_upstream()
+upstream_breakers: Dict[str, CircuitBreaker] = {}
+upstream_fallbacks: Dict[str, Any] = {}  # last good response per upstream-backed endpoint
 
-# Create the main app without a prefix
-app = FastAPI()
+rate_limiter: Optional[RateLimiter] = None  # None when RATE_LIMIT_ENABLED is off
+blob_store: Optional[BlobStore] = None
+media_proxy: Optional[MediaProxy] = None
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -44,10 +67,14 @@ api_router = APIRouter(prefix="/api")
 JWT_SECRET = "revolution_roleplay_secret_key_2025"
 JWT_ALGORITHM = "HS256"
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Live submissions feed configuration
+EVENT_KEEPALIVE_SECONDS = 15
 
 # Models
 class AdminUser(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     username: str
     password_hash: str
     role: str = "admin"  # admin, staff
@@ -56,7 +83,7 @@ class AdminUser(BaseModel):
     created_by: Optional[str] = None
 
 class StaffUser(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     username: str
     password_hash: str
     role: str = "staff"
@@ -65,7 +92,7 @@ class StaffUser(BaseModel):
     created_by: str
 
 class DiscordUser(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     discord_id: str
     discord_username: str
     discord_avatar: Optional[str] = None
@@ -90,9 +117,11 @@ class UserUpdate(BaseModel):
     allowed_forms: Optional[List[str]] = None
 
 class Changelog(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     title: str
     content: str
+    content_html: Optional[str] = None  # sanitized HTML rendered at write time
+    excerpt: Optional[str] = None
     version: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: str
@@ -107,19 +136,21 @@ class DiscordNews(BaseModel):
     content: str
     author_username: str
     author_avatar: Optional[str] = None
+    author_id: Optional[str] = None
+    author_avatar_url: Optional[str] = None  # served by the media proxy
     timestamp: str
     attachments: List[Dict[str, Any]] = []
 
 class ApplicationFormField(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     label: str
-    field_type: str  # text, textarea, select, radio, checkbox
-    options: Optional[List[str]] = None
+    field_type: str  # text, textarea, select, radio, checkbox, file
+    options: Optional[List[str]] = None  # choices, or accepted MIME types ("image/*") for file fields
     required: bool = False
     placeholder: Optional[str] = None
 
 class ApplicationForm(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     title: str
     description: str
     position: str  # What they're applying for
@@ -137,13 +168,22 @@ class ApplicationFormCreate(BaseModel):
     webhook_url: Optional[str] = None
 
 class ApplicationSubmission(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     form_id: str
     applicant_name: str
     applicant_discord_id: Optional[str] = None
     responses: Dict[str, Any]
     submitted_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = "pending"  # pending, approved, rejected
+    claimed_by: Optional[str] = None  # reviewer id holding the review lease
+    lease_expires_at: Optional[datetime] = None
+
+class UploadCreate(BaseModel):
+    form_id: str
+    field_id: str
+    filename: str
+    content_type: str
+    size: int
 
 class ApplicationSubmit(BaseModel):
     form_id: str
@@ -161,10 +201,43 @@ class DiscordMessage(BaseModel):
     content: str
     author_username: str
     author_avatar: Optional[str] = None
+    author_id: Optional[str] = None
+    author_avatar_url: Optional[str] = None  # served by the media proxy
     timestamp: str
     attachments: List[Dict[str, Any]] = []
 
 # Helper functions
+upstream_clients: Dict[str, httpx.AsyncClient] = {}
+
+def upstream_client(upstream: str) -> httpx.AsyncClient:
+    """Shared httpx client for an outbound dependency (discord, fivem, webhook) with deadline, breaker and metrics.
+
+    Clients are pooled for the life of the worker: building one loads the TLS
+    context (~50ms of CPU) and a fresh one cannot reuse keep-alive connections.
+    ``upstream`` may be ``<kind>:<host>``; it then gets its own breaker and
+    client, created on first use, with the kind's timeout and metric label.
+    """
+    client = upstream_clients.get(upstream)
+    if client is not None:
+        return client
+    kind = upstream.partition(":")[0]
+    breaker = upstream_breakers.get(upstream)
+    if breaker is None:
+        breaker = upstream_breakers[upstream] = CircuitBreaker(
+            upstream, settings.breaker_failure_threshold, settings.breaker_reset_seconds)
+    transport: httpx.AsyncBaseTransport = ResilientTransport(
+        breaker, UPSTREAM_TIMEOUTS[kind],
+        InstrumentedTransport(kind) if settings.metrics_enabled else None
+    )
+    if settings.request_profiler:
+        transport = TracedTransport(upstream, transport)
+    client = upstream_clients[upstream] = httpx.AsyncClient(transport=transport)
+    return client
+
+def webhook_upstream(url: str) -> str:
+    """Upstream name for a form's webhook: each receiving host has its own breaker, so one dead receiver does not cut off the others"""
+    return f"webhook:{urlsplit(url).netloc}"
+
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -177,9 +250,10 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def resolve_token(token: str):
+    """Decode a JWT and load the principal it refers to"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_type = payload.get("type", "admin")
         
         if user_type == "admin":
@@ -201,12 +275,15 @@ async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(
             if user is None:
                 raise HTTPException(status_code=401, detail="User not found")
             
-            return {"user": DiscordUser(**user), "type": "discord"}
+            return {"user": DiscordUser(**discord_login_writer.overlay(user)), "type": "discord"}
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await resolve_token(credentials.credentials)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user (admin or discord user)"""
     return await get_current_admin(credentials)
@@ -244,69 +321,735 @@ async def require_form_access(form_id: str, current_user = Depends(get_current_u
     
     raise HTTPException(status_code=403, detail="Access denied for this form")
 
+def staff_form_ids(user) -> Optional[List[str]]:
+    """The forms a staff caller may see, or None when the caller sees every form.
+
+    allowed_forms comes from the admin_users row read for this request, so every
+    worker process applies a permission change on the next request.
+    """
+    if getattr(user, "role", "admin") == "admin":
+        return None
+    return list(user.allowed_forms)
+
+def can_access_form(user, form_id: str) -> bool:
+    form_ids = staff_form_ids(user)
+    return form_ids is None or form_id in form_ids
+
+# Rate limiting
+def client_ip(request: Request) -> str:
+    """The caller's address; uvicorn already resolves X-Forwarded-For from trusted proxies (FORWARDED_ALLOW_IPS)"""
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limit(policy: str, *identities: str, spend: bool = True):
+    """Charge a request to each identity, or with spend=False only refuse if one has no tokens left"""
+    if rate_limiter is None:
+        return
+    try:
+        if spend:
+            await rate_limiter.hit(policy, *identities)
+        else:
+            await rate_limiter.check(policy, *identities)
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+
+def rate_limit(policy: str):
+    """Dependency charging the request to the client IP's bucket for policy"""
+    async def check(request: Request):
+        await enforce_rate_limit(policy, f"ip:{client_ip(request)}")
+    return check
+
 # Discord API helper functions
 async def get_discord_user_info(access_token: str):
     """Get Discord user info from access token"""
     headers = {"Authorization": f"Bearer {access_token}"}
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://discord.com/api/v10/users/@me", headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(status_code=401, detail="Invalid Discord token")
+    client = upstream_client("discord")
+    response = await client.get(f"{settings.discord_api_base}/v10/users/@me", headers=headers)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise HTTPException(status_code=401, detail="Invalid Discord token")
 
 async def get_discord_user_guilds(access_token: str):
     """Get Discord user's guilds"""
     headers = {"Authorization": f"Bearer {access_token}"}
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://discord.com/api/v10/users/@me/guilds", headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        return []
+    client = upstream_client("discord")
+    response = await client.get(f"{settings.discord_api_base}/v10/users/@me/guilds", headers=headers)
+    if response.status_code == 200:
+        return response.json()
+    return []
 
 async def check_user_admin_role(discord_user_id: str):
     """Check if Discord user has admin role using bot token"""
-    headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
-    async with httpx.AsyncClient() as client:
-        try:
-            # Get guild member info
-            response = await client.get(
-                f"https://discord.com/api/v10/guilds/{DISCORD_GUILD_ID}/members/{discord_user_id}",
-                headers=headers
-            )
-            if response.status_code == 200:
-                member_data = response.json()
-                user_roles = member_data.get("roles", [])
-                return DISCORD_ADMIN_ROLE_ID in user_roles
-        except Exception as e:
-            logging.error(f"Error checking user roles: {e}")
-        return False
+    headers = {"Authorization": f"Bot {settings.discord_bot_token}"}
+    client = upstream_client("discord")
+    try:
+        # Get guild member info
+        response = await client.get(
+            f"{settings.discord_api_base}/v10/guilds/{settings.discord_guild_id}/members/{discord_user_id}",
+            headers=headers
+        )
+        if response.status_code == 200:
+            member_data = response.json()
+            user_roles = member_data.get("roles", [])
+            return settings.discord_admin_role_id in user_roles
+    except Exception as e:
+        logging.error(f"Error checking user roles: {e}")
+    return False
+
+async def get_discord_member_roles(access_token: str) -> Optional[List[str]]:
+    """Roles of the token's owner in our guild, or None when the token cannot tell (no guilds.members.read)"""
+    headers = {"Authorization": f"Bearer {access_token}"}
+    client = upstream_client("discord")
+    try:
+        response = await client.get(f"{settings.discord_api_base}/v10/users/@me/guilds/{settings.discord_guild_id}/member", headers=headers)
+        if response.status_code == 200:
+            return response.json().get("roles", [])
+        if response.status_code == 404:  # not a member of the guild
+            return []
+    except Exception as e:
+        logging.error(f"Error fetching guild member roles: {e}")
+    return None
 
 async def get_discord_channel_messages():
     """Get messages from Discord channel using bot token"""
-    headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://discord.com/api/v10/channels/{DISCORD_CHANNEL_ID}/messages?limit=50",
-                headers=headers
+    headers = {"Authorization": f"Bot {settings.discord_bot_token}"}
+    client = upstream_client("discord")
+    try:
+        response = await client.get(
+            f"{settings.discord_api_base}/v10/channels/{settings.discord_channel_id}/messages?limit=50",
+            headers=headers
+        )
+        if response.status_code == 200:
+            messages_data = response.json()
+            messages = []
+            for msg in messages_data:
+                author_id, avatar = msg["author"].get("id"), msg["author"].get("avatar")
+                messages.append(DiscordMessage(
+                    id=msg["id"],
+                    content=msg["content"],
+                    author_username=msg["author"]["username"],
+                    author_avatar=avatar,
+                    author_id=author_id,
+                    author_avatar_url=f"/api/media/avatars/{author_id}/{avatar}" if author_id and avatar else None,
+                    timestamp=msg["timestamp"],
+                    attachments=[media_proxy.register_attachment(a) for a in msg.get("attachments", [])]
+                ))
+            upstream_fallbacks["discord_messages"] = messages
+            return messages
+    except Exception as e:
+        logging.error(f"Error fetching Discord messages: {e}")
+    return upstream_fallbacks.get("discord_messages", [])
+
+# Changelog markdown rendering
+CHANGELOG_PAGE_SIZE = 10
+CHANGELOG_EXCERPT_LENGTH = 200
+MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+MD_LIST_RE = re.compile(r"^\s*[-*+]\s+(.*)$")
+MD_ORDERED_RE = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+MD_CODE_RE = re.compile(r"`([^`]+)`")
+MD_BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+MD_ITALIC_RE = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])|(?<![_\w])_(?!\s)(.+?)(?<!\s)_(?![_\w])")
+MD_LINK_RE = re.compile(r"\[([^\]]+)\]\((https?://[^\s)]+)\)")
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def _render_inline_markdown(text: str) -> str:
+    # Input is escaped first, so only the tags emitted here can reach the output
+    text = html.escape(text, quote=True)
+    text = MD_CODE_RE.sub(r"<code>\1</code>", text)
+    text = MD_LINK_RE.sub(r'<a href="\2" rel="noopener noreferrer" target="_blank">\1</a>', text)
+    text = MD_BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    text = MD_ITALIC_RE.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+    return text
+
+def render_changelog_markdown(content: str) -> str:
+    """Render the markdown subset used in changelogs to sanitized HTML"""
+    out = []
+    paragraph: List[str] = []
+    list_tag = None
+    
+    def flush_paragraph():
+        if paragraph:
+            out.append("<p>" + "<br>".join(_render_inline_markdown(line) for line in paragraph) + "</p>")
+            paragraph.clear()
+    
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+    
+    for line in content.replace("\r\n", "\n").split("\n"):
+        if not line.strip():
+            flush_paragraph()
+            close_list()
+            continue
+        heading = MD_HEADING_RE.match(line)
+        bullet = MD_LIST_RE.match(line)
+        ordered = MD_ORDERED_RE.match(line)
+        if heading:
+            flush_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_render_inline_markdown(heading.group(2))}</h{level}>")
+        elif bullet or ordered:
+            flush_paragraph()
+            tag = "ul" if bullet else "ol"
+            if list_tag != tag:
+                close_list()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{_render_inline_markdown((bullet or ordered).group(1))}</li>")
+        else:
+            close_list()
+            paragraph.append(line.strip())
+    flush_paragraph()
+    close_list()
+    return "\n".join(out)
+
+def changelog_excerpt(content_html: str, length: int = CHANGELOG_EXCERPT_LENGTH) -> str:
+    text = html.unescape(HTML_TAG_RE.sub(" ", content_html))
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+def prerender_changelog(data: dict) -> dict:
+    data["content_html"] = render_changelog_markdown(data["content"])
+    data["excerpt"] = changelog_excerpt(data["content_html"])
+    return data
+
+def with_changelog_html(changelog: dict) -> dict:
+    """Changelogs written before pre-rendering get their HTML on read"""
+    if changelog.get("content_html") is None:
+        prerender_changelog(changelog)
+    return changelog
+
+async def fetch_changelog_page(before: Optional[str] = None, limit: int = CHANGELOG_PAGE_SIZE):
+    query = {}
+    if before:
+        if not is_id(before):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"id": {"$lt": before}}
+    changelogs = await db.changelogs.find(query, {"_id": 0}).sort("id", -1).limit(limit).to_list(limit)
+    changelogs = [with_changelog_html(changelog) for changelog in changelogs]
+    next_cursor = changelogs[-1]["id"] if len(changelogs) == limit else None
+    return changelogs, next_cursor
+
+class ChangelogSnapshot:
+    """Pre-serialized first page of public changelogs, rebuilt only on writes"""
+
+    def __init__(self):
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.next_cursor: Optional[str] = None
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.generation += 1
+        self.body = None
+
+    async def get(self):
+        if settings.metrics_enabled:
+            record_cache("changelogs", self.body is not None)
+        body, etag, next_cursor = self.body, self.etag, self.next_cursor
+        if body is None:
+            async with self.lock:
+                body, etag, next_cursor = self.body, self.etag, self.next_cursor
+                if body is None:
+                    generation = self.generation
+                    changelogs, next_cursor = await fetch_changelog_page()
+                    body = json.dumps(jsonable_encoder(changelogs), ensure_ascii=False).encode()
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    # An invalidation during the read means the page may predate that write: serve it, don't keep it
+                    if generation == self.generation:
+                        self.body, self.etag, self.next_cursor = body, etag, next_cursor
+        return body, etag, next_cursor
+
+changelog_snapshot = ChangelogSnapshot()
+
+# Submission search index
+SEARCH_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SEARCH_MAX_RESULTS = 200
+
+def tokenize_search_text(text: str) -> List[str]:
+    return SEARCH_TOKEN_RE.findall(text.lower())
+
+def _iter_response_text(value: Any) -> Iterable[str]:
+    """Yield every text value from a (possibly nested) responses structure"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_response_text(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_response_text(item)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield str(value)
+
+class SubmissionSearchIndex:
+    """In-process inverted index over applicant names, Discord ids and response text.
+
+    Terms are kept in a sorted vocabulary so prefix lookups are a bisect plus a
+    slice instead of a scan over every term.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.vocabulary: List[str] = []
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+    def _add_term(self, term: str, submission_id: str):
+        posting = self.postings.get(term)
+        if posting is None:
+            posting = self.postings[term] = set()
+            bisect.insort(self.vocabulary, term)
+        posting.add(submission_id)
+
+    def _remove_term(self, term: str, submission_id: str):
+        posting = self.postings.get(term)
+        if posting is None:
+            return
+        posting.discard(submission_id)
+        if not posting:
+            del self.postings[term]
+            i = bisect.bisect_left(self.vocabulary, term)
+            if i < len(self.vocabulary) and self.vocabulary[i] == term:
+                self.vocabulary.pop(i)
+
+    def add(self, submission: Dict[str, Any]):
+        submission_id = submission["id"]
+        if submission_id in self.documents:
+            self.remove(submission_id)
+        text_parts = [submission.get("applicant_name") or "", submission.get("applicant_discord_id") or ""]
+        text_parts.extend(_iter_response_text(submission.get("responses") or {}))
+        terms = set()
+        for part in text_parts:
+            terms.update(tokenize_search_text(part))
+        for term in terms:
+            self._add_term(term, submission_id)
+        self.documents[submission_id] = {
+            "form_id": submission.get("form_id"),
+            "status": submission.get("status", "pending"),
+            "submitted_at": submission.get("submitted_at") or datetime.min,
+            "terms": terms,
+        }
+
+    def remove(self, submission_id: str):
+        doc = self.documents.pop(submission_id, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            self._remove_term(term, submission_id)
+
+    def set_status(self, submission_id: str, new_status: str):
+        doc = self.documents.get(submission_id)
+        if doc is not None:
+            doc["status"] = new_status
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        exact = self.postings.get(prefix)
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\U0010ffff")
+        if end - start == 1 and exact is not None:
+            return exact
+        matches: Set[str] = set()
+        for term in self.vocabulary[start:end]:
+            matches |= self.postings[term]
+        return matches
+
+    def search(self, query: str, allowed_forms: Optional[Set[str]] = None,
+               status_filter: Optional[str] = None, limit: int = 50) -> List[str]:
+        """Return submission ids matching every query term (as prefixes), newest first"""
+        terms = sorted(set(tokenize_search_text(query)), key=len, reverse=True)
+        if not terms:
+            return []
+        result: Optional[Set[str]] = None
+        for term in terms:
+            matches = self._prefix_matches(term)
+            result = set(matches) if result is None else result & matches
+            if not result:
+                return []
+        hits = []
+        for submission_id in result:
+            doc = self.documents[submission_id]
+            if allowed_forms is not None and doc["form_id"] not in allowed_forms:
+                continue
+            if status_filter and doc["status"] != status_filter:
+                continue
+            hits.append((doc["submitted_at"], submission_id))
+        hits.sort(reverse=True)
+        return [submission_id for _, submission_id in hits[:limit]]
+
+search_index = SubmissionSearchIndex()
+
+async def build_search_index():
+    count = 0
+    async for submission in db.application_submissions.find({}, SEARCH_PROJECTION):
+        search_index.add(submission)
+        count += 1
+    logging.info(f"Submission search index built with {count} submissions")
+
+# Staff-to-form access index
+class FormAccessIndex:
+    """Staff/form access pairs persisted in the form_access collection.
+
+    admin_users.allowed_forms is the source of truth and what access checks read;
+    this collection mirrors it for the reverse lookup (who can see a form) and so
+    form deletion can cascade in one pass. Nothing is cached in the process.
+    """
+
+    async def load(self):
+        if await db.form_access.find_one({}, {"_id": 0, "user_id": 1}):
+            return
+        # First start with this index: backfill from the users' allowed_forms
+        entries = []
+        async for user in db.admin_users.find({"allowed_forms.0": {"$exists": True}}, {"_id": 0, "id": 1, "allowed_forms": 1}):
+            entries.extend({"user_id": user["id"], "form_id": form_id} for form_id in set(user["allowed_forms"]))
+        if entries:
+            await db.form_access.insert_many(entries)
+
+    async def staff_for(self, form_id: str) -> List[str]:
+        return await db.form_access.distinct("user_id", {"form_id": form_id})
+
+    async def set_user_forms(self, user_id: str, form_ids: Iterable[str]):
+        form_ids = set(form_ids)
+        await db.form_access.delete_many({"user_id": user_id})
+        if form_ids:
+            await db.form_access.insert_many([{"user_id": user_id, "form_id": form_id} for form_id in form_ids])
+
+    async def remove_user(self, user_id: str):
+        await db.form_access.delete_many({"user_id": user_id})
+
+    async def remove_form(self, form_id: str):
+        await db.form_access.delete_many({"form_id": form_id})
+        await db.admin_users.update_many({"allowed_forms": form_id}, {"$pull": {"allowed_forms": form_id}})
+
+form_access_index = FormAccessIndex()
+
+# Live submission events
+class SubmissionEventBroker:
+    """In-process fan-out of submission events to SSE subscribers.
+
+    Events arrive through the change feed, so their ids are feed sequence
+    numbers: increasing and shared by every worker, but not contiguous.
+    Recent events are kept in a ring buffer so a reconnecting client can resume
+    from its Last-Event-ID instead of reloading the full submission list.
+    """
+
+    def __init__(self, buffer_size: int = 1000, start_id: int = 0):
+        self.last_id = start_id
+        self.covers_from = start_id  # every event after this id is in the buffer
+        self.buffer_size = buffer_size
+        self.buffer = deque(maxlen=buffer_size)
+        self.subscribers: Set[asyncio.Queue] = set()
+
+    def publish(self, event_id: int, event_type: str, form_id: str, data: str):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.covers_from = self.buffer[0]["id"] if self.buffer else event_id
+        self.last_id = event_id
+        event = {"id": event_id, "type": event_type, "form_id": form_id, "data": data}
+        self.buffer.append(event)
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer; end its stream so it reconnects and resumes from the buffer
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def replay_since(self, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Events after last_event_id, or None if the buffer no longer covers that point"""
+        if last_event_id >= self.last_id:
+            return []
+        if last_event_id < self.covers_from:
+            return None
+        return [event for event in self.buffer if event["id"] > last_event_id]
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.buffer_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+submission_events: SubmissionEventBroker
+
+# Cross-worker change feed
+SEARCH_PROJECTION = {"_id": 0, "id": 1, "form_id": 1, "applicant_name": 1,
+                     "applicant_discord_id": 1, "responses": 1, "status": 1, "submitted_at": 1}
+change_feed: ChangeFeed
+
+async def publish_submission_event(event_type: str, form_id: str, submission_id: str, data: Dict[str, Any]):
+    """Announce a submission change to every worker's search index, caches and SSE streams"""
+    await change_feed.publish("submission", {
+        "type": event_type, "form_id": form_id, "submission_id": submission_id,
+        "event": json.dumps(jsonable_encoder(data)),
+    })
+
+async def apply_submission_event(entry: Dict[str, Any]):
+    change = entry["data"]
+    submission = await db.application_submissions.find_one({"id": change["submission_id"]}, SEARCH_PROJECTION)
+    if submission:
+        search_index.add(submission)
+    else:
+        search_index.remove(change["submission_id"])
+    answer_distributions.pop(change["form_id"], None)
+    submission_events.publish(entry["seq"], change["type"], change["form_id"], change["event"])
+
+async def changelogs_changed():
+    changelog_snapshot.invalidate()
+    await change_feed.publish("changelogs", {})
+
+async def apply_changelogs_event(entry: Dict[str, Any]):
+    changelog_snapshot.invalidate()
+
+# Submission rollups
+ROLLUP_STATUSES = ("pending", "approved", "rejected")
+ROLLUP_MAX_DAYS = 366
+
+def rollup_day(submitted_at: datetime) -> str:
+    return submitted_at.strftime("%Y-%m-%d")
+
+async def record_rollup(form_id: str, submitted_at: datetime, changes: Dict[str, int]):
+    """Apply counter changes to the per-form, per-day rollup of submissions"""
+    changes = {field: delta for field, delta in changes.items() if field == "submitted" or field in ROLLUP_STATUSES}
+    if not changes:
+        return
+    try:
+        await db.submission_rollups.update_one(
+            {"day": rollup_day(submitted_at), "form_id": form_id},
+            {"$inc": changes},
+            upsert=True
+        )
+    except Exception as e:
+        # The submission itself is stored; a rebuild from /admin/analytics/rollups/rebuild repairs the counts
+        logging.error(f"Failed to update submission rollup for {form_id}: {e}")
+
+async def backfill_submission_rollups() -> int:
+    """Recompute every rollup from application_submissions with one aggregation"""
+    groups = await db.application_submissions.aggregate([
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
+                "form_id": "$form_id",
+                "status": "$status",
+            },
+            "count": {"$sum": 1},
+        }},
+    ]).to_list(None)
+    rollups: Dict[tuple, Dict[str, int]] = {}
+    for group in groups:
+        key = (group["_id"]["day"], group["_id"]["form_id"])
+        if key[0] is None:
+            continue
+        counts = rollups.setdefault(key, {"submitted": 0, **dict.fromkeys(ROLLUP_STATUSES, 0)})
+        counts["submitted"] += group["count"]
+        if group["_id"]["status"] in ROLLUP_STATUSES:
+            counts[group["_id"]["status"]] += group["count"]
+    rebuild = new_id()
+    if rollups:
+        await db.submission_rollups.bulk_write([
+            UpdateOne({"day": day, "form_id": form_id}, {"$set": {**counts, "rebuild": rebuild}}, upsert=True)
+            for (day, form_id), counts in rollups.items()
+        ], ordered=False)
+    await db.submission_rollups.delete_many({"rebuild": {"$ne": rebuild}})
+    return len(rollups)
+
+# Answer distributions for choice fields
+CHOICE_FIELD_TYPES = ("select", "radio", "checkbox")
+ANSWER_CACHE_SECONDS = 30  # local writes and the change feed invalidate sooner
+answer_distributions: Dict[str, tuple] = {}  # form_id -> (computed at, distribution)
+
+def choice_answers(fields: List[Dict[str, Any]], responses: Dict[str, Any]) -> List[tuple]:
+    """(field_id, option) pairs chosen in responses for the form's select/radio/checkbox fields"""
+    answers = {}
+    for field in fields:
+        if field.get("field_type") not in CHOICE_FIELD_TYPES:
+            continue
+        value = responses.get(field["id"])
+        for option in (value if isinstance(value, list) else [value]):
+            if isinstance(option, str) and option:
+                answers[(field["id"], option)] = None
+    return list(answers)
+
+async def record_answers(form_id: str, answers: List[tuple], changes: Dict[str, int]):
+    """Apply per-status counter changes to each chosen option"""
+    answer_distributions.pop(form_id, None)
+    changes = {status: delta for status, delta in changes.items() if status in ROLLUP_STATUSES}
+    if not answers or not changes:
+        return
+    try:
+        await db.answer_counts.bulk_write([
+            UpdateOne({"form_id": form_id, "field_id": field_id, "option": option, "status": status},
+                      {"$inc": {"count": delta}}, upsert=True)
+            for field_id, option in answers
+            for status, delta in changes.items()
+        ], ordered=False)
+    except Exception as e:
+        logging.error(f"Failed to update answer counts for {form_id}: {e}")
+
+async def backfill_answer_counts() -> int:
+    """Recompute every answer counter from application_submissions, one $group aggregation per form"""
+    rebuild = new_id()
+    operations = []
+    async for form in db.application_forms.find({}, {"_id": 0, "id": 1, "fields": 1}):
+        field_ids = [field["id"] for field in form.get("fields", []) if field.get("field_type") in CHOICE_FIELD_TYPES]
+        if not field_ids:
+            continue
+        groups = await db.application_submissions.aggregate([
+            {"$match": {"form_id": form["id"]}},
+            {"$project": {"status": 1, "answers": [
+                {"field_id": {"$literal": field_id}, "option": f"$responses.{field_id}"} for field_id in field_ids
+            ]}},
+            {"$unwind": "$answers"},
+            {"$unwind": "$answers.option"},
+            {"$group": {
+                "_id": {"field_id": "$answers.field_id", "option": "$answers.option", "status": "$status"},
+                "count": {"$sum": 1},
+            }},
+        ]).to_list(None)
+        for group in groups:
+            key = group["_id"]
+            if isinstance(key.get("option"), str) and key["option"] and key.get("status") in ROLLUP_STATUSES:
+                operations.append(UpdateOne(
+                    {"form_id": form["id"], **key},
+                    {"$set": {"count": group["count"], "rebuild": rebuild}},
+                    upsert=True
+                ))
+    if operations:
+        await db.answer_counts.bulk_write(operations, ordered=False)
+    await db.answer_counts.delete_many({"rebuild": {"$ne": rebuild}})
+    answer_distributions.clear()
+    return len(operations)
+
+async def answer_distribution(form: Dict[str, Any]) -> Dict[str, Any]:
+    cached = answer_distributions.get(form["id"])
+    if cached and time.monotonic() - cached[0] < ANSWER_CACHE_SECONDS:
+        return cached[1]
+    started = time.monotonic()
+    counts: Dict[str, Dict[str, Dict[str, int]]] = {}
+    async for counter in db.answer_counts.find({"form_id": form["id"]}, {"_id": 0}):
+        by_status = counts.setdefault(counter["field_id"], {}).setdefault(
+            counter["option"], dict.fromkeys(ROLLUP_STATUSES, 0))
+        by_status[counter["status"]] = by_status.get(counter["status"], 0) + counter["count"]
+    fields = []
+    for field in form.get("fields", []):
+        if field.get("field_type") not in CHOICE_FIELD_TYPES:
+            continue
+        field_counts = counts.get(field["id"], {})
+        # Current options in form order, then answers to options since removed from the form
+        options = list(field.get("options") or []) + [
+            option for option in field_counts if option not in (field.get("options") or [])]
+        fields.append({
+            "field_id": field["id"],
+            "label": field["label"],
+            "field_type": field["field_type"],
+            "options": [
+                {
+                    "option": option,
+                    "total": sum(field_counts.get(option, {}).values()),
+                    "by_status": field_counts.get(option, dict.fromkeys(ROLLUP_STATUSES, 0)),
+                    "current": option in (field.get("options") or []),
+                }
+                for option in options
+            ],
+        })
+    distribution = {"form_id": form["id"], "fields": fields}
+    answer_distributions[form["id"]] = (started, distribution)
+    return distribution
+
+# Discord login write-behind
+class DiscordLoginWriter:
+    """Coalesces per-user login updates to discord_users and flushes them in one bulk_write.
+
+    Known users (id and created_at cached at startup) get their profile fields
+    and last_login queued in memory, so the OAuth callback does not wait on the
+    write. First logins are still upserted synchronously so the stored id is the
+    one handed out. is_admin is never queued: a change is written through at
+    once, since every worker authorizes from the stored value. resolve_token
+    overlays the queued profile fields.
+    """
+
+    def __init__(self, flush_seconds: float = 2, batch_size: int = 200):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.known: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.flush_requested = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+
+    async def load(self):
+        async for user in db.discord_users.find({}, {"_id": 0, "discord_id": 1, "id": 1, "created_at": 1}):
+            self.known[user["discord_id"]] = {"id": user["id"], "created_at": user["created_at"]}
+
+    async def record_login(self, discord_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a login and return the user document as it will read after the flush"""
+        known = self.known.get(discord_id)
+        if known is None:
+            user = await db.discord_users.find_one_and_update(
+                {"discord_id": discord_id},
+                {"$set": fields, "$setOnInsert": {"id": new_id(), "created_at": fields["last_login"]}},
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
             )
-            if response.status_code == 200:
-                messages_data = response.json()
-                messages = []
-                for msg in messages_data:
-                    messages.append(DiscordMessage(
-                        id=msg["id"],
-                        content=msg["content"],
-                        author_username=msg["author"]["username"],
-                        author_avatar=msg["author"].get("avatar"),
-                        timestamp=msg["timestamp"],
-                        attachments=msg.get("attachments", [])
-                    ))
-                return messages
-        except Exception as e:
-            logging.error(f"Error fetching Discord messages: {e}")
-        return []
+            self.known[discord_id] = {"id": user["id"], "created_at": user["created_at"]}
+            return user
+        queued = {key: value for key, value in fields.items() if key != "is_admin"}
+        if "is_admin" in fields:
+            await db.discord_users.update_one(
+                {"discord_id": discord_id, "is_admin": {"$ne": fields["is_admin"]}},
+                {"$set": {"is_admin": fields["is_admin"]}}
+            )
+        self.pending.setdefault(discord_id, {}).update(queued)
+        if len(self.pending) >= self.batch_size:
+            self.flush_requested.set()
+        return {**fields, **known}
+
+    def overlay(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        pending = self.pending.get(user.get("discord_id"))
+        return {**user, **pending} if pending else user
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, {}
+            try:
+                await db.discord_users.bulk_write(
+                    [UpdateOne({"discord_id": discord_id}, {"$set": fields}) for discord_id, fields in batch.items()],
+                    ordered=False
+                )
+            except (Exception, asyncio.CancelledError) as e:
+                # Put them back under anything newer that arrived meanwhile; $set makes a retry harmless
+                for discord_id, fields in batch.items():
+                    self.pending[discord_id] = {**fields, **self.pending.get(discord_id, {})}
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                logging.error(f"Failed to flush {len(batch)} Discord login updates: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_requested.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            await self.flush()
+
+discord_login_writer: DiscordLoginWriter
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {event['data']}\n\n"
 
 # Initialize default admin if not exists
 async def init_default_admin():
@@ -321,25 +1064,165 @@ async def init_default_admin():
         await db.admin_users.insert_one(default_admin.dict())
         logging.info("Default admin user created: admin/admin123")
 
-@app.on_event("startup")
-async def startup_event():
+async def ensure_indexes():
+    await db.application_submissions.create_index("id", unique=True)
+    await db.application_submissions.create_index([("status", 1), ("form_id", 1), ("submitted_at", 1)])
+    await db.application_submissions.create_index([("status", 1), ("submitted_at", 1)])
+    await db.changelogs.create_index("id", unique=True)
+    await db.application_submissions.create_index("legacy_id", sparse=True)
+    await db.changelogs.create_index("legacy_id", sparse=True)
+    await db.form_access.create_index([("user_id", 1), ("form_id", 1)], unique=True)
+    await db.form_access.create_index("form_id")
+    await db.discord_users.create_index("discord_id", unique=True)
+    await db.submission_rollups.create_index([("day", 1), ("form_id", 1)], unique=True)
+    await db.answer_counts.create_index([("form_id", 1), ("field_id", 1), ("option", 1), ("status", 1)], unique=True)
+    await db.submission_keys.create_index("key", unique=True)
+    await db.submission_keys.create_index("expires_at", expireAfterSeconds=0)
+    await db.uploads.create_index("id", unique=True)
+    await db.uploads.create_index("expires_at", expireAfterSeconds=0)
+    await db.blobs.create_index("id", unique=True)
+
+# Time-ordered ids
+async def migrate_legacy_ids():
+    """Give uuid4-keyed submissions and changelogs an id for their original time, keeping the uuid as legacy_id"""
+    for collection, time_field in (("application_submissions", "submitted_at"), ("changelogs", "created_at")):
+        # New ids have no hyphen, so once migrated this reads nothing at startup
+        candidates = db[collection].find({"legacy_id": {"$exists": False}, "id": {"$regex": "-"}},
+                                         {"_id": 0, "id": 1, time_field: 1})
+        legacy = [doc async for doc in candidates if is_legacy_id(doc["id"])]
+        if not legacy:
+            continue
+        await db[collection].bulk_write([
+            UpdateOne({"id": doc["id"]}, {"$set": {"id": new_id(doc.get(time_field)), "legacy_id": doc["id"]}})
+            for doc in legacy
+        ], ordered=False)
+        logging.info(f"Gave {len(legacy)} {collection} documents time-ordered ids")
+
+async def current_id(collection: str, document_id: str) -> str:
+    """The id of a document addressed by its id or by the uuid it had before migrate_legacy_ids"""
+    if is_legacy_id(document_id):
+        document = await db[collection].find_one({"legacy_id": document_id}, {"_id": 0, "id": 1})
+        if document:
+            return document["id"]
+    return document_id
+
+background_tasks: List[asyncio.Task] = []
+
+async def startup():
+    """Open this worker's database client, load the in-memory indexes and start background tasks"""
+    global client, db, request_profiles, slow_query_recorder, submission_events, change_feed, discord_login_writer, rate_limiter, blob_store, media_proxy
+    client, db = open_database(
+        settings.mongo_url, settings.db_name,
+        command_listeners=[MongoCommandMetrics()] if settings.metrics_enabled else (),
+        observer=observe_db_operation if settings.metrics_enabled else None
+    )
+    request_profiles = db.request_profiles
+    query_observers = []
+    slow_query_recorder = None
+    if settings.slow_query_profiler:
+        slow_query_recorder = SlowQueryRecorder(db, settings.slow_query_ms)
+        query_observers.append(slow_query_recorder)
+    if settings.request_profiler:
+        query_observers.append(SpanObserver())
+    if query_observers:
+        db = ProfiledDatabase(db, QueryObservers(query_observers))
+    upstream_breakers.clear()
+    for name in [name for name in UPSTREAM_TIMEOUTS if name not in PER_HOST_UPSTREAMS]:
+        upstream_breakers[name] = CircuitBreaker(name, settings.breaker_failure_threshold, settings.breaker_reset_seconds)
+    upstream_fallbacks.clear()
+    discord_login_writer = DiscordLoginWriter(settings.discord_login_flush_seconds, settings.discord_login_flush_batch)
+    changelog_snapshot.invalidate()
+    rate_limiter = None
+    if settings.rate_limit_enabled:
+        rate_limiter = RateLimiter(
+            {
+                "submit": parse_policy("submit", settings.rate_limit_submit),
+                "login": parse_policy("login", settings.rate_limit_login),
+                "discord_callback": parse_policy("discord_callback", settings.rate_limit_discord_callback),
+                "upload": parse_policy("upload", settings.rate_limit_upload),
+            },
+            DatabaseBackend(db.rate_limits) if settings.rate_limit_backend == "database" else MemoryBackend()
+        )
+        if isinstance(rate_limiter.backend, DatabaseBackend):
+            await rate_limiter.backend.setup()
+
     await init_default_admin()
+    await migrate_legacy_ids()
+    await ensure_indexes()
+    # Join the feed before loading the indexes, so no change lands between the two unseen
+    change_feed = ChangeFeed(db.change_feed, settings.change_feed_poll_seconds)
+    await change_feed.setup()
+    change_feed.on("submission", apply_submission_event)
+    change_feed.on("changelogs", apply_changelogs_event)
+    submission_events = SubmissionEventBroker(settings.event_buffer_size, change_feed.applied)
+    # The SQLite backend has no TTL monitor, so expired submission keys are cleared here (uploads by the upload GC)
+    await db.submission_keys.delete_many({"expires_at": {"$lte": datetime.utcnow()}})
+    blob_store = BlobStore(Path(settings.upload_dir))
+    await collect_upload_garbage()
+    media_proxy = MediaProxy(
+        DiskCache(Path(settings.media_cache_dir), settings.media_cache_max_bytes),
+        lambda: upstream_client("discord_cdn"), settings.media_max_bytes, settings.thumbnail_workers
+    )
+    if slow_query_recorder:
+        await slow_query_recorder.setup()
+    if settings.request_profiler:
+        try:
+            await db.create_collection("request_profiles", capped=True, size=64 * 1024 * 1024, max=REQUEST_PROFILE_LIMIT)
+        except Exception as e:
+            logging.debug(f"request_profiles collection not created: {e}")
+        await request_profiles.create_index("id")
+    await form_access_index.load()
+    await build_search_index()
+    if await db.application_submissions.find_one({}):
+        if not await db.submission_rollups.find_one({}):
+            logging.info(f"Backfilled {await backfill_submission_rollups()} submission rollups")
+        if not await db.answer_counts.find_one({}):
+            logging.info(f"Backfilled {await backfill_answer_counts()} answer counters")
+    await discord_login_writer.load()
+    background_tasks.append(asyncio.create_task(discord_login_writer.run()))
+    background_tasks.append(asyncio.create_task(change_feed.run()))
+    background_tasks.append(asyncio.create_task(run_upload_gc()))
+    if settings.metrics_enabled:
+        background_tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await discord_login_writer.flush()
+    media_proxy.close()
+    for upstream in upstream_clients.values():
+        await upstream.aclose()
+    upstream_clients.clear()
+    client.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
 
 # FiveM Server Stats
 @api_router.get("/server-stats", response_model=ServerStats)
 async def get_server_stats():
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get("http://45.84.198.57:30120/dynamic.json")
-            data = response.json()
-            return ServerStats(
-                players=data.get("clients", 0),
-                max_players=int(data.get("sv_maxclients", 64)),
-                hostname=data.get("hostname", "Revolution Roleplay"),
-                gametype=data.get("gametype", "ESX Legacy")
-            )
+        client = upstream_client("fivem")
+        response = await client.get(settings.fivem_dynamic_url)
+        data = response.json()
+        stats = ServerStats(
+            players=data.get("clients", 0),
+            max_players=int(data.get("sv_maxclients", 64)),
+            hostname=data.get("hostname", "Revolution Roleplay"),
+            gametype=data.get("gametype", "ESX Legacy")
+        )
+        upstream_fallbacks["server_stats"] = stats
+        return stats
     except Exception as e:
         logging.error(f"Failed to fetch server stats: {e}")
+        if "server_stats" in upstream_fallbacks:
+            return upstream_fallbacks["server_stats"]
         return ServerStats(
             players=0,
             max_players=64,
@@ -353,91 +1236,152 @@ async def get_discord_messages():
     """Get messages from the Discord channel"""
     return await get_discord_channel_messages()
 
+# Discord media proxy
+AVATAR_HASH_RE = re.compile(r"^(a_)?[0-9a-f]{32}$")
+MEDIA_REFRESH_SECONDS = 30  # unknown attachment ids re-read the channel at most this often
+MEDIA_HEADERS = {
+    "Cache-Control": "public, max-age=31536000, immutable",
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; sandbox",
+}
+INLINE_MEDIA_PREFIXES = ("image/", "video/", "audio/")
+media_refreshed_at = 0.0
+
+def media_etag(key: str) -> str:
+    return f'"{DiskCache.name(key)[:32]}"'
+
+async def serve_media(request: Request, key: str, url: str, content_type: str,
+                      size: Optional[int], filename: Optional[str] = None) -> Response:
+    """Cached original, or a WebP thumbnail when size is given and the media is a still image"""
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(map(str, THUMBNAIL_SIZES))}")
+    thumbnail = size is not None and media_proxy.thumbnails_enabled and content_type in THUMBNAIL_SOURCE_TYPES
+    etag = media_etag(f"{key}@{size}" if thumbnail else key)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, **MEDIA_HEADERS})
+    try:
+        path = await media_proxy.original(key, url)
+    except MediaUnavailable as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if thumbnail:
+        thumbnail_path = await media_proxy.thumbnail(key, path, size)
+        if thumbnail_path is not None:
+            path, content_type = thumbnail_path, THUMBNAIL_TYPE
+        else:
+            etag = media_etag(key)
+    headers = {"ETag": etag, **MEDIA_HEADERS}
+    if filename:
+        disposition = "inline" if content_type.startswith(INLINE_MEDIA_PREFIXES) else "attachment"
+        headers["Content-Disposition"] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+@api_router.get("/media/attachments/{attachment_id}")
+async def get_discord_attachment(attachment_id: str, request: Request, size: Optional[int] = None):
+    """An attachment from the Discord channel feed, fetched once and cached"""
+    global media_refreshed_at
+    if not attachment_id.isdigit():
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    source = media_proxy.attachments.get(attachment_id)
+    if source is None and time.monotonic() - media_refreshed_at > MEDIA_REFRESH_SECONDS:
+        # Not seen by this worker yet: the channel read registers the current attachments
+        media_refreshed_at = time.monotonic()
+        await get_discord_channel_messages()
+        source = media_proxy.attachments.get(attachment_id)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return await serve_media(request, f"attachment:{attachment_id}", source["url"],
+                             source["content_type"], size, source["filename"])
+
+@api_router.get("/media/avatars/{user_id}/{avatar}")
+async def get_discord_avatar(user_id: str, avatar: str, request: Request, size: Optional[int] = None):
+    """A Discord user's avatar; the hash names one image, so it is cached for good"""
+    if not user_id.isdigit() or not AVATAR_HASH_RE.match(avatar):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    url = f"{settings.discord_cdn_base}/avatars/{user_id}/{avatar}.png?size=512"
+    return await serve_media(request, f"avatar:{user_id}:{avatar}", url, "image/png", size)
+
 # Discord OAuth2 endpoints
 @api_router.get("/auth/discord/login")
 async def discord_oauth_login():
     """Initiate Discord OAuth2 login"""
-    scope = "identify guilds"
+    scope = "identify guilds guilds.members.read"
     discord_login_url = f"https://discord.com/api/oauth2/authorize?" + urlencode({
-        "client_id": DISCORD_CLIENT_ID,
-        "redirect_uri": DISCORD_REDIRECT_URI,
+        "client_id": settings.discord_client_id,
+        "redirect_uri": settings.discord_redirect_uri,
         "response_type": "code",
         "scope": scope
     })
     return {"login_url": discord_login_url}
 
-@api_router.get("/auth/discord/callback")
+@api_router.get("/auth/discord/callback", dependencies=[Depends(rate_limit("discord_callback"))])
 async def discord_oauth_callback(code: str):
     """Handle Discord OAuth2 callback"""
     # Exchange code for access token
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            "https://discord.com/api/oauth2/token",
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            data={
-                "client_id": DISCORD_CLIENT_ID,
-                "client_secret": DISCORD_CLIENT_SECRET,
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": DISCORD_REDIRECT_URI
-            }
-        )
-        
-        if token_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get access token")
-        
-        token_data = token_response.json()
-        access_token = token_data["access_token"]
-        
-        # Get user info
-        user_info = await get_discord_user_info(access_token)
-        discord_id = user_info["id"]
-        
-        # Check if user has admin role
-        is_admin = await check_user_admin_role(discord_id)
-        
-        # Create or update user in database
-        existing_user = await db.discord_users.find_one({"discord_id": discord_id})
-        user_data = {
-            "discord_id": discord_id,
-            "discord_username": user_info["username"],
-            "discord_avatar": user_info.get("avatar"),
-            "discord_discriminator": user_info.get("discriminator"),
-            "is_admin": is_admin,
-            "last_login": datetime.utcnow()
-        }
-        
-        if existing_user:
-            await db.discord_users.update_one(
-                {"discord_id": discord_id},
-                {"$set": user_data}
-            )
-            user_data["id"] = existing_user["id"]
-            user_data["created_at"] = existing_user["created_at"]
-        else:
-            user_data["id"] = str(uuid.uuid4())
-            user_data["created_at"] = datetime.utcnow()
-            await db.discord_users.insert_one(user_data)
-        
-        # Create JWT token
-        token = create_access_token({
-            "sub": discord_id,
-            "type": "discord",
-            "is_admin": is_admin
-        })
-        
-        return {
-            "access_token": token,
-            "token_type": "bearer",
-            "user": user_data,
-            "is_admin": is_admin
+    client = upstream_client("discord")
+    token_response = await client.post(
+        f"{settings.discord_api_base}/oauth2/token",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        data={
+            "client_id": settings.discord_client_id,
+            "client_secret": settings.discord_client_secret,
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.discord_redirect_uri
         }
+    )
+    
+    if token_response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to get access token")
+    
+    token_data = token_response.json()
+    access_token = token_data["access_token"]
+    
+    # Profile and guild roles both only need the user's token, so fetch them together
+    user_info, member_roles = await asyncio.gather(
+        get_discord_user_info(access_token),
+        get_discord_member_roles(access_token)
+    )
+    discord_id = user_info["id"]
+    await enforce_rate_limit("discord_callback", f"discord:{discord_id}")
+    if member_roles is None:
+        # Token without guilds.members.read (older grant) or a failed lookup: ask with the bot token
+        is_admin = await check_user_admin_role(discord_id)
+    else:
+        is_admin = settings.discord_admin_role_id in member_roles
+    
+    # Create the user, or queue the login update for the next batch write
+    user_data = await discord_login_writer.record_login(discord_id, {
+        "discord_id": discord_id,
+        "discord_username": user_info["username"],
+        "discord_avatar": user_info.get("avatar"),
+        "discord_discriminator": user_info.get("discriminator"),
+        "is_admin": is_admin,
+        "last_login": datetime.utcnow()
+    })
+    
+    # Create JWT token
+    token = create_access_token({
+        "sub": discord_id,
+        "type": "discord",
+        "is_admin": is_admin
+    })
+    
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "user": user_data,
+        "is_admin": is_admin
+    }
 
 # Legacy admin auth endpoints
-@api_router.post("/admin/login")
+@api_router.post("/admin/login", dependencies=[Depends(rate_limit("login"))])
 async def admin_login(login_data: AdminLogin):
+    # Only failed attempts spend the username's budget, so signing in never locks the owner out
+    user_bucket = f"user:{login_data.username.lower()}"
+    await enforce_rate_limit("login", user_bucket, spend=False)
     admin = await db.admin_users.find_one({"username": login_data.username})
     if not admin or not verify_password(login_data.password, admin["password_hash"]):
+        await enforce_rate_limit("login", user_bucket)
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token({
@@ -463,10 +1407,10 @@ async def create_user(admin_data: AdminCreate, current_admin = Depends(require_a
     )
     
     await db.admin_users.insert_one(new_user.dict())
+    await form_access_index.set_user_forms(new_user.id, new_user.allowed_forms)
     return {"message": f"{'Admin' if admin_data.role == 'admin' else 'Staff'} user created successfully"}
 
-@api_router.get("/admin/users")
-async def get_admin_users(current_admin = Depends(require_admin_access)):
+async def list_admin_users() -> List[Dict[str, Any]]:
     users = await db.admin_users.find().to_list(1000)
     return [
         {
@@ -480,6 +1424,10 @@ async def get_admin_users(current_admin = Depends(require_admin_access)):
         for user in users
     ]
 
+@api_router.get("/admin/users")
+async def get_admin_users(current_admin = Depends(require_admin_access)):
+    return await list_admin_users()
+
 @api_router.put("/admin/users/{user_id}")
 async def update_admin_user(user_id: str, user_data: UserUpdate, current_admin = Depends(require_admin_access)):
     # Don't allow updating yourself via this endpoint
@@ -511,6 +1459,9 @@ async def update_admin_user(user_id: str, user_data: UserUpdate, current_admin =
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    if user_data.allowed_forms is not None:
+        await form_access_index.set_user_forms(user_id, user_data.allowed_forms)
+    
     return {"message": "User updated successfully"}
 
 @api_router.delete("/admin/users/{user_id}")
@@ -528,6 +1479,7 @@ async def delete_admin_user(user_id: str, current_admin = Depends(require_admin_
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await form_access_index.remove_user(user_id)
     return {"message": "User deleted successfully"}
 
 @api_router.put("/admin/users/{user_id}/role")
@@ -559,42 +1511,57 @@ async def get_discord_news():
 @api_router.post("/admin/changelogs", response_model=Changelog)
 async def create_changelog(changelog_data: ChangelogCreate, current_admin = Depends(require_admin_access)):
     changelog = Changelog(
-        **changelog_data.dict(),
+        **prerender_changelog(changelog_data.dict()),
         created_by=current_admin.username
     )
     await db.changelogs.insert_one(changelog.dict())
+    await changelogs_changed()
     return changelog
 
 @api_router.get("/admin/changelogs", response_model=List[Changelog])
 async def get_admin_changelogs(current_admin = Depends(require_admin_access)):
-    changelogs = await db.changelogs.find().sort("created_at", -1).to_list(1000)
-    return [Changelog(**changelog) for changelog in changelogs]
+    changelogs = await db.changelogs.find().sort("id", -1).to_list(1000)
+    return [Changelog(**with_changelog_html(changelog)) for changelog in changelogs]
 
 @api_router.get("/changelogs", response_model=List[Changelog])
-async def get_public_changelogs():
-    """Get public changelogs"""
-    changelogs = await db.changelogs.find().sort("created_at", -1).limit(10).to_list(10)
-    return [Changelog(**changelog) for changelog in changelogs]
+async def get_public_changelogs(request: Request, before: Optional[str] = None):
+    """Get public changelogs; pass the X-Next-Cursor value as ?before= for older entries"""
+    if before:
+        changelogs, next_cursor = await fetch_changelog_page(before)
+        body = json.dumps(jsonable_encoder(changelogs), ensure_ascii=False).encode()
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    body, etag, next_cursor = await changelog_snapshot.get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @api_router.put("/admin/changelogs/{changelog_id}")
 async def update_changelog(changelog_id: str, changelog_data: ChangelogCreate, current_admin = Depends(require_admin_access)):
+    changelog_id = await current_id("changelogs", changelog_id)
     result = await db.changelogs.update_one(
         {"id": changelog_id},
-        {"$set": changelog_data.dict()}
+        {"$set": prerender_changelog(changelog_data.dict())}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Changelog not found")
+    await changelogs_changed()
     return {"message": "Changelog updated successfully"}
 
 @api_router.delete("/admin/changelogs/{changelog_id}")
 async def delete_changelog(changelog_id: str, current_admin = Depends(require_admin_access)):
+    changelog_id = await current_id("changelogs", changelog_id)
     result = await db.changelogs.delete_one({"id": changelog_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Changelog not found")
+    await changelogs_changed()
     return {"message": "Changelog deleted successfully"}
 
-@api_router.get("/user/me")
-async def get_current_user_info(current_user = Depends(get_current_user)):
+def user_info(current_user) -> Dict[str, Any]:
     if current_user["type"] == "admin":
         return {
             "type": "admin",
@@ -615,6 +1582,10 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
             "created_at": user.created_at
         }
 
+@api_router.get("/user/me")
+async def get_current_user_info(current_user = Depends(get_current_user)):
+    return user_info(current_user)
+
 # User dashboard - get user's applications
 @api_router.get("/user/applications", response_model=List[ApplicationSubmission])
 async def get_user_applications(current_user = Depends(get_current_user)):
@@ -622,11 +1593,11 @@ async def get_user_applications(current_user = Depends(get_current_user)):
         # Get applications for Discord user
         submissions = await db.application_submissions.find({
             "applicant_discord_id": current_user["user"].discord_id
-        }).sort("submitted_at", -1).to_list(1000)
+        }).sort("id", -1).to_list(1000)
         return [ApplicationSubmission(**sub) for sub in submissions]
     else:
         # Admin users see all applications
-        submissions = await db.application_submissions.find().sort("submitted_at", -1).to_list(1000)
+        submissions = await db.application_submissions.find().sort("id", -1).to_list(1000)
         return [ApplicationSubmission(**sub) for sub in submissions]
 
 # Application Form endpoints (admin only)
@@ -674,8 +1645,22 @@ async def delete_application_form(form_id: str, current_admin = Depends(require_
     result = await db.application_forms.delete_one({"id": form_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Form not found")
+    await form_access_index.remove_form(form_id)
     return {"message": "Form deleted successfully"}
 
+@api_router.get("/admin/application-forms/{form_id}/staff")
+async def get_application_form_staff(form_id: str, current_admin = Depends(require_admin_access)):
+    """List the users who can see submissions for a form"""
+    staff_ids = await form_access_index.staff_for(form_id)
+    users = await db.admin_users.find(
+        {"$or": [{"role": "admin"}, {"id": {"$in": staff_ids}}]},
+        {"_id": 0, "id": 1, "username": 1, "role": 1}
+    ).to_list(1000)
+    return [
+        {"id": user["id"], "username": user["username"], "role": user.get("role", "admin")}
+        for user in users
+    ]
+
 # Public Application endpoints
 @api_router.get("/applications", response_model=List[ApplicationForm])
 async def get_public_applications():
@@ -689,98 +1674,816 @@ async def get_public_application(form_id: str):
         raise HTTPException(status_code=404, detail="Application not found")
     return ApplicationForm(**form)
 
-@api_router.post("/applications/submit")
-async def submit_application(submission: ApplicationSubmit):
+# File uploads
+UPLOAD_LOCK_SECONDS = 120  # a chunk write that takes longer is presumed dead
+UPLOAD_FILENAME_RE = re.compile(r"[\x00-\x1f\x7f/\\]")
+NOT_LOCKED = datetime(1970, 1, 1)
+
+def accepts_content_type(field: Dict[str, Any], content_type: str) -> bool:
+    accepted = field.get("options") or settings.upload_allowed_types.split(",")
+    major = content_type.split("/", 1)[0]
+    return any(pattern.strip() in (content_type, f"{major}/*", "*/*") for pattern in accepted)
+
+def upload_state(upload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "upload_id": upload["id"],
+        "offset": upload["received"],
+        "size": upload["size"],
+        "blob_id": upload.get("blob_id"),
+        "chunk_size": settings.upload_chunk_bytes,
+    }
+
+async def find_upload(upload_id: str) -> Dict[str, Any]:
+    upload = await db.uploads.find_one({"id": upload_id}, {"_id": 0})
+    if not upload or upload["expires_at"] <= datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@api_router.post("/uploads", dependencies=[Depends(rate_limit("upload"))])
+async def create_upload(upload: UploadCreate):
+    """Start a resumable upload for a file field; send the bytes with PATCH /uploads/{upload_id}"""
+    form = await db.application_forms.find_one({"id": upload.form_id, "is_active": True}, {"_id": 0, "fields": 1})
+    field = next((field for field in (form or {}).get("fields", [])
+                  if field["id"] == upload.field_id and field.get("field_type") == "file"), None)
+    if not field:
+        raise HTTPException(status_code=404, detail="File field not found")
+    if not 0 < upload.size <= settings.upload_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Files must be between 1 and {settings.upload_max_bytes} bytes")
+    if await stored_upload_bytes() + upload.size > settings.upload_quota_bytes:
+        raise HTTPException(status_code=507, detail="Upload storage is full; try again later")
+    content_type = upload.content_type.split(";", 1)[0].strip().lower()
+    if not accepts_content_type(field, content_type):
+        raise HTTPException(status_code=415, detail=f"{content_type} files are not accepted for this field")
+    filename = UPLOAD_FILENAME_RE.sub("_", upload.filename).strip()[:200] or "upload"
+    now = datetime.utcnow()
+    document = {
+        "id": new_id(), "form_id": upload.form_id, "field_id": upload.field_id,
+        "filename": filename, "content_type": content_type, "size": upload.size,
+        "received": 0, "blob_id": None, "lock_until": NOT_LOCKED,
+        "created_at": now, "expires_at": now + timedelta(seconds=settings.upload_expire_seconds),
+    }
+    await db.uploads.insert_one(dict(document))
+    return upload_state(document)
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Where to resume an interrupted upload"""
+    return upload_state(await find_upload(upload_id))
+
+@api_router.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request,
+                        upload_offset: int = Header(..., alias="Upload-Offset")):
+    """Append the raw request body at Upload-Offset, which must equal the bytes received so far"""
+    upload = await find_upload(upload_id)
+    if upload["blob_id"]:
+        return upload_state(upload)
+    if upload_offset != upload["received"]:
+        raise HTTPException(status_code=409, detail="Upload-Offset does not match the bytes received",
+                            headers={"Upload-Offset": str(upload["received"])})
+    # One writer per upload across workers: claim it for this offset
+    now = datetime.utcnow()
+    claimed = await db.uploads.find_one_and_update(
+        {"id": upload_id, "received": upload_offset, "lock_until": {"$lt": now}},
+        {"$set": {"lock_until": now + timedelta(seconds=UPLOAD_LOCK_SECONDS)}}
+    )
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Another chunk of this upload is being written",
+                            headers={"Upload-Offset": str(upload["received"])})
+    update = {"lock_until": NOT_LOCKED}
+    try:
+        written = await blob_store.append(upload_id, upload_offset, request.stream(), upload["size"] - upload_offset)
+        update["received"] = upload_offset + written
+        if update["received"] == upload["size"]:
+            blob_id, size = await blob_store.finish(upload_id)
+            now = datetime.utcnow()
+            await db.blobs.update_one(
+                {"id": blob_id},
+                {"$set": {"last_used_at": now},
+                 "$setOnInsert": {"id": blob_id, "size": size, "content_type": upload["content_type"],
+                                  "created_at": now}},
+                upsert=True
+            )
+            update["blob_id"] = blob_id
+    except UploadOverflow:
+        raise HTTPException(status_code=413, detail="More bytes than the upload declared")
+    finally:
+        await db.uploads.update_one({"id": upload_id}, {"$set": update})
+    return upload_state({**upload, **update})
+
+async def stored_upload_bytes() -> int:
+    """Bytes held by stored files plus those promised to unfinished uploads, for the quota"""
+    total = 0
+    for collection, query in ((db.blobs, {}),
+                              (db.uploads, {"blob_id": None, "expires_at": {"$gt": datetime.utcnow()}})):
+        groups = await collection.aggregate([
+            {"$match": query},
+            {"$group": {"_id": None, "bytes": {"$sum": "$size"}}},
+        ]).to_list(None)
+        total += groups[0]["bytes"] if groups else 0
+    return total
+
+async def referenced_blob_ids() -> Set[str]:
+    """Blobs a submitted file answer or a live upload still points at"""
+    referenced = set()
+    async for upload in db.uploads.find({"blob_id": {"$ne": None}, "expires_at": {"$gt": datetime.utcnow()}},
+                                        {"_id": 0, "blob_id": 1}):
+        referenced.add(upload["blob_id"])
+    file_fields = {form["id"]: file_field_ids(form)
+                   async for form in db.application_forms.find({}, {"_id": 0, "id": 1, "fields": 1})}
+    async for submission in db.application_submissions.find({}, {"_id": 0, "form_id": 1, "responses": 1}):
+        responses = submission.get("responses") or {}
+        # Submissions outlive a deleted form; without its fields, keep every file they may hold
+        field_ids = file_fields.get(submission.get("form_id"), responses.keys())
+        for field_id in field_ids:
+            answer = responses.get(field_id)
+            if isinstance(answer, dict) and answer.get("blob_id"):
+                referenced.add(answer["blob_id"])
+    return referenced
+
+async def collect_upload_garbage() -> Tuple[int, int, int]:
+    """Remove expired uploads, their partial files and stored files nothing refers to.
+
+    Anonymous uploads that are never submitted would otherwise stay on disk.
+    A file is only collected once it has gone unused for upload_expire_seconds,
+    so an upload that is finished but not yet submitted keeps it.
+    """
+    now = datetime.utcnow()
+    # The SQLite backend has no TTL monitor
+    expired = (await db.uploads.delete_many({"expires_at": {"$lte": now}})).deleted_count
+    unfinished = {upload["id"] async for upload in db.uploads.find({"blob_id": None}, {"_id": 0, "id": 1})}
+    partials = blob_store.purge_partials(unfinished, older_than=UPLOAD_LOCK_SECONDS)
+    cutoff = now - timedelta(seconds=settings.upload_expire_seconds)
+    stale = [blob async for blob in db.blobs.find({}, {"_id": 0, "id": 1, "created_at": 1, "last_used_at": 1})
+             if (blob.get("last_used_at") or blob["created_at"]) < cutoff]
+    removed = 0
+    if stale:
+        referenced = await referenced_blob_ids()
+        for blob in stale:
+            if blob["id"] in referenced:
+                continue
+            # Kept if an upload of the same content finished since the read above
+            result = await db.blobs.delete_one({"id": blob["id"], "last_used_at": blob.get("last_used_at")})
+            if result.deleted_count:
+                blob_store.remove(blob["id"])
+                removed += 1
+    return expired, partials, removed
+
+async def run_upload_gc():
+    while True:
+        await asyncio.sleep(settings.upload_gc_seconds)
+        try:
+            expired, partials, removed = await collect_upload_garbage()
+            if expired or partials or removed:
+                logging.info(f"Upload GC removed {expired} expired uploads, {partials} partial files and {removed} files")
+        except Exception as e:
+            logging.error(f"Upload GC failed: {e}")
+
+def file_field_ids(form: Dict[str, Any]) -> Set[str]:
+    return {field["id"] for field in form.get("fields", []) if field.get("field_type") == "file"}
+
+async def resolve_file_answers(form: Dict[str, Any], responses: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace upload ids given for file fields with a reference to the stored blob.
+
+    Only this function writes file references: an object sent as any other
+    answer is refused, since it could name a blob from another form.
+    """
+    file_fields = file_field_ids(form)
+    for field_id, answer in responses.items():
+        if isinstance(answer, dict) and field_id not in file_fields:
+            raise HTTPException(status_code=422, detail=f"Answer for {field_id[:64]} must not be an object")
+    resolved = dict(responses)
+    for field in form["fields"]:
+        upload_id = responses.get(field["id"])
+        if field.get("field_type") != "file" or not upload_id:
+            continue
+        upload = await db.uploads.find_one(
+            {"id": str(upload_id), "form_id": form["id"], "field_id": field["id"]}, {"_id": 0})
+        if not upload or not upload.get("blob_id"):
+            raise HTTPException(status_code=422, detail=f"File for {field['label']} has not finished uploading")
+        resolved[field["id"]] = {
+            "blob_id": upload["blob_id"],
+            "filename": upload["filename"],
+            "content_type": upload["content_type"],
+            "size": upload["size"],
+        }
+    return resolved
+
+def response_text(value: Any) -> str:
+    """An answer as text for webhooks: file answers show their file name"""
+    if isinstance(value, dict) and "blob_id" in value:
+        return value.get("filename", value["blob_id"])
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+# Submission size caps
+def encoded_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+def check_submission_size(submission: ApplicationSubmit):
+    """Reject responses over the per-answer or total caps before anything is stored"""
+    if len(submission.responses) > settings.submission_max_fields:
+        raise HTTPException(status_code=422, detail=f"At most {settings.submission_max_fields} answers per submission")
+    total = 0
+    for field_id, answer in [("applicant_name", submission.applicant_name), *submission.responses.items()]:
+        size = encoded_size(answer)
+        if size > settings.submission_max_answer_bytes:
+            raise HTTPException(status_code=422,
+                                detail=f"Answer for {field_id[:64]} is larger than {settings.submission_max_answer_bytes} bytes")
+        total += size + len(field_id.encode())
+    if total > settings.submission_max_responses_bytes:
+        raise HTTPException(status_code=413,
+                            detail=f"Answers are larger than {settings.submission_max_responses_bytes} bytes in total")
+
+# Submission idempotency
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+def submission_fingerprint(submission: ApplicationSubmit) -> str:
+    """Hash of what the applicant sent; equal for a double-clicked or retried submit"""
+    content = json.dumps({
+        "form_id": submission.form_id,
+        "applicant_name": submission.applicant_name.strip(),
+        "responses": submission.responses,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+async def claim_submission_key(key: str, fingerprint: str, submission_id: str, ttl_seconds: float) -> Optional[Dict[str, Any]]:
+    """Reserve key for submission_id; returns the live claim that already holds it instead, if any"""
+    now = datetime.utcnow()
+    claim = {"key": key, "fingerprint": fingerprint, "submission_id": submission_id,
+             "created_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}
+    for _ in range(2):
+        try:
+            await db.submission_keys.insert_one(claim)
+            return None
+        except DuplicateKeyError:
+            existing = await db.submission_keys.find_one({"key": key}, {"_id": 0})
+            if existing and existing["expires_at"] > now:
+                return existing
+            # Expired but not yet removed by the TTL monitor: take it over
+            await db.submission_keys.delete_one({"key": key, "expires_at": {"$lte": now}})
+    raise HTTPException(status_code=409, detail="Submission is already being processed")
+
+async def claim_submission(submission: ApplicationSubmit, idempotency_key: Optional[str], submission_id: str) -> tuple:
+    """Claim the Idempotency-Key and the content fingerprint for a new submission.
+
+    Returns (claimed keys, None) for a new submission, or ([], existing claim) for a retry of one.
+    """
+    fingerprint = submission_fingerprint(submission)
+    keys = []
+    if idempotency_key:
+        keys.append((f"idempotency:{submission.form_id}:{idempotency_key}", settings.submission_idempotency_seconds))
+    if settings.submission_duplicate_window_seconds > 0:
+        keys.append((f"content:{fingerprint}", settings.submission_duplicate_window_seconds))
+    claimed = []
+    for key, ttl_seconds in keys:
+        existing = await claim_submission_key(key, fingerprint, submission_id, ttl_seconds)
+        if existing:
+            await release_submission_keys(claimed)
+            if existing["fingerprint"] != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different submission")
+            return [], existing
+        claimed.append(key)
+    return claimed, None
+
+async def release_submission_keys(keys: List[str]):
+    if keys:
+        await db.submission_keys.delete_many({"key": {"$in": keys}})
+
+@api_router.post("/applications/submit", dependencies=[Depends(rate_limit("submit"))])
+async def submit_application(submission: ApplicationSubmit, response: Response,
+                             idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Retries with the same Idempotency-Key, or the same content within a short window, get the original submission_id"""
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+    check_submission_size(submission)
     # Verify form exists and is active
     form = await db.application_forms.find_one({"id": submission.form_id, "is_active": True})
     if not form:
         raise HTTPException(status_code=404, detail="Application form not found")
     
-    # Create submission
-    submission_obj = ApplicationSubmission(**submission.dict())
-    await db.application_submissions.insert_one(submission_obj.dict())
+    # Create submission, unless this is a retry of one already made
+    responses = await resolve_file_answers(form, submission.responses)
+    submission_obj = ApplicationSubmission(**{**submission.dict(), "responses": responses})
+    claimed, existing = await claim_submission(submission, idempotency_key, submission_obj.id)
+    if existing:
+        response.headers["Idempotent-Replayed"] = "true"
+        return {"message": "Application submitted successfully", "submission_id": existing["submission_id"]}
+    try:
+        await db.application_submissions.insert_one(submission_obj.dict())
+    except Exception:
+        await release_submission_keys(claimed)
+        raise
+    search_index.add(submission_obj.dict())
+    await publish_submission_event("submission.created", submission_obj.form_id, submission_obj.id, submission_obj.dict())
+    await record_rollup(submission_obj.form_id, submission_obj.submitted_at,
+                        {"submitted": 1, submission_obj.status: 1})
+    await record_answers(submission_obj.form_id, choice_answers(form["fields"], submission_obj.responses),
+                         {submission_obj.status: 1})
     
     # Send Discord webhook if configured
     if form.get("webhook_url"):
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                webhook_data = {
-                    "embeds": [{
-                        "title": f"Ny ansøgning - {form['title']}",
-                        "description": f"**Ansøger:** {submission.applicant_name}\n**Position:** {form['position']}",
-                        "color": 7289935,  # Discord purple
-                        "fields": [
-                            {"name": field["label"], "value": str(submission.responses.get(field["id"], "N/A")), "inline": True}
-                            for field in form["fields"][:10]  # Limit to 10 fields for Discord
-                        ],
-                        "timestamp": submission_obj.submitted_at.isoformat(),
-                        "footer": {"text": "Revolution Roleplay"}
-                    }]
-                }
-                await client.post(form["webhook_url"], json=webhook_data)
+            client = upstream_client(webhook_upstream(form["webhook_url"]))
+            webhook_data = {
+                "embeds": [{
+                    "title": f"Ny ansøgning - {form['title']}",
+                    "description": f"**Ansøger:** {submission.applicant_name}\n**Position:** {form['position']}",
+                    "color": 7289935,  # Discord purple
+                    "fields": [
+                        {"name": field["label"], "value": response_text(submission_obj.responses.get(field["id"], "N/A")), "inline": True}
+                        for field in form["fields"][:10]  # Limit to 10 fields for Discord
+                    ],
+                    "timestamp": submission_obj.submitted_at.isoformat(),
+                    "footer": {"text": "Revolution Roleplay"}
+                }]
+            }
+            await client.post(form["webhook_url"], json=webhook_data)
         except Exception as e:
             logging.error(f"Failed to send webhook: {e}")
     
     return {"message": "Application submitted successfully", "submission_id": submission_obj.id}
 
 # Admin application management
-@api_router.get("/admin/submissions", response_model=List[ApplicationSubmission])
-async def get_admin_submissions(current_admin = Depends(require_staff_or_admin_access)):
-    if current_admin.role == "admin":
-        # Admin sees all submissions
-        submissions = await db.application_submissions.find().sort("submitted_at", -1).to_list(1000)
-    else:
+async def fetch_admin_submissions(current_admin, before: Optional[str], limit: int):
+    """A page of the submissions the caller may see, newest first, and the cursor for the next one"""
+    query = {}
+    if before:
+        if not is_id(before):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["id"] = {"$lt": before}
+    form_ids = staff_form_ids(current_admin)
+    if form_ids is not None:
         # Staff sees only submissions for forms they have access to
-        if not current_admin.allowed_forms:
-            return []  # No forms assigned
-        submissions = await db.application_submissions.find({
-            "form_id": {"$in": current_admin.allowed_forms}
-        }).sort("submitted_at", -1).to_list(1000)
+        if not form_ids:
+            return [], None  # No forms assigned
+        query["form_id"] = {"$in": form_ids}
+    limit = max(1, min(limit, 1000))
+    submissions = await db.application_submissions.find(query).sort("id", -1).limit(limit).to_list(limit)
+    next_cursor = submissions[-1]["id"] if len(submissions) == limit else None
+    return [ApplicationSubmission(**sub) for sub in submissions], next_cursor
+
+@api_router.get("/admin/submissions", response_model=List[ApplicationSubmission])
+async def get_admin_submissions(response: Response, before: Optional[str] = None, limit: int = 1000,
+                                current_admin = Depends(require_staff_or_admin_access)):
+    """Newest first; pass the X-Next-Cursor value as ?before= for older submissions"""
+    submissions, next_cursor = await fetch_admin_submissions(current_admin, before, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return submissions
+
+@api_router.get("/admin/submissions/stream")
+async def stream_admin_submissions(
+    request: Request,
+    token: Optional[str] = None,
+    last_event_id: Optional[int] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """Server-sent events feed of new submissions and status changes.
+
+    EventSource cannot set headers, so the token may also be passed as ?token=.
+    """
+    raw_token = credentials.credentials if credentials else token
+    if not raw_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    current_admin = await require_staff_or_admin_access(await resolve_token(raw_token))
+    
+    # Staff visibility is re-read from the account per event, so permission changes apply to open streams
+    is_staff = staff_form_ids(current_admin) is not None
+    
+    header_event_id = request.headers.get("last-event-id")
+    if header_event_id and header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+    
+    queue = submission_events.subscribe()
+    backlog = submission_events.replay_since(last_event_id) if last_event_id is not None else []
+    
+    async def visible(event):
+        if not is_staff:
+            return True
+        account = await db.admin_users.find_one({"id": current_admin.id}, {"_id": 0, "role": 1, "allowed_forms": 1})
+        return account is not None and (
+            account.get("role") == "admin" or event["form_id"] in account.get("allowed_forms", []))
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                # Too far behind for the buffer; tell the client to do one full reload
+                yield f"id: {submission_events.last_id}\nevent: reset\ndata: {{}}\n\n"
+            else:
+                for event in backlog:
+                    if await visible(event):
+                        yield format_sse(event)
+            sent_id = submission_events.last_id if backlog is None else max(
+                [last_event_id or 0] + [event["id"] for event in backlog])
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                if event["id"] <= sent_id:
+                    continue
+                sent_id = event["id"]
+                if await visible(event):
+                    yield format_sse(event)
+        finally:
+            submission_events.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/admin/submissions/search", response_model=List[ApplicationSubmission])
+async def search_admin_submissions(q: str, status: Optional[str] = None, limit: int = 50,
+                                   current_admin = Depends(require_staff_or_admin_access)):
+    """Search submissions by applicant name, Discord id or response text (prefix match)"""
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+    allowed_forms = staff_form_ids(current_admin)
+    if allowed_forms is not None and not allowed_forms:
+        return []
+    
+    submission_ids = search_index.search(q, allowed_forms=None if allowed_forms is None else set(allowed_forms),
+                                         status_filter=status, limit=limit)
+    if not submission_ids:
+        return []
     
-    return [ApplicationSubmission(**sub) for sub in submissions]
+    submissions = await db.application_submissions.find({"id": {"$in": submission_ids}}).to_list(len(submission_ids))
+    by_id = {sub["id"]: sub for sub in submissions}
+    return [ApplicationSubmission(**by_id[sid]) for sid in submission_ids if sid in by_id]
 
 @api_router.get("/admin/submissions/{submission_id}", response_model=ApplicationSubmission)
 async def get_admin_submission(submission_id: str, current_admin = Depends(require_staff_or_admin_access)):
+    submission_id = await current_id("application_submissions", submission_id)
     submission = await db.application_submissions.find_one({"id": submission_id})
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
     # Check form access for staff
-    if current_admin.role == "staff":
-        if submission["form_id"] not in current_admin.allowed_forms:
-            raise HTTPException(status_code=403, detail="Access denied for this submission")
+    if not can_access_form(current_admin, submission["form_id"]):
+        raise HTTPException(status_code=403, detail="Access denied for this submission")
     
     return ApplicationSubmission(**submission)
 
+@api_router.get("/admin/submissions/{submission_id}/files/{field_id}")
+async def download_submission_file(submission_id: str, field_id: str, request: Request,
+                                   current_admin = Depends(require_staff_or_admin_access)):
+    """The file answered for a field; supports single-range requests for resuming and previews"""
+    submission_id = await current_id("application_submissions", submission_id)
+    submission = await db.application_submissions.find_one({"id": submission_id}, {"_id": 0, "form_id": 1, "responses": 1})
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    if not can_access_form(current_admin, submission["form_id"]):
+        raise HTTPException(status_code=403, detail="Access denied for this submission")
+    # Only a file field holds a file reference; a deleted form's submissions are left to admins
+    form = await db.application_forms.find_one({"id": submission["form_id"]}, {"_id": 0, "fields": 1})
+    if (form and field_id not in file_field_ids(form)) or (not form and staff_form_ids(current_admin) is not None):
+        raise HTTPException(status_code=404, detail="File not found")
+    answer = submission.get("responses", {}).get(field_id)
+    if not isinstance(answer, dict) or not blob_store.exists(answer.get("blob_id", "")):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    blob_id, size = answer["blob_id"], blob_store.blob_path(answer["blob_id"]).stat().st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{blob_id}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(answer.get('filename') or blob_id)}",
+        "X-Content-Type-Options": "nosniff",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    # If-Range with another validator means the client's partial copy is stale: send everything
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range and if_range != headers["ETag"]:
+        byte_range = None
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        blob_store.read(blob_id, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=answer.get("content_type") or "application/octet-stream",
+        headers=headers
+    )
+
 @api_router.put("/admin/submissions/{submission_id}/status")
 async def update_submission_status(submission_id: str, status: dict, current_admin = Depends(require_staff_or_admin_access)):
+    submission_id = await current_id("application_submissions", submission_id)
     # First get the submission to check form access
     submission = await db.application_submissions.find_one({"id": submission_id})
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
     # Check form access for staff
-    if current_admin.role == "staff":
-        if submission["form_id"] not in current_admin.allowed_forms:
-            raise HTTPException(status_code=403, detail="Access denied for this submission")
+    if not can_access_form(current_admin, submission["form_id"]):
+        raise HTTPException(status_code=403, detail="Access denied for this submission")
     
-    result = await db.application_submissions.update_one(
-        {"id": submission_id},
-        {"$set": {"status": status.get("status", "pending")}}
+    # Deciding closes the review lease; refuse if another reviewer holds a live one
+    new_status = status.get("status", "pending")
+    previous = await db.application_submissions.find_one_and_update(
+        {"id": submission_id, **unleased_or_held_by(current_admin.id)},
+        {"$set": {"status": new_status}, "$unset": {"claimed_by": "", "lease_expires_at": ""}},
+        projection={"_id": 0, "status": 1, "submitted_at": 1},
+        return_document=ReturnDocument.BEFORE
     )
+    if previous is None:
+        raise HTTPException(status_code=409, detail="Submission is claimed by another reviewer")
+    if previous["status"] != new_status:
+        if previous.get("submitted_at"):
+            await record_rollup(submission["form_id"], previous["submitted_at"],
+                                {previous["status"]: -1, new_status: 1})
+        form = await db.application_forms.find_one({"id": submission["form_id"]}, {"_id": 0, "fields": 1})
+        if form:
+            await record_answers(submission["form_id"], choice_answers(form["fields"], submission["responses"]),
+                                 {previous["status"]: -1, new_status: 1})
+    search_index.set_status(submission_id, new_status)
+    await publish_submission_event("submission.status", submission["form_id"], submission_id,
+                                   {"id": submission_id, "status": new_status})
     
     return {"message": "Status updated successfully"}
 
-# Include the router in the main app
-app.include_router(api_router)
+# Admin dashboard bootstrap
+async def not_permitted():
+    return None
+
+@api_router.get("/admin/bootstrap")
+async def get_admin_bootstrap(limit: int = 1000, current_user = Depends(get_current_user),
+                              current_admin = Depends(require_staff_or_admin_access)):
+    """The dashboard's first screen in one round trip: the caller, forms, submissions, users and changelogs.
+
+    The token is resolved once and the queries run concurrently. Sections the
+    caller's role may not read are null, and staff get only their assigned forms,
+    without the webhook URL (a secret that lets anyone post to the channel).
+    """
+    is_admin = getattr(current_admin, "role", "admin") == "admin"
+
+    async def forms():
+        form_ids = staff_form_ids(current_admin)
+        query = {} if form_ids is None else {"id": {"$in": form_ids}}
+        application_forms = [ApplicationForm(**form) for form in await db.application_forms.find(query).to_list(1000)]
+        if is_admin:
+            return application_forms
+        return [form.dict(exclude={"webhook_url"}) for form in application_forms]
+
+    async def changelogs():
+        return [Changelog(**with_changelog_html(changelog))
+                for changelog in await db.changelogs.find().sort("id", -1).to_list(1000)]
+
+    application_forms, (submissions, next_cursor), users, changelog_list = await asyncio.gather(
+        forms(),
+        fetch_admin_submissions(current_admin, None, limit),
+        list_admin_users() if is_admin else not_permitted(),
+        changelogs() if is_admin else not_permitted(),
+    )
+    return {
+        "user": user_info(current_user),
+        "application_forms": application_forms,
+        "submissions": submissions,
+        "submissions_next_cursor": next_cursor,
+        "users": users,
+        "changelogs": changelog_list,
+    }
+
+# Reviewer work queue
+def unleased_or_held_by(reviewer_id: str) -> dict:
+    """Filter matching submissions that are unclaimed, lease-expired or claimed by reviewer_id"""
+    return {"$or": [
+        {"lease_expires_at": None},
+        {"lease_expires_at": {"$lt": datetime.utcnow()}},
+        {"claimed_by": reviewer_id},
+    ]}
+
+@api_router.post("/admin/queue/claim", response_model=ApplicationSubmission)
+async def claim_next_submission(current_admin = Depends(require_staff_or_admin_access)):
+    """Atomically lease the oldest pending submission the caller may review"""
+    query = {"status": "pending", "$or": [
+        {"lease_expires_at": None},
+        {"lease_expires_at": {"$lt": datetime.utcnow()}},
+    ]}
+    form_ids = staff_form_ids(current_admin)
+    if form_ids is not None:
+        if not form_ids:
+            raise HTTPException(status_code=404, detail="No pending submissions")
+        query["form_id"] = {"$in": form_ids}
+    
+    submission = await db.application_submissions.find_one_and_update(
+        query,
+        {"$set": {
+            "claimed_by": current_admin.id,
+            "lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.queue_lease_seconds)
+        }},
+        sort=[("submitted_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+    if not submission:
+        raise HTTPException(status_code=404, detail="No pending submissions")
+    return ApplicationSubmission(**submission)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.post("/admin/queue/{submission_id}/renew", response_model=ApplicationSubmission)
+async def renew_submission_lease(submission_id: str, current_admin = Depends(require_staff_or_admin_access)):
+    submission_id = await current_id("application_submissions", submission_id)
+    submission = await db.application_submissions.find_one_and_update(
+        {"id": submission_id, "claimed_by": current_admin.id, "status": "pending"},
+        {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.queue_lease_seconds)}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not submission:
+        raise HTTPException(status_code=409, detail="You do not hold the lease for this submission")
+    return ApplicationSubmission(**submission)
+
+@api_router.post("/admin/queue/{submission_id}/release")
+async def release_submission_lease(submission_id: str, current_admin = Depends(require_staff_or_admin_access)):
+    submission_id = await current_id("application_submissions", submission_id)
+    result = await db.application_submissions.update_one(
+        {"id": submission_id, "claimed_by": current_admin.id},
+        {"$unset": {"claimed_by": "", "lease_expires_at": ""}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="You do not hold the lease for this submission")
+    return {"message": "Lease released successfully"}
+
+# Submission analytics
+@api_router.get("/admin/analytics/submissions")
+async def get_submission_series(days: int = 365, current_admin = Depends(require_staff_or_admin_access)):
+    """Daily submitted/pending/approved/rejected counts and approval rate per form, oldest day first"""
+    days = max(1, min(days, ROLLUP_MAX_DAYS))
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    query: Dict[str, Any] = {"day": {"$gte": start.isoformat()}}
+    form_ids = staff_form_ids(current_admin)
+    if form_ids is not None:
+        query["form_id"] = {"$in": form_ids}
+    rollups = await db.submission_rollups.find(query, {"_id": 0}).sort("day", 1).to_list(None)
+
+    day_list = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+    position = {day: index for index, day in enumerate(day_list)}
+    forms: Dict[str, Dict[str, List[int]]] = {}
+    for rollup in rollups:
+        index = position.get(rollup["day"])
+        if index is None:
+            continue
+        series = forms.setdefault(rollup["form_id"], {
+            field: [0] * days for field in ("submitted",) + ROLLUP_STATUSES})
+        for field in series:
+            series[field][index] = rollup.get(field, 0)
+    return {
+        "days": day_list,
+        "forms": [
+            {
+                "form_id": form_id,
+                **series,
+                "approval_rate": [
+                    round(approved / (approved + rejected), 4) if approved + rejected else None
+                    for approved, rejected in zip(series["approved"], series["rejected"])
+                ],
+            }
+            for form_id, series in forms.items()
+        ],
+    }
+
+@api_router.get("/admin/analytics/forms/{form_id}/answers")
+async def get_answer_distribution(form_id: str, current_admin = Depends(require_staff_or_admin_access)):
+    """How applicants answered each select/radio/checkbox field, per option and status"""
+    if not can_access_form(current_admin, form_id):
+        raise HTTPException(status_code=403, detail="Access denied for this form")
+    form = await db.application_forms.find_one({"id": form_id}, {"_id": 0, "id": 1, "fields": 1})
+    if not form:
+        raise HTTPException(status_code=404, detail="Application form not found")
+    return await answer_distribution(form)
+
+@api_router.post("/admin/analytics/rollups/rebuild")
+async def rebuild_submission_rollups(current_admin = Depends(require_admin_access)):
+    """Recompute the daily rollups and answer counters from the submissions themselves"""
+    return {
+        "rollups": await backfill_submission_rollups(),
+        "answer_counts": await backfill_answer_counts(),
+    }
+
+# Slow-query profiler
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(limit: int = 20, current_admin = Depends(require_admin_access)):
+    """Top-N slowest query shapes recorded by the profiler"""
+    if slow_query_recorder is None:
+        raise HTTPException(status_code=404, detail="Slow-query profiler is disabled")
+    return await slow_query_recorder.top_shapes(max(1, min(limit, 100)))
+
+# Upstream health
+@api_router.get("/admin/upstreams")
+async def get_upstream_status(current_admin = Depends(require_admin_access)):
+    """Circuit breaker state for each outbound dependency"""
+    return [breaker.snapshot() for breaker in upstream_breakers.values()]
+
+async def upstream_error_handler(request: Request, exc: httpx.HTTPError):
+    """Upstream failures that a route does not handle itself become 503s, or 504s when the call ran out of time"""
+    logging.error(f"Upstream call failed during {request.url.path}: {exc!r}")
+    if isinstance(exc, httpx.TimeoutException):
+        return JSONResponse(status_code=504, content={"detail": "Upstream service timed out"})
+    headers = {}
+    if isinstance(exc, UpstreamUnavailable):
+        retry_in = exc.breaker.snapshot()["retry_in"] or 0
+        headers["Retry-After"] = str(max(1, int(retry_in + 0.999)))
+    return JSONResponse(status_code=503, content={"detail": "Upstream service unavailable"}, headers=headers)
+
+# Per-request profiles
+async def can_profile_requests(token: str) -> bool:
+    """Only full admins may profile their requests"""
+    principal = await resolve_token(token)
+    user = principal["user"]
+    if principal["type"] == "admin":
+        return user.role == "admin"
+    return user.is_admin
+
+async def store_request_profile(profile: dict):
+    await request_profiles.insert_one(profile)
+
+@api_router.get("/admin/profiles")
+async def get_request_profiles(limit: int = 50, current_admin = Depends(require_admin_access)):
+    """Most recent request profiles, without the speedscope payload"""
+    profiles = await request_profiles.find({}, {"_id": 0, "speedscope": 0}).sort(
+        "created_at", -1).to_list(max(1, min(limit, REQUEST_PROFILE_LIMIT)))
+    return profiles
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, current_admin = Depends(require_admin_access)):
+    """Speedscope JSON for one profiled request (open it at https://www.speedscope.app)"""
+    profile = await request_profiles.find_one({"id": profile_id}, {"_id": 0, "speedscope": 1}) if is_id(profile_id) else None
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=profile["speedscope"],
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'}
+    )
+
+# Prometheus metrics
+async def get_metrics(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), settings.metrics_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+# App factory
+def create_app(app_settings: Optional[Settings] = None) -> FastAPI:
+    """Build the ASGI app; clients and background tasks are created by its lifespan, once per worker"""
+    global settings
+    settings = app_settings or get_settings()
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(api_router)
+    app.add_api_route("/metrics", get_metrics, include_in_schema=False)
+    app.add_exception_handler(httpx.HTTPError, upstream_error_handler)
+    if settings.website_dir and Path(settings.website_dir).is_dir():
+        app.router.routes.append(SiteMount(StaticSite(Path(settings.website_dir)), name="website"))
+
+    if settings.request_profiler:
+        app.add_middleware(
+            RequestProfilerMiddleware,
+            authorize=can_profile_requests,
+            store=store_request_profile,
+            interval=settings.request_profile_interval_ms / 1000
+        )
+
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+
+    app.add_middleware(DeadlineMiddleware, budget=settings.request_deadline_seconds)
+
+    app.add_middleware(
+        BodyLimitMiddleware,
+        max_body=settings.max_request_body_bytes,
+        limits={
+            "/api/applications/submit": settings.submission_max_body_bytes,
+            "/api/uploads": settings.upload_chunk_bytes,
+        }
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+def __getattr__(name: str):
+    # Keeps `uvicorn server:app` working without building an app on every import
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Configure logging
 logging.basicConfig(
@@ -788,7 +2491,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""Typed configuration for server.py.
+
+Values come from the environment (and ``backend/.env``), read once per
+process by ``get_settings()``. Field names are the lower-case environment
+variable names; pydantic converts the strings to the declared types, so a
+malformed value fails at startup rather than on first use.
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Mapping, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, field_validator, model_validator
+
+ROOT_DIR = Path(__file__).parent
+
+
+class Settings(BaseModel):
+    # Database: MongoDB, or embedded SQLite for MONGO_URL="sqlite:///path.db"
+    mongo_url: str
+    db_name: str
+
+    # Discord
+    discord_bot_token: str
+    discord_client_id: str
+    discord_client_secret: str
+    discord_guild_id: str
+    discord_admin_role_id: str
+    discord_channel_id: str
+    discord_redirect_uri: str = "https://1dd055fe-5269-4816-a104-0e822c872d5b.preview.emergentagent.com/api/auth/discord/callback"
+    discord_api_base: str = "https://discord.com/api"
+
+    # FiveM server status endpoint
+    fivem_dynamic_url: str = "http://45.84.198.57:30120/dynamic.json"
+
+    # Built frontend served by the API; empty disables it
+    website_dir: str = str(ROOT_DIR.parent / "deploy" / "website")
+
+    # Metrics (opt-in): /metrics is on the public port, so scrapers must send METRICS_TOKEN as a bearer token
+    metrics_enabled: bool = False
+    metrics_token: Optional[str] = None
+
+    # Slow-query profiler (opt-in)
+    slow_query_profiler: bool = False
+    slow_query_ms: float = 100
+
+    # Per-request profiler (admins send X-Profile-Request: 1)
+    request_profiler: bool = False
+    request_profile_interval_ms: float = 1
+
+    # Upstream resilience
+    request_deadline_seconds: float = 8
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30
+
+    # Live submissions feed
+    event_buffer_size: int = 1000
+
+    # How often each worker applies the other workers' changes to its in-memory state
+    change_feed_poll_seconds: float = 0.25
+
+    # Discord login write-behind
+    discord_login_flush_seconds: float = 2
+    discord_login_flush_batch: int = 200
+
+    # Submission duplicate suppression: Idempotency-Key lifetime, and the window in
+    # which an identical submission counts as a retry (0 disables the content check)
+    submission_idempotency_seconds: int = 86400
+    submission_duplicate_window_seconds: int = 600
+
+    # Request body caps in bytes, enforced while the body streams in, plus caps on
+    # the parsed responses of an application submit
+    max_request_body_bytes: int = 1024 * 1024
+    submission_max_body_bytes: int = 256 * 1024
+    submission_max_fields: int = 100
+    submission_max_answer_bytes: int = 16 * 1024
+    submission_max_responses_bytes: int = 128 * 1024
+
+    # File-upload fields: chunked uploads land in a content-addressed store under upload_dir
+    upload_dir: str = str(ROOT_DIR / "uploads")
+    upload_max_bytes: int = 20 * 1024 * 1024
+    upload_chunk_bytes: int = 4 * 1024 * 1024  # largest PATCH body
+    upload_allowed_types: str = "image/png,image/jpeg,image/gif,image/webp,application/pdf,text/plain"
+    upload_expire_seconds: int = 86400  # unfinished or unsubmitted uploads
+    upload_quota_bytes: int = 5 * 1024 * 1024 * 1024  # stored files plus unfinished uploads
+    upload_gc_seconds: int = 3600  # how often expired uploads and unreferenced files are removed
+
+    # Discord media proxy: attachments and avatars cached on disk (LRU, per worker
+    # over a shared directory) with WebP thumbnails; 0 thumbnail workers disables them
+    discord_cdn_base: str = "https://cdn.discordapp.com"
+    media_cache_dir: str = str(ROOT_DIR / "media_cache")
+    media_cache_max_bytes: int = 256 * 1024 * 1024
+    media_max_bytes: int = 16 * 1024 * 1024  # largest single file proxied
+    thumbnail_workers: int = 2
+
+    # Rate limits for unauthenticated endpoints, per client IP and, where known,
+    # per username or Discord id: "<requests>/<period>", e.g. "10/minute"; "0" disables
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (per worker) or "database" (shared by all workers)
+    rate_limit_submit: str = "10/minute"
+    rate_limit_login: str = "10/minute"
+    rate_limit_discord_callback: str = "20/minute"
+    rate_limit_upload: str = "30/minute"  # new uploads, not chunks
+
+    # Reverse proxies whose X-Forwarded-For/-Proto uvicorn trusts, so rate limits see
+    # the real client address: comma-separated IPs or networks, or "*" behind a private proxy
+    proxy_headers: bool = True
+    forwarded_allow_ips: str = "127.0.0.1"
+
+    # Review queue
+    queue_lease_seconds: int = 600
+
+    @field_validator("rate_limit_backend")
+    @classmethod
+    def known_rate_limit_backend(cls, value: str) -> str:
+        if value not in ("memory", "database"):
+            raise ValueError("must be 'memory' or 'database'")
+        return value
+
+    @field_validator("discord_api_base", "discord_cdn_base")
+    @classmethod
+    def strip_trailing_slash(cls, value: str) -> str:
+        return value.rstrip("/")
+
+    @model_validator(mode="after")
+    def metrics_need_token(self) -> "Settings":
+        if self.metrics_enabled and not self.metrics_token:
+            raise ValueError("METRICS_ENABLED needs METRICS_TOKEN")
+        return self
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        environ = os.environ if environ is None else environ
+        values = {name: environ[name.upper()] for name in cls.model_fields if name.upper() in environ}
+        return cls(**values)
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Process-wide settings, loaded on first use"""
+    load_dotenv(ROOT_DIR / '.env')
+    return Settings.from_env()
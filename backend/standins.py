@@ -0,0 +1,297 @@
+"""Local stand-ins for the services the API calls out to.
+
+Small Starlette apps imitating the parts of the Discord API, the FiveM
+``dynamic.json`` endpoint and Discord webhook receivers that server.py uses,
+each served by uvicorn on a loopback port in a background thread. Point the
+API at them with DISCORD_API_BASE and FIVEM_DYNAMIC_URL, and give forms a
+``webhook_url`` under the webhook stand-in.
+
+OAuth codes are ``code-<n>``; they exchange for token ``token-<n>`` belonging
+to Discord user ``<DISCORD_USER_BASE + n>``, and every tenth user holds the
+admin role. Channel messages come from a bot with an avatar, and every fifth
+one carries a PNG attachment; both are served under ``/avatars`` and
+``/attachments`` like the Discord CDN (point DISCORD_CDN_BASE at the root).
+``POST /_users/<n>`` with a JSON body such as ``{"username": "ny"}`` changes
+the profile user ``<n>`` gets on their next login.
+
+Faults can be injected per stand-in, in-process through ``StandinState.faults``
+or over HTTP with ``POST /_faults`` and a JSON body such as
+``{"error_rate": 0.5, "error_status": 503, "delay": 2.0}``. ``delay`` is added
+before answering, so a delay longer than the caller's timeout imitates a hang.
+"""
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+DISCORD_USER_BASE = 100000000000000000
+GUILD_ID = "900000000000000001"
+ADMIN_ROLE_ID = "900000000000000002"
+CHANNEL_ID = "900000000000000003"
+BOT_USER_ID = "900000000000000004"
+BOT_AVATAR = "0123456789abcdef0123456789abcdef"
+
+
+def solid_png(width: int, height: int, rgb=(200, 30, 30)) -> bytes:
+    """A one-colour PNG, built without an imaging library"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + bytes(rgb) * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+class StandinState:
+    """Latency, hit counts and profile changes shared by a stand-in's handlers"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.profiles: Dict[int, dict] = {}
+        self.hits: Counter = Counter()
+        self.faults = {"error_rate": 0.0, "error_status": 503, "delay": 0.0}
+        self.injected: Counter = Counter()
+        self.random = random.Random(0)
+
+    async def handle(self, name: str):
+        self.hits[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FaultInjection:
+    """ASGI middleware applying a stand-in's configured faults, and serving /_faults to change them"""
+
+    def __init__(self, app, state: StandinState):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == "/_faults":
+            if scope["method"] == "POST":
+                body = b""
+                while True:
+                    message = await receive()
+                    body += message.get("body", b"")
+                    if not message.get("more_body"):
+                        break
+                self.state.faults.update(json.loads(body or b"{}"))
+            await JSONResponse(self.state.faults)(scope, receive, send)
+            return
+        faults = self.state.faults
+        if faults["delay"]:
+            self.state.injected["delay"] += 1
+            await asyncio.sleep(faults["delay"])
+        if faults["error_rate"] and self.state.random.random() < faults["error_rate"]:
+            self.state.injected["error"] += 1
+            await JSONResponse({"message": "injected fault"}, status_code=faults["error_status"])(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def _user_number(token: str) -> Optional[int]:
+    prefix, _, number = token.partition("-")
+    return int(number) if prefix == "token" and number.isdigit() else None
+
+
+def discord_app(state: StandinState) -> Starlette:
+    async def oauth_token(request: Request):
+        await state.handle("oauth2/token")
+        form = parse_qs((await request.body()).decode())
+        prefix, _, number = form.get("code", [""])[0].partition("-")
+        if prefix != "code" or not number.isdigit():
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        return JSONResponse({"access_token": f"token-{number}", "token_type": "Bearer", "expires_in": 604800})
+
+    def bearer_user(request: Request) -> Optional[int]:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        return _user_number(token) if scheme == "Bearer" else None
+
+    async def current_user(request: Request):
+        await state.handle("users/@me")
+        number = bearer_user(request)
+        if number is None:
+            return JSONResponse({"message": "401: Unauthorized"}, status_code=401)
+        return JSONResponse({
+            "id": str(DISCORD_USER_BASE + number),
+            "username": f"spiller{number}",
+            "avatar": f"{number:032x}",
+            "discriminator": "0",
+            **state.profiles.get(number, {}),
+        })
+
+    async def change_profile(request: Request):
+        number = int(request.path_params["number"])
+        state.profiles.setdefault(number, {}).update(await request.json())
+        return JSONResponse(state.profiles[number])
+
+    async def current_user_guilds(request: Request):
+        await state.handle("users/@me/guilds")
+        if bearer_user(request) is None:
+            return JSONResponse({"message": "401: Unauthorized"}, status_code=401)
+        return JSONResponse([{"id": GUILD_ID, "name": "Revolution Roleplay"}])
+
+    async def current_user_member(request: Request):
+        await state.handle("users/@me/guilds/member")
+        number = bearer_user(request)
+        if number is None:
+            return JSONResponse({"message": "401: Unauthorized"}, status_code=401)
+        roles = [ADMIN_ROLE_ID] if number % 10 == 0 else []
+        return JSONResponse({"user": {"id": str(DISCORD_USER_BASE + number)}, "roles": roles})
+
+    async def guild_member(request: Request):
+        await state.handle("guilds/members")
+        user_id = request.path_params["user_id"]
+        number = int(user_id) - DISCORD_USER_BASE
+        roles = [ADMIN_ROLE_ID] if number % 10 == 0 else []
+        return JSONResponse({"user": {"id": user_id}, "roles": roles})
+
+    async def channel_messages(request: Request):
+        await state.handle("channels/messages")
+        limit = int(request.query_params.get("limit", 50))
+        now = datetime.utcnow().isoformat()
+        base = str(request.base_url).rstrip("/")
+        return JSONResponse([{
+            "id": str(DISCORD_USER_BASE + i),
+            "content": f"Nyhed nummer {i}: serveren genstarter kl. 06:00",
+            "author": {"id": BOT_USER_ID, "username": "Revolution Bot", "avatar": BOT_AVATAR},
+            "timestamp": now,
+            "attachments": [{
+                "id": str(DISCORD_USER_BASE + i),
+                "filename": f"nyhed-{i}.png",
+                "content_type": "image/png",
+                "url": f"{base}/attachments/{CHANNEL_ID}/{DISCORD_USER_BASE + i}/nyhed-{i}.png?ex=standin",
+            }] if i % 5 == 0 else [],
+        } for i in range(limit)])
+
+    image = solid_png(640, 480)
+
+    async def cdn_image(request: Request):
+        await state.handle("cdn")
+        return Response(image, media_type="image/png")
+
+    return Starlette(routes=[
+        Route("/_users/{number:int}", change_profile, methods=["POST"]),
+        Route("/api/oauth2/token", oauth_token, methods=["POST"]),
+        Route("/api/v10/users/@me", current_user),
+        Route("/api/v10/users/@me/guilds", current_user_guilds),
+        Route("/api/v10/users/@me/guilds/{guild_id}/member", current_user_member),
+        Route("/api/v10/guilds/{guild_id}/members/{user_id}", guild_member),
+        Route("/api/v10/channels/{channel_id}/messages", channel_messages),
+        Route("/avatars/{user_id}/{avatar}", cdn_image),
+        Route("/attachments/{channel_id}/{attachment_id}/{filename}", cdn_image),
+    ])
+
+
+def fivem_app(state: StandinState) -> Starlette:
+    async def dynamic(request: Request):
+        await state.handle("dynamic.json")
+        return JSONResponse({
+            "clients": 42, "sv_maxclients": "64",
+            "hostname": "Revolution Roleplay", "gametype": "ESX Legacy", "mapname": "fivem-map-skater",
+        })
+
+    return Starlette(routes=[Route("/dynamic.json", dynamic)])
+
+
+def webhook_app(state: StandinState) -> Starlette:
+    async def receive(request: Request):
+        await state.handle("webhook")
+        await request.body()
+        return Response(status_code=204)
+
+    return Starlette(routes=[Route("/webhooks/{webhook_id}/{token}", receive, methods=["POST"])])
+
+
+class StandinServer:
+    """Runs an ASGI app under uvicorn on 127.0.0.1 in a daemon thread"""
+
+    def __init__(self, app, state: StandinState):
+        app = FaultInjection(app, state)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, log_level="warning", access_log=False, lifespan="off", backlog=2048))
+        self.thread = threading.Thread(
+            target=lambda: asyncio.run(self.server.serve(sockets=[self.sock])), daemon=True)
+
+    def start(self, timeout: float = 10.0) -> "StandinServer":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"Stand-in server on {self.url} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+        self.sock.close()
+
+
+class Standins:
+    """Discord, FiveM and webhook stand-ins with their environment for server.py"""
+
+    def __init__(self, latency: float = 0.0):
+        self.discord = StandinState(latency)
+        self.fivem = StandinState(latency)
+        self.webhook = StandinState(latency)
+        self.servers = {
+            "discord": StandinServer(discord_app(self.discord), self.discord),
+            "fivem": StandinServer(fivem_app(self.fivem), self.fivem),
+            "webhook": StandinServer(webhook_app(self.webhook), self.webhook),
+        }
+
+    def __enter__(self) -> "Standins":
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def __exit__(self, *exc):
+        for server in self.servers.values():
+            server.stop()
+
+    def environ(self) -> dict:
+        return {
+            "DISCORD_API_BASE": f"{self.servers['discord'].url}/api",
+            "DISCORD_CDN_BASE": self.servers['discord'].url,
+            "FIVEM_DYNAMIC_URL": f"{self.servers['fivem'].url}/dynamic.json",
+            "DISCORD_BOT_TOKEN": "standin-bot-token",
+            "DISCORD_CLIENT_ID": "standin-client",
+            "DISCORD_CLIENT_SECRET": "standin-secret",
+            "DISCORD_GUILD_ID": GUILD_ID,
+            "DISCORD_ADMIN_ROLE_ID": ADMIN_ROLE_ID,
+            "DISCORD_CHANNEL_ID": CHANNEL_ID,
+        }
+
+    def state(self, name: str) -> StandinState:
+        return {"discord": self.discord, "fivem": self.fivem, "webhook": self.webhook}[name]
+
+    def webhook_url(self, name: str) -> str:
+        return f"{self.servers['webhook'].url}/webhooks/{name}/standin-token"
+
+    def hits(self) -> dict:
+        return {
+            name: {**state.hits, **{f"injected {kind}": count for kind, count in state.injected.items()}}
+            for name, state in (("discord", self.discord), ("fivem", self.fivem), ("webhook", self.webhook))
+        }
@@ -0,0 +1,252 @@
+"""Serves the built frontend (deploy/website) from the API process.
+
+``precompress()`` runs at build time (``python static_site.py deploy/website``,
+called by quick-deploy.sh) and writes ``.br`` and ``.gz`` siblings for text
+assets; they are build output and not committed. Source maps are left alone,
+since only developer tools fetch them. ``StaticSite`` scans the build once,
+ignoring a variant older than its source (left over from an earlier build),
+and then, per request:
+
+* picks the smallest encoding the client accepts (br, gzip, identity), so no
+  compression happens while serving;
+* marks fingerprinted files (``main.7c7a7255.js``) ``immutable`` for a year,
+  and everything else, ``index.html`` included, ``no-cache`` with an ETag so
+  browsers revalidate with a 304;
+* answers unknown paths that are not under /api with ``index.html`` so client
+  side routes survive a reload.
+
+Mount it with ``SiteMount`` rather than a plain ``Mount("/")``: a mount at the
+root matches every path, so it would also catch API paths and turn FastAPI's
+405 for a known route called with the wrong method into a 404.
+
+Bodies go out with the ASGI ``pathsend`` extension when the server offers it
+(the server can then use ``sendfile``); uvicorn does not, so small files are
+served from memory and large ones streamed from disk.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import anyio
+from starlette.routing import Match, Mount
+
+try:
+    import brotli
+except ImportError:  # optional; only .gz variants are built without it
+    brotli = None
+
+COMPRESSIBLE = {".html", ".js", ".css", ".json", ".svg", ".txt", ".ico", ".xml", ".webmanifest"}
+VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+MIN_SIZE = 256  # smaller files are not worth a Content-Encoding
+MIN_SAVING = 0.9  # keep a variant only if it is at most 90% of the original
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+MEMORY_LIMIT = 1024 * 1024  # files up to this size are kept in memory
+CHUNK_SIZE = 256 * 1024
+
+mimetypes.add_type("application/json", ".map")
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompress(root: Path) -> List[Tuple[str, str, int, int]]:
+    """Write .br/.gz variants next to compressible files; returns (path, encoding, size, compressed size)"""
+    written = []
+    for path in sorted(Path(root).rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE:
+            continue
+        data = None
+        for encoding, suffix in VARIANTS:
+            if encoding == "br" and brotli is None:
+                continue
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            data = path.read_bytes() if data is None else data
+            compressed = _compress(data, encoding)
+            if len(data) < MIN_SIZE or len(compressed) > len(data) * MIN_SAVING:
+                target.unlink(missing_ok=True)
+                continue
+            target.write_bytes(compressed)
+            written.append((str(path.relative_to(root)), encoding, len(data), len(compressed)))
+    return written
+
+
+class Variant(NamedTuple):
+    path: str
+    size: int
+    etag: str
+
+
+class Asset(NamedTuple):
+    media_type: str
+    cache_control: str
+    variants: Dict[str, Variant]  # content coding -> file
+
+
+def _etag(path: Path) -> str:
+    return '"' + hashlib.sha1(path.read_bytes()).hexdigest()[:20] + '"'
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Content codings from an Accept-Encoding header with their q-values"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class StaticSite:
+    """ASGI app serving a frontend build directory"""
+
+    def __init__(self, root: Path, index: str = "index.html", excluded_prefixes: Tuple[str, ...] = ("/api",)):
+        self.root = Path(root)
+        self.index = "/" + index
+        self.excluded_prefixes = excluded_prefixes
+        self.assets = self._scan()
+        self.memory: Dict[str, bytes] = {}
+
+    def excluded(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.excluded_prefixes)
+
+    def _scan(self) -> Dict[str, Asset]:
+        assets: Dict[str, Asset] = {}
+        suffixes = tuple(suffix for _, suffix in VARIANTS)
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file() or path.name.endswith(suffixes):
+                continue
+            url = "/" + path.relative_to(self.root).as_posix()
+            etag = _etag(path)
+            stat = path.stat()
+            variants = {"identity": Variant(str(path), stat.st_size, etag)}
+            for encoding, suffix in VARIANTS:
+                compressed = path.with_name(path.name + suffix)
+                if compressed.is_file() and compressed.stat().st_mtime >= stat.st_mtime:
+                    variants[encoding] = Variant(str(compressed), compressed.stat().st_size, etag[:-1] + f'-{encoding}"')
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+                media_type += "; charset=utf-8"
+            fingerprinted = url.startswith("/static/") and FINGERPRINT_RE.search(path.name)
+            assets[url] = Asset(media_type, IMMUTABLE if fingerprinted else REVALIDATE, variants)
+        return assets
+
+    def _choose(self, asset: Asset, accept_encoding: str) -> Tuple[str, Variant]:
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best = ("identity", asset.variants["identity"])
+        for encoding, variant in asset.variants.items():
+            if encoding != "identity" and accepted.get(encoding, wildcard) > 0 and variant.size < best[1].size:
+                best = (encoding, variant)
+        return best
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        if self.excluded(path):
+            await self._respond(send, 404, [(b"content-type", b"application/json")], b'{"detail":"Not Found"}')
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._respond(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+        asset = self.assets.get(path)
+        if asset is None and path.endswith("/"):
+            asset = self.assets.get(path + "index.html")
+        if asset is None:
+            # Client-side routes get the app shell; missing files get a 404
+            if "." in path.rsplit("/", 1)[-1]:
+                await self._respond(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+                return
+            asset = self.assets.get(self.index)
+            if asset is None:
+                await self._respond(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+                return
+
+        request_headers = dict(scope["headers"])
+        encoding, variant = self._choose(asset, request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        headers = [
+            (b"etag", variant.etag.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        if if_none_match and (if_none_match.strip() == "*" or variant.etag in {
+                tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}):
+            await self._respond(send, 304, headers)
+            return
+
+        headers += [
+            (b"content-type", asset.media_type.encode()),
+            (b"content-length", str(variant.size).encode()),
+        ]
+        if encoding != "identity":
+            headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": variant.path})
+        elif variant.size <= MEMORY_LIMIT:
+            body = self.memory.get(variant.path)
+            if body is None:
+                body = self.memory[variant.path] = await anyio.Path(variant.path).read_bytes()
+            await send({"type": "http.response.body", "body": body})
+        else:
+            async with await anyio.open_file(variant.path, "rb") as file:
+                more_body = True
+                while more_body:
+                    chunk = await file.read(CHUNK_SIZE)
+                    more_body = len(chunk) == CHUNK_SIZE
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _respond(self, send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes = b""):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": headers + [(b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+class SiteMount(Mount):
+    """Root mount for a StaticSite that does not match its excluded prefixes, leaving them to the app's routes"""
+
+    def __init__(self, site: StaticSite, name: Optional[str] = None):
+        super().__init__("/", app=site, name=name)
+        self.site = site
+
+    def matches(self, scope) -> Tuple[Match, dict]:
+        if scope["type"] == "http" and self.site.excluded(scope["path"]):
+            return Match.NONE, {}
+        return super().matches(scope)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    roots = (argv if argv is not None else sys.argv[1:]) or [os.path.join(os.path.dirname(__file__), "..", "deploy", "website")]
+    for root in roots:
+        for path, encoding, size, compressed in precompress(Path(root)):
+            print(f"{path}.{'br' if encoding == 'br' else 'gz'}: {size} -> {compressed} bytes ({compressed / size:.0%})")
+    if brotli is None:
+        print("brotli is not installed; only .gz variants were written", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
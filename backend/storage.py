@@ -0,0 +1,1357 @@
+"""Storage backends for the Revolution Roleplay API.
+
+server.py talks to its data through ``db.<collection>`` using the Motor API.
+``open_database`` returns either a real Motor database or an embedded SQLite
+database exposing the same subset of that API, so routes do not care which one
+is configured:
+
+    MONGO_URL="mongodb://localhost:27017"     -> Motor / MongoDB
+    MONGO_URL="sqlite:///data/revolution.db"  -> embedded SQLite (WAL mode)
+
+The SQLite tables follow backend/database.sql (the PHP/MySQL deployment), with
+JSON columns stored as TEXT and one extra ``extra`` JSON column holding any
+document fields the MySQL schema does not have. Collections without a table in
+that schema are kept as JSON documents in a generic ``documents`` table.
+"""
+import asyncio
+import contextlib
+import json
+import re
+import functools
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from ids import new_id
+
+SQLITE_PREFIX = "sqlite://"
+ITER_BATCH_SIZE = 1000
+BUSY_TIMEOUT_SECONDS = 10.0  # how long a write waits for another process holding the write lock
+SIMPLE_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+SQL_COMPARISONS = {"$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">="}
+REGEX_METACHARACTERS = set("\\.^$*+?{}[]|()")
+
+# Table definitions mirror database.sql. The foreign key from submissions to
+# forms is left out on purpose: the Mongo backend keeps submissions when a form
+# is deleted and both backends must behave the same.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id VARCHAR(50) PRIMARY KEY,
+    username VARCHAR(100) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(10) DEFAULT 'staff',
+    allowed_forms JSON,
+    created_at TIMESTAMP,
+    created_by VARCHAR(50),
+    updated_at TIMESTAMP,
+    extra JSON
+);
+
+CREATE TABLE IF NOT EXISTS application_forms (
+    id VARCHAR(50) PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    position VARCHAR(100) NOT NULL,
+    fields JSON NOT NULL,
+    webhook_url VARCHAR(500),
+    is_active BOOLEAN DEFAULT 1,
+    created_at TIMESTAMP,
+    created_by VARCHAR(50),
+    updated_at TIMESTAMP,
+    extra JSON
+);
+
+CREATE TABLE IF NOT EXISTS application_submissions (
+    id VARCHAR(50) PRIMARY KEY,
+    form_id VARCHAR(50) NOT NULL,
+    applicant_name VARCHAR(255) NOT NULL,
+    applicant_discord_id VARCHAR(100),
+    responses JSON NOT NULL,
+    status VARCHAR(10) DEFAULT 'pending',
+    submitted_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    extra JSON
+);
+
+CREATE TABLE IF NOT EXISTS changelogs (
+    id VARCHAR(50) PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    version VARCHAR(50),
+    created_at TIMESTAMP,
+    created_by VARCHAR(50),
+    updated_at TIMESTAMP,
+    extra JSON
+);
+
+CREATE TABLE IF NOT EXISTS discord_users (
+    id VARCHAR(50) PRIMARY KEY,
+    discord_id VARCHAR(100) NOT NULL UNIQUE,
+    discord_username VARCHAR(100) NOT NULL,
+    discord_avatar VARCHAR(255),
+    discord_discriminator VARCHAR(10),
+    is_admin BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP,
+    last_login TIMESTAMP,
+    extra JSON
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection VARCHAR(100) NOT NULL,
+    body JSON NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE INDEX IF NOT EXISTS idx_forms_active ON application_forms(is_active);
+CREATE INDEX IF NOT EXISTS idx_submissions_form_id ON application_submissions(form_id);
+CREATE INDEX IF NOT EXISTS idx_submissions_status ON application_submissions(status);
+CREATE INDEX IF NOT EXISTS idx_changelogs_created_at ON changelogs(created_at);
+CREATE INDEX IF NOT EXISTS idx_discord_users_discord_id ON discord_users(discord_id);
+CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents(collection);
+"""
+
+
+class TableSpec:
+    def __init__(self, table: str, columns: List[str], json_columns=(), time_columns=(), bool_columns=()):
+        self.table = table
+        self.columns = columns
+        self.json_columns = set(json_columns)
+        self.time_columns = set(time_columns)
+        self.bool_columns = set(bool_columns)
+        # Plain scalar columns can take equality filters directly in SQL
+        self.scalar_columns = set(columns) - self.json_columns - self.time_columns
+
+
+TABLES: Dict[str, TableSpec] = {
+    "admin_users": TableSpec(
+        "users",
+        ["id", "username", "password_hash", "role", "allowed_forms", "created_at", "created_by", "updated_at"],
+        json_columns=["allowed_forms"], time_columns=["created_at", "updated_at"]),
+    "application_forms": TableSpec(
+        "application_forms",
+        ["id", "title", "description", "position", "fields", "webhook_url", "is_active",
+         "created_at", "created_by", "updated_at"],
+        json_columns=["fields"], time_columns=["created_at", "updated_at"], bool_columns=["is_active"]),
+    "application_submissions": TableSpec(
+        "application_submissions",
+        ["id", "form_id", "applicant_name", "applicant_discord_id", "responses", "status",
+         "submitted_at", "updated_at"],
+        json_columns=["responses"], time_columns=["submitted_at", "updated_at"]),
+    "changelogs": TableSpec(
+        "changelogs",
+        ["id", "title", "content", "version", "created_at", "created_by", "updated_at"],
+        time_columns=["created_at", "updated_at"]),
+    "discord_users": TableSpec(
+        "discord_users",
+        ["id", "discord_id", "discord_username", "discord_avatar", "discord_discriminator",
+         "is_admin", "created_at", "last_login"],
+        time_columns=["created_at", "last_login"], bool_columns=["is_admin"]),
+}
+
+
+def open_database(url: str, name: str, command_listeners=(), observer=None):
+    """Return ``(client, db)`` for a Mongo or ``sqlite://`` URL.
+
+    command_listeners are pymongo monitoring listeners for Motor; observer is
+    called as ``observer(collection, operation, seconds, failed)`` by SQLite.
+    """
+    if url.startswith(SQLITE_PREFIX):
+        client = SQLiteClient(url[len(SQLITE_PREFIX):], observer=observer)
+        return client, client[name]
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(url, event_listeners=list(command_listeners))
+    return client, client[name]
+
+
+# JSON encoding that round-trips datetimes
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_hook(obj):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+
+def loads(text: Optional[str]):
+    if text is None:
+        return None
+    return json.loads(text, object_hook=_json_hook)
+
+
+# Mongo query and update semantics, evaluated in Python
+_MISSING = object()
+
+
+def get_path(doc: Any, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit():
+            index = int(part)
+            value = value[index] if index < len(value) else _MISSING
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _comparable(a, b) -> bool:
+    if a is None or b is None or a is _MISSING:
+        return False
+    numbers = (int, float)
+    return isinstance(a, numbers) and isinstance(b, numbers) or type(a) is type(b)
+
+
+def _values_equal(value, target) -> bool:
+    if value is _MISSING:
+        return target is None
+    if value == target:
+        return True
+    return isinstance(value, list) and not isinstance(target, list) and target in value
+
+
+def _match_operator(value, op: str, arg) -> bool:
+    candidates = value if isinstance(value, list) else [value]
+    if op == "$eq":
+        return _values_equal(value, arg)
+    if op == "$ne":
+        return not _values_equal(value, arg)
+    if op == "$in":
+        return any(_values_equal(value, item) for item in arg)
+    if op == "$nin":
+        return not any(_values_equal(value, item) for item in arg)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op in ("$lt", "$lte", "$gt", "$gte"):
+        for candidate in candidates:
+            if not _comparable(candidate, arg):
+                continue
+            if (op == "$lt" and candidate < arg or op == "$lte" and candidate <= arg
+                    or op == "$gt" and candidate > arg or op == "$gte" and candidate >= arg):
+                return True
+        return False
+    if op == "$regex":
+        pattern = re.compile(arg) if isinstance(arg, str) else arg
+        return any(isinstance(c, str) and pattern.search(c) for c in candidates)
+    if op == "$options":
+        return True
+    if op == "$not":
+        return not _match_condition(value, arg)
+    if op == "$size":
+        return isinstance(value, list) and len(value) == arg
+    raise NotImplementedError(f"Query operator {op} is not supported by the SQLite backend")
+
+
+def _match_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        if "$regex" in condition and "$options" in condition:
+            flags = re.IGNORECASE if "i" in condition["$options"] else 0
+            condition = dict(condition, **{"$regex": re.compile(condition["$regex"], flags)})
+        return all(_match_operator(value, op, arg) for op, arg in condition.items())
+    return _values_equal(value, condition)
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        elif not _match_condition(get_path(doc, key), condition):
+            return False
+    return True
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False) -> dict:
+    if not any(key.startswith("$") for key in update):
+        replacement = dict(update)
+        if "id" in doc:
+            replacement.setdefault("id", doc["id"])
+        doc.clear()
+        doc.update(replacement)
+        return doc
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, arg in fields.items():
+            current = get_path(doc, path)
+            if op in ("$set", "$setOnInsert"):
+                set_path(doc, path, arg)
+            elif op == "$unset":
+                unset_path(doc, path)
+            elif op == "$inc":
+                set_path(doc, path, (0 if current is _MISSING else current) + arg)
+            elif op in ("$max", "$min"):
+                if current is _MISSING or (op == "$max" and arg > current) or (op == "$min" and arg < current):
+                    set_path(doc, path, arg)
+            elif op in ("$push", "$addToSet"):
+                items = list(current) if isinstance(current, list) else []
+                new_items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                for item in new_items:
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                set_path(doc, path, items)
+            elif op == "$pull":
+                if isinstance(current, list):
+                    if isinstance(arg, dict):
+                        kept = [item for item in current if not (
+                            matches(item, arg) if isinstance(item, dict) else _match_condition(item, arg))]
+                    else:
+                        kept = [item for item in current if item != arg]
+                    set_path(doc, path, kept)
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the SQLite backend")
+    return doc
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    included = [key for key, flag in projection.items() if flag and key != "_id"]
+    if included:
+        result = {}
+        for key in included:
+            value = get_path(doc, key)
+            if value is not _MISSING:
+                set_path(result, key, value)
+        return result
+    result = dict(doc)
+    for key, flag in projection.items():
+        if not flag:
+            unset_path(result, key)
+    return result
+
+
+def _sort_key(value):
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (2, int(value))
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, datetime):
+        return (5, value)
+    # Objects and arrays order by their compact JSON text, which SQL can reproduce
+    return (4, json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":")))
+
+
+def sort_documents(docs: List[dict], sort: Optional[List[Tuple[str, int]]]):
+    for key, direction in reversed(sort or []):
+        docs.sort(key=lambda doc: _sort_key(get_path(doc, key)), reverse=direction < 0)
+    return docs
+
+
+def sort_pairs(pairs: List[Tuple[Any, dict]], sort: Optional[List[Tuple[str, int]]]):
+    for key, direction in reversed(sort or []):
+        pairs.sort(key=lambda pair: _sort_key(get_path(pair[1], key)), reverse=direction < 0)
+    return pairs
+
+
+def normalize_sort(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    return list(key_or_list)
+
+
+def _regex_literal(pattern) -> Tuple[Optional[str], bool]:
+    """(text every match contains, whether it is at the start) for a regex string, or (None, False)"""
+    if not isinstance(pattern, str) or "|" in pattern:
+        return None, False
+    anchored = pattern.startswith("^")
+    literal = []
+    for char in pattern[1:] if anchored else pattern:
+        if char in REGEX_METACHARACTERS:
+            if char in "?*{" and literal:
+                literal.pop()  # the quantified character may be absent
+            break
+        literal.append(char)
+    return ("".join(literal) or None), anchored
+
+
+def _index_keys(keys) -> List[str]:
+    if isinstance(keys, str):
+        return [keys]
+    return [key for key, _ in keys]
+
+
+# Aggregation pipelines, evaluated in Python
+def evaluate(expression, doc: dict):
+    """Value of an aggregation expression ("$field", operator object or literal) for doc"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            op, arg = next(iter(expression.items()))
+            if op.startswith("$"):
+                return _evaluate_operator(op, arg, doc)
+        return {key: evaluate(value, doc) for key, value in expression.items()}
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    return expression
+
+
+def _evaluate_operator(op: str, arg, doc: dict):
+    if op == "$literal":
+        return arg
+    if op == "$dateToString":
+        date = evaluate(arg["date"], doc)
+        if not isinstance(date, datetime):
+            return None
+        return date.strftime(arg.get("format", "%Y-%m-%dT%H:%M:%S.%LZ").replace(
+            "%L", f"{date.microsecond // 1000:03d}"))
+    if op == "$toString":
+        value = evaluate(arg, doc)
+        return None if value is None else str(value)
+    if op == "$cond":
+        condition, then, otherwise = (arg["if"], arg["then"], arg["else"]) if isinstance(arg, dict) else arg
+        return evaluate(then, doc) if evaluate(condition, doc) else evaluate(otherwise, doc)
+    if op == "$ifNull":
+        value = evaluate(arg[0], doc)
+        return evaluate(arg[1], doc) if value is None else value
+    if op in ("$eq", "$ne", "$in"):
+        left, right = evaluate(arg[0], doc), evaluate(arg[1], doc)
+        if op == "$in":
+            return left in (right or [])
+        return (left == right) == (op == "$eq")
+    if op == "$isArray":
+        return isinstance(evaluate(arg[0] if isinstance(arg, list) else arg, doc), list)
+    raise NotImplementedError(f"Expression operator {op} is not supported by the SQLite backend")
+
+
+def _accumulate(groups: Dict[str, dict], key, spec: dict, doc: dict):
+    group = groups.get(key)
+    if group is None:
+        group = groups[key] = {"_id": json.loads(key, object_hook=_json_hook)}
+        for field, accumulator in spec.items():
+            op = next(iter(accumulator))
+            group[field] = 0 if op == "$sum" else [0, 0] if op == "$avg" else [] if op in (
+                "$push", "$addToSet") else _MISSING if op == "$first" else None
+    for field, accumulator in spec.items():
+        op, expression = next(iter(accumulator.items()))
+        value = evaluate(expression, doc)
+        current = group[field]
+        if op == "$sum":
+            group[field] = current + (value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0)
+        elif op == "$avg":
+            if isinstance(value, (int, float)):
+                current[0] += value
+                current[1] += 1
+        elif op in ("$min", "$max"):
+            if value is not None and (current is None or (value < current if op == "$min" else value > current)):
+                group[field] = value
+        elif op == "$first":
+            if current is _MISSING:
+                group[field] = value
+        elif op == "$last":
+            group[field] = value
+        elif op == "$push":
+            current.append(value)
+        elif op == "$addToSet":
+            if value not in current:
+                current.append(value)
+        else:
+            raise NotImplementedError(f"Accumulator {op} is not supported by the SQLite backend")
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    spec = dict(spec)
+    id_expression = spec.pop("_id")
+    groups: Dict[str, dict] = {}
+    for doc in docs:
+        _accumulate(groups, dumps(evaluate(id_expression, doc)), spec, doc)
+    results = []
+    for group in groups.values():
+        for field, accumulator in spec.items():
+            if "$avg" in accumulator:
+                total, count = group[field]
+                group[field] = total / count if count else None
+            elif group[field] is _MISSING:
+                group[field] = None
+        results.append(group)
+    return results
+
+
+def _project_stage(doc: dict, spec: dict) -> dict:
+    if all(value in (0, False) for key, value in spec.items()):
+        return project(doc, spec)
+    result = {} if spec.get("_id", 1) in (0, False) else {"_id": doc.get("_id")}
+    for key, value in spec.items():
+        if key == "_id" and value in (0, False, 1, True):
+            continue
+        if value in (1, True):
+            found = get_path(doc, key)
+            if found is not _MISSING:
+                set_path(result, key, found)
+        else:
+            set_path(result, key, evaluate(value, doc))
+    return result
+
+
+def run_pipeline(docs: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$project":
+            docs = [_project_stage(doc, spec) for doc in docs]
+        elif name == "$addFields" or name == "$set":
+            docs = [{**doc, **{key: evaluate(value, doc) for key, value in spec.items()}} for doc in docs]
+        elif name == "$unwind":
+            path = (spec["path"] if isinstance(spec, dict) else spec)[1:]
+            keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays")
+            unwound = []
+            for doc in docs:
+                value = get_path(doc, path)
+                if isinstance(value, list) and value:
+                    for item in value:
+                        item_doc = json.loads(dumps(doc), object_hook=_json_hook)
+                        set_path(item_doc, path, item)
+                        unwound.append(item_doc)
+                elif value not in (_MISSING, None, []) and not isinstance(value, list):
+                    unwound.append(doc)
+                elif keep_empty:
+                    unwound.append(doc)
+            docs = unwound
+        elif name == "$sort":
+            docs = sort_documents(list(docs), list(spec.items()))
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$count":
+            docs = [{spec: len(docs)}]
+        else:
+            raise NotImplementedError(f"Pipeline stage {name} is not supported by the SQLite backend")
+    return docs
+
+
+class SQLiteAggregateCursor:
+    def __init__(self, collection: "SQLiteCollection", pipeline: List[dict]):
+        self.collection = collection
+        self.pipeline = list(pipeline)
+        self._buffer: Optional[List[dict]] = None
+
+    def _execute(self) -> List[dict]:
+        pipeline = self.pipeline
+        query = None
+        # A leading $match is pushed down like a find() filter
+        if pipeline and "$match" in pipeline[0]:
+            query, pipeline = pipeline[0]["$match"], pipeline[1:]
+        docs = [doc for _, doc in self.collection._matching(query)]
+        return run_pipeline(docs, pipeline)
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = await self.collection._aggregate(self._execute)
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._buffer is None:
+            self._buffer = list(reversed(await self.to_list(None)))
+        if not self._buffer:
+            raise StopAsyncIteration
+        return self._buffer.pop()
+
+
+# Results mirroring pymongo.results
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self, inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0):
+        self.inserted_count = inserted_count
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.deleted_count = deleted_count
+        self.upserted_count = upserted_count
+        self.acknowledged = True
+
+
+def observed(operation: str):
+    """Report a collection method's duration to the client's observer, named like the Mongo command"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            observer = self.client.observer
+            if observer is None:
+                return await method(self, *args, **kwargs)
+            start = time.perf_counter()
+            failed = False
+            try:
+                return await method(self, *args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                observer(self.name, operation, time.perf_counter() - start, failed)
+        return wrapper
+    return decorator
+
+
+class SQLiteClient:
+    """Holds one SQLite connection, used from a single worker thread"""
+
+    def __init__(self, path: str, observer=None):
+        self.path = path or ":memory:"
+        self.observer = observer
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.connection = self.executor.submit(self._connect).result()
+        self.databases: Dict[str, "SQLiteDatabase"] = {}
+        self.transaction_depth = 0
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS,
+                                     check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SQLITE_SCHEMA)
+        return connection
+
+    def __getitem__(self, name: str) -> "SQLiteDatabase":
+        if name not in self.databases:
+            # One file per deployment; the Mongo database name is kept for parity only
+            self.databases[name] = SQLiteDatabase(self, name)
+        return self.databases[name]
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Group statements into one transaction; nested calls join the outer one.
+
+        IMMEDIATE takes the database's write lock up front, so the reads inside
+        see no other process's write until the transaction ends.
+        """
+        if self.transaction_depth:
+            self.transaction_depth += 1
+            try:
+                yield
+            finally:
+                self.transaction_depth -= 1
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.transaction_depth = 1
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        else:
+            self.connection.execute("COMMIT")
+        finally:
+            self.transaction_depth = 0
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        def _close():
+            self.connection.close()
+        self.executor.submit(_close).result()
+        self.executor.shutdown(wait=True)
+
+
+class SQLiteDatabase:
+    def __init__(self, client: SQLiteClient, name: str):
+        self.client = client
+        self.name = name
+        self.collections: Dict[str, "SQLiteCollection"] = {}
+
+    def __getitem__(self, name: str) -> "SQLiteCollection":
+        if name not in self.collections:
+            self.collections[name] = SQLiteCollection(self, name)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> "SQLiteCollection":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        return {"ok": 1.0}
+
+    async def create_collection(self, name: str, capped: bool = False, max: Optional[int] = None, **kwargs):
+        """Collections exist implicitly; a capped ``max`` keeps only the newest documents"""
+        collection = self[name]
+        if capped and max:
+            collection.capped_max = max
+        return collection
+
+    async def list_collection_names(self):
+        def _names():
+            rows = self.client.connection.execute("SELECT DISTINCT collection FROM documents").fetchall()
+            return sorted(set(TABLES) | {row[0] for row in rows})
+        return await self.client.run(_names)
+
+
+class SQLiteCursor:
+    def __init__(self, collection: "SQLiteCollection", query: Optional[dict], projection: Optional[dict]):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._buffer: Optional[List[dict]] = None
+        self._last_rowid = 0
+        self._exhausted = False
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _execute(self) -> List[dict]:
+        docs = self.collection._find_sync(self.query, self._sort, self._skip, self._limit)
+        return [project(doc, self.projection) for doc in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = await self.collection._find_many(self._execute)
+        return docs if length is None else docs[:length]
+
+    def _next_batch(self) -> List[dict]:
+        # Unsorted scans walk the table in rowid order a batch at a time, so large
+        # collections can be streamed without loading them whole
+        pairs = self.collection._matching(self.query, after_rowid=self._last_rowid, batch=ITER_BATCH_SIZE)
+        raw_count = self.collection._last_scan_count
+        if pairs:
+            self._last_rowid = self.collection._last_scan_rowid
+        if raw_count < ITER_BATCH_SIZE:
+            self._exhausted = True
+        elif not pairs:
+            self._last_rowid = self.collection._last_scan_rowid
+        return [project(doc, self.projection) for _, doc in pairs]
+
+    async def explain(self) -> Dict[str, Any]:
+        """SQLite's plan for the pushed-down part of the query and sort"""
+        return await self.collection.client.run(self.collection._explain_sync, self.query, self._sort)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._buffer is None:
+            if self._sort or self._skip or self._limit:
+                self._buffer = list(reversed(await self.to_list(None)))
+                self._exhausted = True
+            else:
+                self._buffer = []
+        while not self._buffer and not self._exhausted:
+            self._buffer = list(reversed(await self.collection.client.run(self._next_batch)))
+        if not self._buffer:
+            raise StopAsyncIteration
+        return self._buffer.pop()
+
+
+class SQLiteCollection:
+    """Motor-compatible collection backed by a database.sql table or the documents table"""
+
+    def __init__(self, database: SQLiteDatabase, name: str):
+        self.database = database
+        self.client = database.client
+        self.name = name
+        self.spec = TABLES.get(name)
+        self.capped_max: Optional[int] = None
+        self._last_scan_count = 0
+        self._last_scan_rowid = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self.client.connection
+
+    # Row conversion
+    def _to_row(self, doc: dict) -> Dict[str, Any]:
+        spec = self.spec
+        row = {}
+        extra = {}
+        for key, value in doc.items():
+            if key == "_id":
+                continue
+            if key in spec.json_columns:
+                row[key] = dumps(value) if value is not None else None
+            elif key in spec.time_columns:
+                row[key] = value.isoformat() if isinstance(value, datetime) else value
+            elif key in spec.columns:
+                row[key] = value
+            else:
+                extra[key] = value
+        row["extra"] = dumps(extra) if extra else None
+        return row
+
+    def _from_row(self, row: sqlite3.Row) -> dict:
+        spec = self.spec
+        doc = {}
+        for key in spec.columns:
+            value = row[key]
+            if value is None:
+                if key in spec.json_columns or key in spec.time_columns or key == "updated_at":
+                    continue
+            elif key in spec.json_columns:
+                value = loads(value)
+            elif key in spec.time_columns:
+                value = datetime.fromisoformat(value)
+            elif key in spec.bool_columns:
+                value = bool(value)
+            doc[key] = value
+        if row["extra"]:
+            doc.update(loads(row["extra"]))
+        return doc
+
+    # Reads
+    def _candidates(self, query: dict, after_rowid: int = 0, batch: int = 0) -> List[Tuple[Any, dict]]:
+        """(rowid, document) pairs, with the filters SQL can express pushed into SQL"""
+        sql, params = self._candidate_sql(query, after_rowid, batch)
+        rows = self.connection.execute(sql, params).fetchall()
+        self._last_scan_count = len(rows)
+        self._last_scan_rowid = rows[-1]["row_key"] if rows else after_rowid
+        return [(row["row_key"], self._row_document(row)) for row in rows]
+
+    def _row_document(self, row: sqlite3.Row) -> dict:
+        return self._from_row(row) if self.spec else loads(row["body"])
+
+    def _candidate_sql(self, query: dict, after_rowid: int = 0, batch: int = 0,
+                       order: str = "") -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+                if "$options" in condition and condition["$options"]:
+                    condition = {op: arg for op, arg in condition.items() if op not in ("$regex", "$options")}
+                conditions = [(op, arg) for op, arg in condition.items() if op != "$options"]
+            else:
+                conditions = [("$eq", condition)]
+            for op, arg in conditions:
+                pushed = self._sql_condition(key, op, arg)
+                if pushed:
+                    clauses.append(pushed[0])
+                    params.extend(pushed[1])
+        if self.spec:
+            sql = f"SELECT rowid AS row_key, * FROM {self.spec.table}"
+        else:
+            sql = "SELECT rowid AS row_key, body FROM documents"
+            clauses.insert(0, "collection = ?")
+            params.insert(0, self.name)
+        if batch:
+            clauses.append("rowid > ?")
+            params.append(after_rowid)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if batch:
+            sql += f" ORDER BY rowid LIMIT {int(batch)}"
+        else:
+            # Without a sort, documents come back in insertion order even when an index is walked
+            sql += f" ORDER BY {order or 'rowid'}"
+        return sql, params
+
+    def _explain_sync(self, query: dict, sort=None) -> Dict[str, Any]:
+        order = self._order_sql(sort) if sort else ""
+        sql, params = self._candidate_sql(query or {}, order=order or "")
+        steps = [row["detail"] for row in self.connection.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        return {"queryPlanner": {"winningPlan": {"sql": sql, "steps": steps, "sortedInSQL": not sort or bool(order)}}}
+
+    def _column(self, key: str) -> Optional[str]:
+        """The table column holding key, if it is a plain (non-JSON) column"""
+        if self.spec and key in self.spec.columns and key not in self.spec.json_columns:
+            return key
+        return None
+
+    def _json_location(self, key: str) -> Optional[Tuple[str, str]]:
+        """(JSON column, path) of a top-level field kept in JSON text: the document body or a row's extra.
+
+        Dotted paths are left to the Python matcher, which knows how they reach into arrays.
+        """
+        if not SIMPLE_FIELD_RE.match(key):
+            return None
+        if not self.spec:
+            return "body", f"$.{key}"
+        if key in self.spec.columns:
+            return None
+        return "extra", f"$.{key}"
+
+    def _field_sql(self, key: str, value) -> Optional[Tuple[str, Any, str]]:
+        """(SQL expression, parameter, array escape) comparing key against a scalar value"""
+        if isinstance(value, bool) or not isinstance(value, (str, int, float, datetime)):
+            return None
+        column = self._column(key)
+        if column:
+            is_time = column in self.spec.time_columns
+            if isinstance(value, datetime) != is_time:
+                return None
+            return column, value.isoformat() if is_time else value, ""
+        location = self._json_location(key)
+        if location is None:
+            return None
+        base, path = location
+        # Arrays match when any element does, which only the Python matcher can tell
+        escape = f" OR json_type({base}, '{path}') = 'array'"
+        if isinstance(value, datetime):
+            return f"json_extract({base}, '{path}.\"$date\"')", value.isoformat(), escape
+        return f"json_extract({base}, '{path}')", value, escape
+
+    def _sql_condition(self, key: str, op: str, arg) -> Optional[Tuple[str, List[Any]]]:
+        """A SQL clause selecting a superset of the documents matching ``{key: {op: arg}}``.
+
+        Rows are still checked by the Python matcher, so a clause only has to
+        never drop a match; comparisons SQL orders differently (mixed types)
+        are ones Mongo does not match anyway.
+        """
+        if op == "$eq" or op in SQL_COMPARISONS:
+            field = self._field_sql(key, arg)
+            if field is None:
+                return None
+            expression, param, escape = field
+            return f"({expression} {SQL_COMPARISONS.get(op, '=')} ?{escape})", [param]
+        if op == "$in":
+            if not arg or not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in arg):
+                return None
+            fields = [self._field_sql(key, value) for value in arg]
+            if None in fields or len({field[0] for field in fields}) != 1:
+                return None
+            expression, _, escape = fields[0]
+            return f"({expression} IN ({', '.join('?' for _ in arg)}){escape})", [field[1] for field in fields]
+        if op == "$exists":
+            location = self._json_location(key)
+            if location is None:
+                return None
+            base, path = location
+            return f"json_type({base}, '{path}') IS {'NOT ' if arg else ''}NULL", []
+        if op == "$regex":
+            literal, anchored = _regex_literal(arg)
+            field = self._field_sql(key, literal) if literal else None
+            if field is None:
+                return None
+            expression, _, escape = field
+            if anchored:
+                # A prefix is a range, so an index on the field still applies
+                return f"({expression} >= ? AND {expression} < ?{escape})", [literal, literal + "\U0010ffff"]
+            return f"(instr({expression}, ?) > 0{escape})", [literal]
+        return None
+
+    def _order_sql(self, sort: List[Tuple[str, int]]) -> Optional[str]:
+        """ORDER BY terms sorting like sort_documents, or None if a key can only be sorted in Python"""
+        terms = []
+        for key, direction in sort:
+            order = "DESC" if direction < 0 else "ASC"
+            column = self._column(key)
+            if column:
+                terms.append(f"{column} {order}")
+                continue
+            location = self._json_location(key)
+            if location is None:
+                return None
+            base, path = location
+            # Type classes of _sort_key: missing/null, numbers and booleans, text, objects and arrays
+            # (by their JSON text), then dates
+            terms.append(
+                f"CASE json_type({base}, '{path}') WHEN 'integer' THEN 2 WHEN 'real' THEN 2 "
+                f"WHEN 'true' THEN 2 WHEN 'false' THEN 2 WHEN 'text' THEN 3 "
+                f"WHEN 'object' THEN CASE WHEN json_type({base}, '{path}.\"$date\"') = 'text' THEN 5 ELSE 4 END "
+                f"WHEN 'array' THEN 4 ELSE 0 END {order}")
+            terms.append(
+                f"CASE WHEN json_type({base}, '{path}.\"$date\"') = 'text' THEN json_extract({base}, '{path}.\"$date\"') "
+                f"ELSE json_extract({base}, '{path}') END {order}")
+        # Ties keep table order, as Python's stable sort does in either direction
+        return ", ".join(terms + ["rowid ASC"])
+
+    def _matching(self, query: Optional[dict], after_rowid: int = 0, batch: int = 0) -> List[Tuple[Any, dict]]:
+        query = query or {}
+        return [(key, doc) for key, doc in self._candidates(query, after_rowid, batch) if matches(doc, query)]
+
+    def _select(self, query: Optional[dict], sort=None, skip: int = 0, limit: int = 0) -> List[Tuple[Any, dict]]:
+        """Matching (rowid, document) pairs in sort order.
+
+        When SQL can order the rows they are read lazily and reading stops once
+        skip + limit matches are found, so a limited page or a find_one costs
+        about as many rows as it returns when the filter and sort use an index.
+        """
+        query = query or {}
+        order = self._order_sql(sort) if sort else ""
+        if order is None:
+            pairs = sort_pairs(self._matching(query), sort)
+            return pairs[skip:skip + limit] if limit else pairs[skip:]
+        sql, params = self._candidate_sql(query, order=order)
+        pairs = []
+        cursor = self.connection.execute(sql, params)
+        try:
+            for row in cursor:
+                doc = self._row_document(row)
+                if not matches(doc, query):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                pairs.append((row["row_key"], doc))
+                if limit and len(pairs) >= limit:
+                    break
+        finally:
+            cursor.close()
+        return pairs
+
+    def _find_sync(self, query: Optional[dict], sort=None, skip: int = 0, limit: int = 0) -> List[dict]:
+        return [doc for _, doc in self._select(query, sort, skip, limit)]
+
+    @observed("find")
+    async def _find_many(self, execute):
+        return await self.client.run(execute)
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        cursor = SQLiteCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    @observed("find")
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, sort=None):
+        def _find_one():
+            docs = self._find_sync(filter, normalize_sort(sort) if sort else None, limit=1)
+            return project(docs[0], projection) if docs else None
+        return await self.client.run(_find_one)
+
+    @observed("aggregate")
+    async def _aggregate(self, execute):
+        return await self.client.run(execute)
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        return SQLiteAggregateCursor(self, pipeline)
+
+    @observed("count")
+    async def count_documents(self, filter: Optional[dict] = None, **kwargs) -> int:
+        return await self.client.run(lambda: len(self._matching(filter)))
+
+    async def estimated_document_count(self) -> int:
+        return await self.count_documents({})
+
+    @observed("distinct")
+    async def distinct(self, key: str, filter: Optional[dict] = None):
+        def _distinct():
+            values = []
+            for _, doc in self._matching(filter):
+                value = get_path(doc, key)
+                for item in (value if isinstance(value, list) else [value]):
+                    if item is not _MISSING and item not in values:
+                        values.append(item)
+            return values
+        return await self.client.run(_distinct)
+
+    # Writes. Each read-modify-write runs in one BEGIN IMMEDIATE transaction, so the
+    # match and the write are atomic across every process sharing the file, and
+    # uniqueness is enforced by SQLite UNIQUE indexes (see create_index).
+    def _execute_write(self, sql: str, params) -> sqlite3.Cursor:
+        try:
+            return self.connection.execute(sql, params)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}: {e}")
+
+    def _insert_sync(self, doc: dict):
+        doc = {key: value for key, value in doc.items() if key != "_id"}
+        with self.client.transaction():
+            if self.spec:
+                doc.setdefault("id", new_id())
+                row = self._to_row(doc)
+                columns = ", ".join(row)
+                placeholders = ", ".join("?" for _ in row)
+                self._execute_write(
+                    f"INSERT INTO {self.spec.table} ({columns}) VALUES ({placeholders})", list(row.values()))
+                return doc["id"]
+            cursor = self._execute_write(
+                "INSERT INTO documents (collection, body) VALUES (?, ?)", (self.name, dumps(doc)))
+            if self.capped_max:
+                self.connection.execute(
+                    "DELETE FROM documents WHERE collection = ? AND rowid IN ("
+                    "SELECT rowid FROM documents WHERE collection = ? ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.name, self.name, self.capped_max))
+            return doc.get("id", cursor.lastrowid)
+
+    def _replace_sync(self, key, doc: dict):
+        if self.spec:
+            row = self._to_row(doc)
+            for column in self.spec.columns:
+                row.setdefault(column, None)
+            assignments = ", ".join(f"{column} = ?" for column in row)
+            self._execute_write(
+                f"UPDATE {self.spec.table} SET {assignments} WHERE rowid = ?", list(row.values()) + [key])
+        else:
+            self._execute_write("UPDATE documents SET body = ? WHERE rowid = ?", (dumps(doc), key))
+
+    def _delete_sync(self, key):
+        if self.spec:
+            self.connection.execute(f"DELETE FROM {self.spec.table} WHERE rowid = ?", (key,))
+        else:
+            self.connection.execute("DELETE FROM documents WHERE rowid = ?", (key,))
+
+    def _upsert_document(self, query: dict, update: dict) -> dict:
+        doc = {}
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            if isinstance(condition, dict) and "$eq" in condition:
+                set_path(doc, key, condition["$eq"])
+            elif not (isinstance(condition, dict) and any(k.startswith("$") for k in condition)):
+                set_path(doc, key, condition)
+        return apply_update(doc, update, inserting=True)
+
+    def _update_sync(self, query: dict, update: dict, upsert: bool, many: bool, sort=None):
+        """Returns (matched, modified, upserted_id, before, after) for the first document touched"""
+        with self.client.transaction():
+            pairs = self._select(query, normalize_sort(sort) if sort else None, limit=0 if many else 1)
+            if not pairs:
+                if not upsert:
+                    return 0, 0, None, None, None
+                doc = self._upsert_document(query, update)
+                inserted_id = self._insert_sync(doc)
+                return 0, 0, inserted_id, None, doc
+            modified = 0
+            first_before = first_after = None
+            for key, doc in pairs:
+                before = json.loads(dumps(doc), object_hook=_json_hook)
+                after = apply_update(doc, update)
+                if after != before:
+                    self._replace_sync(key, after)
+                    modified += 1
+                if first_before is None:
+                    first_before, first_after = before, after
+        return len(pairs), modified, None, first_before, first_after
+
+    @observed("insert")
+    async def insert_one(self, document: dict, **kwargs):
+        inserted_id = await self.client.run(self._insert_sync, document)
+        return InsertOneResult(inserted_id)
+
+    @observed("insert")
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs):
+        documents = list(documents)
+
+        def _insert_many():
+            with self.client.transaction():
+                return [self._insert_sync(doc) for doc in documents]
+        return InsertManyResult(await self.client.run(_insert_many))
+
+    @observed("update")
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs):
+        matched, modified, upserted_id, _, _ = await self.client.run(
+            self._update_sync, filter, update, upsert, False)
+        return UpdateResult(matched, modified, upserted_id)
+
+    @observed("update")
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs):
+        matched, modified, upserted_id, _, _ = await self.client.run(
+            self._update_sync, filter, update, upsert, True)
+        return UpdateResult(matched, modified, upserted_id)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs):
+        return await self.update_one(filter, replacement, upsert=upsert)
+
+    @observed("findAndModify")
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None,
+                                  sort=None, upsert: bool = False, return_document=False, **kwargs):
+        _, _, _, before, after = await self.client.run(
+            self._update_sync, filter, update, upsert, False, sort)
+        # ReturnDocument.AFTER is True, ReturnDocument.BEFORE is False
+        doc = after if return_document else before
+        return project(doc, projection) if doc is not None else None
+
+    @observed("findAndModify")
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None, **kwargs):
+        def _find_one_and_delete():
+            with self.client.transaction():
+                pairs = self._select(filter, normalize_sort(sort) if sort else None, limit=1)
+                if not pairs:
+                    return None
+                key, doc = pairs[0]
+                self._delete_sync(key)
+                return project(doc, projection)
+        return await self.client.run(_find_one_and_delete)
+
+    @observed("delete")
+    async def delete_one(self, filter: dict, **kwargs):
+        def _delete_one():
+            with self.client.transaction():
+                pairs = self._select(filter, limit=1)
+                for key, _ in pairs:
+                    self._delete_sync(key)
+                return len(pairs)
+        return DeleteResult(await self.client.run(_delete_one))
+
+    @observed("delete")
+    async def delete_many(self, filter: dict, **kwargs):
+        def _delete_many():
+            with self.client.transaction():
+                pairs = self._matching(filter)
+                for key, _ in pairs:
+                    self._delete_sync(key)
+            return len(pairs)
+        return DeleteResult(await self.client.run(_delete_many))
+
+    @observed("bulkWrite")
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs):
+        """Apply pymongo InsertOne/UpdateOne/UpdateMany/DeleteOne/DeleteMany requests"""
+        def _bulk_write():
+            result = BulkWriteResult()
+            with self.client.transaction():
+                for request in requests:
+                    kind = type(request).__name__
+                    if kind == "InsertOne":
+                        self._insert_sync(request._doc)
+                        result.inserted_count += 1
+                    elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                        matched, modified, upserted_id, _, _ = self._update_sync(
+                            request._filter, request._doc, bool(request._upsert), kind == "UpdateMany")
+                        result.matched_count += matched
+                        result.modified_count += modified
+                        result.upserted_count += upserted_id is not None
+                    elif kind in ("DeleteOne", "DeleteMany"):
+                        pairs = self._matching(request._filter)
+                        if kind == "DeleteOne":
+                            pairs = pairs[:1]
+                        for key, _ in pairs:
+                            self._delete_sync(key)
+                        result.deleted_count += len(pairs)
+                    else:
+                        raise NotImplementedError(f"{kind} is not supported by the SQLite backend")
+            return result
+        return await self.client.run(_bulk_write)
+
+    # Indexes
+    async def create_index(self, keys, unique: bool = False, **kwargs):
+        """Create the SQLite index behind a Mongo index; unique ones are enforced by SQLite itself.
+
+        Unlike Mongo, documents missing a unique key do not collide with each
+        other (SQL NULLs are distinct). TTL indexes index the date inside the
+        stored ``{"$date": ...}`` so expiry range filters can use them.
+        """
+        key_list = _index_keys(keys)
+        expressions = []
+        for key in key_list:
+            column, location = self._column(key), self._json_location(key)
+            if column:
+                expressions.append(column)
+            elif location:
+                path = f"{location[1]}.\"$date\"" if "expireAfterSeconds" in kwargs else location[1]
+                expressions.append(f"json_extract({location[0]}, '{path}')")
+            else:
+                raise NotImplementedError(f"Index on {key} is not supported by the SQLite backend")
+        suffix = re.sub(r"[^A-Za-z0-9_]", "_", "_".join(key_list))
+        statements = []
+        if self.spec:
+            table = self.spec.table
+            if unique and not await self.client.run(self._has_unique_index, key_list):
+                statements.append(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_{suffix} ON {table}({', '.join(expressions)})")
+            elif not unique:
+                statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{suffix} ON {table}({', '.join(expressions)})")
+        else:
+            name = re.sub(r"[^A-Za-z0-9_]", "_", self.name)
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_doc_{name}_{suffix} ON documents(collection, {', '.join(expressions)})")
+            if unique:
+                # Partial, so the constraint covers this collection's documents only
+                collection = self.name.replace("'", "''")
+                statements.append(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS uq_doc_{name}_{suffix} ON documents({', '.join(expressions)}) "
+                    f"WHERE collection = '{collection}'")
+
+        def _create():
+            for statement in statements:
+                self._execute_write(statement, ())
+        await self.client.run(_create)
+        return "_".join(f"{key}_1" for key in key_list)
+
+    def _has_unique_index(self, columns: List[str]) -> bool:
+        """Whether the table schema already makes these columns unique (primary key or UNIQUE)"""
+        for index in self.connection.execute(f"PRAGMA index_list({self.spec.table})").fetchall():
+            if index["unique"]:
+                indexed = [row["name"] for row in self.connection.execute(f"PRAGMA index_info({index['name']})")]
+                if indexed == columns:
+                    return True
+        return False
+
+    async def create_indexes(self, indexes):
+        return [await self.create_index(index.document["key"].items()) for index in indexes]
+
+    async def drop(self):
+        def _drop():
+            if self.spec:
+                self.connection.execute(f"DELETE FROM {self.spec.table}")
+            else:
+                self.connection.execute("DELETE FROM documents WHERE collection = ?", (self.name,))
+        await self.client.run(_drop)
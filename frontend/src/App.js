@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import "./App.css";
 import { BrowserRouter, Routes, Route, Navigate, Link, useNavigate, useParams } from "react-router-dom";
 import axios from "axios";
@@ -66,11 +66,20 @@ const AuthProvider = ({ children }) => {
   );
 };
 
+// Changelog body: the API renders the markdown to sanitized HTML when a changelog is written
+const ChangelogContent = ({ changelog, className = "" }) => (
+  <div
+    className={`changelog-content text-gray-200 ${className}`}
+    dangerouslySetInnerHTML={{ __html: changelog.content_html }}
+  />
+);
+
 // Landing Page
 const LandingPage = () => {
   const [serverStats, setServerStats] = useState({ players: 0, max_players: 64, hostname: "Revolution Roleplay" });
   const [applications, setApplications] = useState([]);
   const [changelogs, setChangelogsState] = useState([]);
+  const [expandedChangelog, setExpandedChangelog] = useState(null);
 
   useEffect(() => {
     const fetchServerStats = async () => {
@@ -242,7 +251,18 @@ const LandingPage = () => {
                       </Badge>
                     )}
                   </div>
-                  <p className="text-gray-200 mb-3 whitespace-pre-line">{changelog.content}</p>
+                  {expandedChangelog === changelog.id ? (
+                    <ChangelogContent changelog={changelog} className="mb-2" />
+                  ) : (
+                    <p className="text-gray-200 mb-2">{changelog.excerpt}</p>
+                  )}
+                  <Button
+                    variant="link"
+                    onClick={() => setExpandedChangelog(expandedChangelog === changelog.id ? null : changelog.id)}
+                    className="text-purple-300 p-0 h-auto mb-3"
+                  >
+                    {expandedChangelog === changelog.id ? 'Vis mindre' : 'Læs mere'}
+                  </Button>
                   <div className="text-sm text-gray-400">
                     {new Date(changelog.created_at).toLocaleDateString('da-DK')} - {changelog.created_by}
                   </div>
@@ -311,6 +331,66 @@ const LandingPage = () => {
   );
 };
 
+// Chunked, resumable upload for file fields; reports the upload id once every byte is stored
+const FileUploadField = ({ form, field, onUploaded, required }) => {
+  const [progress, setProgress] = useState(null);
+  const [error, setError] = useState(null);
+
+  const uploadFile = async (file) => {
+    setError(null);
+    onUploaded('');
+    try {
+      const created = await axios.post(`${API_BASE_URL}/uploads`, {
+        form_id: form.id,
+        field_id: field.id,
+        filename: file.name,
+        content_type: file.type || 'application/octet-stream',
+        size: file.size
+      });
+      let { upload_id: uploadId, offset, chunk_size: chunkSize } = created.data;
+      let retries = 0;
+      while (offset < file.size) {
+        try {
+          const response = await axios.patch(
+            `${API_BASE_URL}/uploads/${uploadId}`,
+            file.slice(offset, offset + chunkSize),
+            { headers: { 'Upload-Offset': offset, 'Content-Type': 'application/offset+octet-stream' } }
+          );
+          offset = response.data.offset;
+          retries = 0;
+          setProgress(Math.round((offset / file.size) * 100));
+        } catch (chunkError) {
+          if (retries++ >= 3 || chunkError.response?.status === 413 || chunkError.response?.status === 404) {
+            throw chunkError;
+          }
+          // Resume from whatever the server has, after a short pause
+          await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+          offset = (await axios.get(`${API_BASE_URL}/uploads/${uploadId}`)).data.offset;
+        }
+      }
+      onUploaded(uploadId);
+    } catch (uploadError) {
+      console.error("Failed to upload file:", uploadError);
+      setProgress(null);
+      setError(uploadError.response?.data?.detail || "Fejl ved upload af fil");
+    }
+  };
+
+  return (
+    <div className="space-y-2">
+      <Input
+        type="file"
+        accept={field.options?.join(',')}
+        required={required}
+        onChange={(e) => e.target.files[0] && uploadFile(e.target.files[0])}
+        className="bg-white/5 border-purple-500/30 text-white"
+      />
+      {progress !== null && <p className="text-sm text-gray-300">{progress === 100 ? 'Uploadet' : `Uploader... ${progress}%`}</p>}
+      {error && <p className="text-sm text-red-400">{error}</p>}
+    </div>
+  );
+};
+
 // Application Form Page
 const ApplicationForm = () => {
   const { id: formId } = useParams();
@@ -320,6 +400,8 @@ const ApplicationForm = () => {
   const [applicantName, setApplicantName] = useState("");
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
+  // One Idempotency-Key per distinct answer set, so a retried or double-clicked submit is not stored twice
+  const submitKey = useRef({ body: null, key: null });
 
   useEffect(() => {
     const fetchForm = async () => {
@@ -355,12 +437,25 @@ const ApplicationForm = () => {
       return;
     }
 
+    if (submitting) {
+      return;
+    }
+
+    const submission = {
+      form_id: formId,
+      applicant_name: applicantName,
+      responses
+    };
+    const body = JSON.stringify(submission);
+    if (submitKey.current.body !== body) {
+      const key = window.crypto?.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      submitKey.current = { body, key };
+    }
+
     setSubmitting(true);
     try {
-      await axios.post(`${API_BASE_URL}/applications/submit`, {
-        form_id: formId,
-        applicant_name: applicantName,
-        responses
+      await axios.post(`${API_BASE_URL}/applications/submit`, submission, {
+        headers: { "Idempotency-Key": submitKey.current.key }
       });
       alert("Ansøgning sendt successfully!");
       navigate('/');
@@ -408,6 +503,15 @@ const ApplicationForm = () => {
             </SelectContent>
           </Select>
         );
+      case 'file':
+        return (
+          <FileUploadField
+            form={form}
+            field={field}
+            required={field.required}
+            onUploaded={(uploadId) => handleFieldChange(field.id, uploadId)}
+          />
+        );
       default:
         return null;
     }
@@ -575,13 +679,28 @@ const AdminDashboard = () => {
   const [applications, setApplications] = useState([]);
   const [submissions, setSubmissions] = useState([]);
   const [serverStats, setServerStats] = useState({});
+  const [bootstrap, setBootstrap] = useState(null);
 
   useEffect(() => {
-    fetchApplications();
-    fetchSubmissions();
+    fetchBootstrap();
     fetchServerStats();
   }, []);
 
+  // One request for everything the first screen needs; the fetchers below refresh single lists
+  const fetchBootstrap = async () => {
+    try {
+      const token = localStorage.getItem('auth_token');
+      const response = await axios.get(`${API_BASE_URL}/admin/bootstrap`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setApplications(response.data.application_forms);
+      setSubmissions(response.data.submissions);
+      setBootstrap(response.data);
+    } catch (error) {
+      console.error('Failed to fetch dashboard:', error);
+    }
+  };
+
   const fetchApplications = async () => {
     try {
       const token = localStorage.getItem('auth_token');
@@ -739,10 +858,10 @@ const AdminDashboard = () => {
           {user?.is_admin && (
             <>
               <TabsContent value="changelogs">
-                <ChangelogManager />
+                <ChangelogManager initialChangelogs={bootstrap?.changelogs} />
               </TabsContent>
               <TabsContent value="users">
-                <UserManager applications={applications} />
+                <UserManager applications={applications} initialUsers={bootstrap?.users} />
               </TabsContent>
             </>
           )}
@@ -917,6 +1036,7 @@ const ApplicationManager = ({ applications, onUpdate }) => {
                 <SelectItem value="text">Tekst</SelectItem>
                 <SelectItem value="textarea">Tekstområde</SelectItem>
                 <SelectItem value="select">Dropdown</SelectItem>
+                <SelectItem value="file">Fil</SelectItem>
               </SelectContent>
             </Select>
           </div>
@@ -946,6 +1066,21 @@ const ApplicationManager = ({ applications, onUpdate }) => {
           </div>
         )}
         
+        {field.field_type === 'file' && (
+          <div>
+            <Label className="text-white">Tilladte filtyper (en per linje, fx image/* eller application/pdf)</Label>
+            <Textarea
+              value={field.options?.join('\n') || ''}
+              onChange={(e) => updateField(index, { 
+                ...field, 
+                options: e.target.value.split('\n').filter(opt => opt.trim()) 
+              }, isEditing)}
+              className="bg-white/5 border-purple-500/30 text-white"
+              rows={3}
+            />
+          </div>
+        )}
+        
         <div className="flex items-center space-x-2">
           <input
             type="checkbox"
@@ -1216,6 +1351,25 @@ const SubmissionManager = ({ submissions, onUpdate }) => {
     }
   };
 
+  const handleDownloadFile = async (submissionId, fieldId, file) => {
+    try {
+      const token = localStorage.getItem('auth_token');
+      const response = await axios.get(`${API_BASE_URL}/admin/submissions/${submissionId}/files/${fieldId}`, {
+        headers: { Authorization: `Bearer ${token}` },
+        responseType: 'blob'
+      });
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = file.filename;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Failed to download file:', error);
+      alert('Fejl ved hentning af fil');
+    }
+  };
+
   const handleUpdateStatus = async (submissionId, newStatus) => {
     try {
       const token = localStorage.getItem('auth_token');
@@ -1385,9 +1539,19 @@ const SubmissionManager = ({ submissions, onUpdate }) => {
                   {Object.entries(selectedSubmission.responses).map(([fieldId, response]) => (
                     <div key={fieldId} className="p-4 bg-white/5 rounded-lg">
                       <Label className="text-gray-400">Felt ID: {fieldId}</Label>
-                      <p className="text-white mt-1">
-                        {Array.isArray(response) ? response.join(', ') : response}
-                      </p>
+                      {response && response.blob_id ? (
+                        <Button
+                          variant="link"
+                          onClick={() => handleDownloadFile(selectedSubmission.id, fieldId, response)}
+                          className="text-purple-300 p-0 h-auto mt-1"
+                        >
+                          {response.filename} ({Math.ceil(response.size / 1024)} KB)
+                        </Button>
+                      ) : (
+                        <p className="text-white mt-1">
+                          {Array.isArray(response) ? response.join(', ') : response}
+                        </p>
+                      )}
                     </div>
                   ))}
                 </div>
@@ -1441,7 +1605,7 @@ const SubmissionManager = ({ submissions, onUpdate }) => {
 };
 
 // Changelog Manager Component
-const ChangelogManager = () => {
+const ChangelogManager = ({ initialChangelogs }) => {
   const [changelogsState, setChangelogsState] = useState([]);
   const [isCreateDialogOpen, setIsCreateDialogOpen] = useState(false);
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false);
@@ -1453,7 +1617,11 @@ const ChangelogManager = () => {
   });
 
   useEffect(() => {
-    fetchChangelogsList();
+    if (initialChangelogs) {
+      setChangelogsState(initialChangelogs);
+    } else {
+      fetchChangelogsList();
+    }
   }, []);
 
   const fetchChangelogsList = async () => {
@@ -1634,7 +1802,7 @@ const ChangelogManager = () => {
               </div>
             </CardHeader>
             <CardContent>
-              <p className="text-gray-200 whitespace-pre-line">{changelog.content}</p>
+              <ChangelogContent changelog={changelog} />
             </CardContent>
           </Card>
         ))}
@@ -1716,7 +1884,7 @@ const ChangelogManager = () => {
 };
 
 // User Manager Component
-const UserManager = ({ applications }) => {
+const UserManager = ({ applications, initialUsers }) => {
   const [users, setUsersState] = useState([]);
   const [isCreateDialogOpen, setIsCreateDialogOpen] = useState(false);
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false);
@@ -1729,7 +1897,11 @@ const UserManager = ({ applications }) => {
   });
 
   useEffect(() => {
-    fetchUsersList();
+    if (initialUsers) {
+      setUsersState(initialUsers);
+    } else {
+      fetchUsersList();
+    }
   }, []);
 
   const fetchUsersList = async () => {
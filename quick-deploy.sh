@@ -39,6 +39,10 @@ echo "📋 Step 3: Kopierer filer..."
 cp -r frontend/build/* deploy/website/
 echo "✅ Frontend filer kopieret til deploy/website/"
 
+# Precompressed .br/.gz variants, served by the FastAPI backend without compressing per request
+python3 backend/static_site.py deploy/website
+echo "✅ Komprimerede varianter oprettet i deploy/website/"
+
 # Copy backend to api
 cp backend/*.php deploy/api/
 cp backend/.htaccess deploy/api/